@@ -0,0 +1,189 @@
+"""Asyncio socket that handles ODIS commands from several clients at once"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from interfaces.command_interface import encode_response
+from interfaces.custom_exceptions import FramingError
+from interfaces.dispatcher import tokenize
+from interfaces.framing import (HANDSHAKE, KIND_COMMAND, KIND_ERROR, FrameDecoder, encode_frame, encode_reply,
+                                is_handshake, handshake_version)
+from interfaces.session import SessionRegistry
+from interfaces.subscriptions import SUBSCRIPTION_METHODS, SubscriptionHub
+from odis.odis import Odis
+from modules.logger import get_logger, configure_logging
+
+logger = get_logger(__name__)
+
+MAX_WORKERS = 16
+
+
+class AsyncSocketServer:
+    """
+    Socket server which keeps many client connections opened at the same time
+    First message of a connection is either:
+        initialize(arg1; ...; argN) - connection gets its own automation component object
+        join_session(name) - connection joins named session shared with other connections
+    Blocking commands (e.g. flash) run in thread pool thus event loop keeps serving other connections
+    Framed connections may subscribe to cyclic DID reads, see interfaces.subscriptions
+    """
+
+    def __init__(self, host, port, max_workers=MAX_WORKERS, component_class=Odis):
+        """
+        :param host: host to listen on
+        :param port: port to listen on
+        :param max_workers: number of threads running blocking commands
+        :param component_class: automation component class, AsyncOdis awaits its async counterparts of commands
+        """
+        self.host = host
+        self.port = port
+        self.server = None
+        self.sessions = SessionRegistry(component_class)
+        self.subscriptions = SubscriptionHub(self.run_blocking)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="odis_command")
+
+    def start_server(self):
+        try:
+            asyncio.run(self.serve())
+        except OSError as e:
+            logger.info("Server error: %s", e)
+        finally:
+            self._executor.shutdown(wait=False)
+
+    async def serve(self):
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        logger.info("Server listening on %s:%s", self.host, self.port)
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def run_blocking(self, function, *args):
+        """
+        Runs blocking callable in thread pool
+        :param function: callable to be executed
+        :param args: callable arguments
+        :return: callable result
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, function, *args)
+
+    def _open_session(self, message: str):
+        """
+        Opens session for the first message of a connection
+        :param message: first raw socket message
+        :return: session and response if message was consumed, None otherwise
+        """
+        method, args = tokenize(message)
+        if method == "join_session":
+            if len(args) != 1 or not args[0]:
+                raise ValueError("Session name expected. Example: join_session(bench_1)")
+            session = self.sessions.join(args[0])
+            return session, f"Joined session {session.name}"
+        return self.sessions.create_private(), None
+
+    async def handle_message(self, connection, message: str):
+        """
+        Opens session with first message of connection, executes command within session otherwise
+        :param connection: connection state, dictionary holding connection session
+        :param message: received command string
+        :return: response
+        """
+        response = None
+        if connection["session"] is None:
+            connection["session"], response = self._open_session(message)
+        if response is None:
+            response = await connection["session"].handle_message(message, self.run_blocking)
+        return response
+
+    async def handle_connection(self, reader, writer):
+        client_address = writer.get_extra_info("peername")
+        logger.info("Accepted connection from %s", client_address)
+        connection = {"session": None}
+
+        try:
+            data = await reader.read(1024)
+            while data.startswith(b"\x00") and len(data) < len(HANDSHAKE):
+                chunk = await reader.read(1024)
+                if not chunk:
+                    break
+                data += chunk
+            if is_handshake(data):
+                logger.info("Framed protocol requested by %s", client_address)
+                await self.handle_frames(connection, reader, writer, data)
+            else:
+                await self.handle_bare_messages(connection, reader, writer, data)
+        except ConnectionError as error:
+            logger.info("Connection %s lost: %s", client_address, error)
+        finally:
+            self.subscriptions.release(connection)
+            if connection["session"] is not None:
+                self.sessions.release(connection["session"])
+            writer.close()
+            logger.info("Connection %s closed", client_address)
+
+    async def handle_bare_messages(self, connection, reader, writer, data):
+        client_address = writer.get_extra_info("peername")
+        while data:
+            message = data.decode()
+            logger.debug("Received from %s: %s", client_address, message)
+            try:
+                response = await self.handle_message(connection, message)
+            except Exception as error:
+                response = error
+            logger.debug("Sent to %s: %s", client_address, response)
+            writer.write(encode_response(response))
+            await writer.drain()
+            data = await reader.read(1024)
+
+    async def handle_frames(self, connection, reader, writer, data):
+        """
+        Serves framed protocol till client closes connection
+        Malformed handshake or frame is answered with error frame and connection is closed,
+        decoder cannot find start of next frame in such stream
+        """
+        client_address = writer.get_extra_info("peername")
+        try:
+            await self._serve_frames(connection, reader, writer, data)
+        except FramingError as error:
+            logger.info("Closing connection %s, framing error: %s", client_address, error)
+            writer.write(encode_frame(0, KIND_ERROR, str(error).encode()))
+            await writer.drain()
+
+    async def _serve_frames(self, connection, reader, writer, data):
+        client_address = writer.get_extra_info("peername")
+        handshake_version(data)
+        writer.write(HANDSHAKE)
+        decoder = FrameDecoder()
+        data = data[len(HANDSHAKE):]
+
+        while True:
+            for frame in decoder.feed(data):
+                logger.debug("Received from %s: %s %s", client_address, frame.request_id, frame.body)
+                try:
+                    if frame.kind != KIND_COMMAND:
+                        raise FramingError(f"Unsupported frame kind: {frame.kind}")
+                    message = frame.body.decode()
+                    method, args = tokenize(message)
+                    if method in SUBSCRIPTION_METHODS and connection["session"] is not None:
+                        session = connection["session"]
+                        response = self.subscriptions.handle(method, args, connection, frame.request_id, writer,
+                                                             session.command_interface.obj, session.lock)
+                    else:
+                        response = await self.handle_message(connection, message)
+                except Exception as error:
+                    reply = encode_frame(frame.request_id, KIND_ERROR, str(error).encode())
+                else:
+                    reply = encode_reply(frame.request_id, response)
+                writer.write(reply)
+            await writer.drain()
+            data = await reader.read(65536)
+            if not data:
+                return
+
+
+if __name__ == "__main__":
+    configure_logging()
+    # Example usage:
+    host_ = "127.0.0.1"  # Change this to the desired host
+    port_ = 12345  # Change this to the desired port
+
+    server = AsyncSocketServer(host_, port_)
+    server.start_server()
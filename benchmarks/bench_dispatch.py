@@ -0,0 +1,54 @@
+"""Micro-benchmark of command dispatch cost per message: regex based Command class vs compiled CommandTable
+
+Both paths parse message and resolve Odis method, neither calls ODIS web service.
+CommandTable additionally converts int, float and bool arguments (example: address to int), work which
+legacy path leaves to Odis methods; arguments of methods accepting str are passed as received.
+Run from repository root: python -m benchmarks.bench_dispatch
+"""
+import re
+import timeit
+
+from interfaces.custom_exceptions import CommandTemplateError, InvalidCommand
+from interfaces.dispatcher import CommandTable
+from odis.odis import Odis
+
+METHOD_PATTERN = r'^[^(]*(?=\()'
+ARGS_PATTERN = r'(?<=\().*(?=\))'
+
+MESSAGES = ["connect_to_ecu(33114)",
+            "send_raw_service(22 F1 90)",
+            "set_doip_vehicle_project(MQB_2023_Brake;192.168.0.10)",
+            "flash(c:\\containers\\FL_5Q0907530_0620.odx)",
+            "send_raw_service(" + " ".join(["2E F1 90"] + ["AA"] * 1024) + ")"]
+
+
+def legacy_dispatch(component, message):
+    args = re.search(ARGS_PATTERN, message)
+    method = re.search(METHOD_PATTERN, message)
+    if method is None:
+        raise CommandTemplateError
+    args = args.group().split(";") if args and args.group() else []
+    method = method.group()
+    if not hasattr(component, method):
+        raise InvalidCommand
+    return component.__getattribute__(method), args
+
+
+def measure(function, argument):
+    number, _ = timeit.Timer(lambda: function(argument)).autorange()
+    best = min(timeit.repeat(lambda: function(argument), number=number, repeat=3))
+    return best / number
+
+
+if __name__ == "__main__":
+    component = Odis.__new__(Odis)
+    build_time = measure(CommandTable, Odis)
+    table = CommandTable.for_class(Odis)
+    print(f"CommandTable build (once per class): {build_time * 1e6:.1f} us, {len(table.commands)} commands")
+    print(f"{'message':<55} {'legacy [us]':>12} {'table [us]':>11} {'speedup':>9}")
+    for message in MESSAGES:
+        legacy_time = measure(lambda item: legacy_dispatch(component, item), message)
+        table_time = measure(table.compile, message)
+        label = message if len(message) <= 55 else message[:50] + "...)"
+        print(f"{label:<55} {legacy_time * 1e6:>12.2f} {table_time * 1e6:>11.2f} "
+              f"{legacy_time / table_time:>8.1f}x")
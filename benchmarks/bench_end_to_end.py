@@ -0,0 +1,122 @@
+"""End-to-end throughput and latency benchmark against local stand-in ODIS automation service
+
+Measures send_raw_service through Odis, CommandInterface and socket servers (bare and framed protocol).
+Run from repository root: python -m benchmarks.bench_end_to_end --count 500 --latency 0.0
+"""
+import argparse
+import os
+import socket
+import tempfile
+import time
+
+from async_socket_connection import AsyncSocketServer
+from benchmarks.bench_utils import measure, summarize, print_results, free_port, start_in_thread, connect
+from detached_socket_connection import SocketServer as DetachedSocketServer
+from interfaces.command_interface import CommandInterface
+from interfaces.framing import FramedClient
+from odis.mock_service import MockOdisService, mock_installation
+from odis.odis import Odis
+from odis.wsdl_cache import WsdlCache
+from socket_connection import SocketServer
+
+REQUEST = "22 F1 90"
+SETUP_COMMANDS = ["attach()", "set_vehicle_project(MOCK)", "connect_to_ecu(3)"]
+
+
+class BareClient:
+    """
+    Client of bare string protocol, as used by CAPL DLL
+    """
+
+    def __init__(self, port) -> None:
+        self.socket = socket.create_connection(("127.0.0.1", port))
+
+    def call(self, message: str) -> str:
+        self.socket.send(message.encode())
+        return self.socket.recv(65536).decode()
+
+    def close(self):
+        self.socket.close()
+
+
+def detached_call(client, message: str) -> str:
+    """
+    Adds task to detached command interface and polls its result
+    """
+    client.call(message)
+    result = client.call("get_result")
+    while result == "Results queue is empty":
+        result = client.call("get_result")
+    return result
+
+
+def pipelined(client: FramedClient, count: int) -> dict:
+    """
+    Sends all commands before first reply is read
+    """
+    sent = {}
+    start = time.perf_counter()
+    for _ in range(count):
+        sent[client.send(f"send_raw_service({REQUEST})")] = time.perf_counter()
+    latencies = []
+    for _ in range(count):
+        frame = client.receive()
+        latencies.append(time.perf_counter() - sent[frame.request_id])
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def benchmark_server(results, name, server, client_class, count, initialization, detached=False):
+    start_in_thread(server.start_server)
+    client = connect(lambda: client_class(server.port))
+    call = (lambda message: detached_call(client, message)) if detached else client.call
+    call(initialization)
+    for command in SETUP_COMMANDS:
+        call(command)
+    results[name] = measure(lambda: call(f"send_raw_service({REQUEST})"), count)
+    if isinstance(client, FramedClient) and not detached:
+        results[f"{name} pipelined"] = pipelined(client, count)
+    client.close()
+
+
+def main(count: int, latency: float):
+    results = {}
+    with MockOdisService(latency=latency) as service, tempfile.TemporaryDirectory() as directory:
+        tool_path, configuration_path = mock_installation(directory)
+        Odis.wsdl_cache = WsdlCache(os.path.join(directory, "wsdl_cache"))
+        initialization = f"initialize({tool_path};{configuration_path};{service.port})"
+
+        odis = Odis(tool_path=tool_path, configuration_path=configuration_path, tool_port=service.port)
+        odis.attach()
+        odis.set_vehicle_project("MOCK")
+        odis.connect_to_ecu(3)
+        results["Odis.send_raw_service"] = measure(lambda: odis.send_raw_service(REQUEST), count)
+
+        command_interface = CommandInterface(Odis)
+        command_interface.initialize_object(initialization)
+        for command in SETUP_COMMANDS:
+            command_interface.execute_command(command)
+        results["CommandInterface.execute_command"] = measure(
+            lambda: command_interface.execute_command(f"send_raw_service({REQUEST})"), count)
+
+        for protocol, client_class in [("bare", BareClient),
+                                       ("framed", lambda port: FramedClient("127.0.0.1", port))]:
+            benchmark_server(results, f"socket_connection {protocol}",
+                             SocketServer("127.0.0.1", free_port()), client_class, count, initialization)
+            benchmark_server(results, f"async_socket_connection {protocol}",
+                             AsyncSocketServer("127.0.0.1", free_port()), client_class, count, initialization)
+            detached_server = DetachedSocketServer("127.0.0.1", free_port())
+            benchmark_server(results, f"detached_socket_connection {protocol}",
+                             detached_server, client_class, count, initialization, detached=True)
+            detached_server.command_interface.stop_interface()
+
+    print(f"Stand-in service latency: {latency * 1000:.3f} ms, request: {REQUEST}")
+    print_results(results)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=500, help="number of measured commands per path")
+    parser.add_argument("--latency", type=float, default=0.0, help="stand-in service latency in seconds")
+    arguments = parser.parse_args()
+    main(arguments.count, arguments.latency)
@@ -0,0 +1,79 @@
+"""Parity check and latency benchmark of sendRawService fast path against generic zeep path
+
+Both paths talk to local stand-in ODIS automation service. Parity check compares responses of both paths
+for requests of several sizes, including empty response and SOAP fault.
+Run from repository root: python -m benchmarks.bench_fast_path --count 1000
+"""
+import argparse
+import os
+import tempfile
+
+from benchmarks.bench_utils import measure, print_results
+from odis.mock_service import MockOdisService, mock_installation, default_raw_responder
+from odis.odis import Odis
+from odis.raw_service_codec import to_bytes
+from odis.wsdl_cache import WsdlCache
+
+PARITY_REQUESTS = [b"\x22\xF1\x90", b"\x10\x03", b"\x31\x01\xFF\x00", b"\x98", b"\x99",
+                   b"\x2E\xF1\x90" + os.urandom(4096)]
+BENCHMARK_REQUESTS = {"22 F1 90": b"\x22\xF1\x90",
+                      "2E F1 90 + 4 KiB": b"\x2E\xF1\x90" + bytes(4096)}
+
+
+def responder(request: bytes) -> bytes:
+    """
+    Stand-in responses with special cases: 98 answers empty response, 99 raises SOAP fault
+    """
+    if request[:1] == b"\x99":
+        raise ValueError("requestOutOfRange")
+    if request[:1] == b"\x98":
+        return b""
+    return default_raw_responder(request, 64)
+
+
+def outcome(function, request: bytes):
+    try:
+        return function(request)
+    except Exception as error:
+        return type(error), str(error)
+
+
+def main(count: int, latency: float):
+    with MockOdisService(latency=latency, raw_responder=responder) as service, \
+            tempfile.TemporaryDirectory() as directory:
+        tool_path, configuration_path = mock_installation(directory)
+        Odis.wsdl_cache = WsdlCache(os.path.join(directory, "wsdl_cache"))
+        odis = Odis(tool_path=tool_path, configuration_path=configuration_path, tool_port=service.port)
+        odis.attach()
+        odis.set_vehicle_project("MOCK")
+        odis.connect_to_ecu(3)
+        fast_path = odis.fast_path
+
+        def fast(request):
+            return fast_path.send_raw_service(odis.connection_handle, request)
+
+        def generic(request):
+            return to_bytes(odis.service.sendRawService(odis.connection_handle, request))
+
+        for request in PARITY_REQUESTS:
+            fast_outcome, generic_outcome = outcome(fast, request), outcome(generic, request)
+            assert fast_outcome == generic_outcome, f"{request[:8].hex()}: {fast_outcome} != {generic_outcome}"
+        print(f"Parity check passed for {len(PARITY_REQUESTS)} requests")
+
+        results = {}
+        for name, request in BENCHMARK_REQUESTS.items():
+            results[f"zeep {name}"] = measure(lambda: generic(request), count)
+            results[f"fast path {name}"] = measure(lambda: fast(request), count)
+        fast_path.close()
+
+    print(f"Stand-in service latency: {latency * 1000:.3f} ms")
+    print_results(results)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1000, help="number of measured requests per path")
+    parser.add_argument("--latency", type=float, default=0.0, help="stand-in service latency in seconds")
+    arguments = parser.parse_args()
+    main(arguments.count, arguments.latency)
@@ -0,0 +1,96 @@
+"""Import-time profile of socket server entry points and time until they listen
+
+Each entry module is imported in a fresh interpreter with -X importtime, reported is cumulative import time
+of the module (best of --repeat runs), its heaviest imports and heavy dependencies loaded by the import.
+Time to listen is measured from process start until the server accepts TCP connection.
+Run from repository root: python -m benchmarks.bench_import_time --repeat 5
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks.bench_utils import free_port
+
+ENTRY_MODULES = ["socket_connection", "detached_socket_connection", "async_socket_connection", "odis.odis"]
+SERVERS = {"socket_connection": "SocketServer",
+           "detached_socket_connection": "SocketServer",
+           "async_socket_connection": "AsyncSocketServer"}
+# dependencies which are expected to load on first initialize(...)/open() only
+HEAVY_MODULES = ["zeep", "lxml", "requests", "httpx", "psutil", "win32gui", "func_timeout"]
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_profile(module: str) -> list:
+    """
+    :param module: module imported in fresh interpreter
+    :return: list of (cumulative microseconds, self microseconds, imported module name) of every import
+    """
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT,
+                             capture_output=True, text=True, check=True)
+    profile = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        profile.append((int(cumulative), int(own), name.strip()))
+    return profile
+
+
+def loaded_heavy_modules(module: str) -> list:
+    code = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return [name for name in output.stdout.strip().split(",") if name]
+
+
+def time_to_listen(module: str, server_class: str, timeout: float = 30.0) -> float:
+    """
+    :return: seconds from process start until server accepts connection
+    """
+    port = free_port()
+    code = f"from {module} import {server_class}; {server_class}('127.0.0.1', {port}).start_server()"
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-c", code], cwd=ROOT,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with socket.create_connection(("127.0.0.1", port), timeout=1):
+                    return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.002)
+        raise TimeoutError(f"{module} did not listen within {timeout}s")
+    finally:
+        process.kill()
+        process.wait()
+
+
+def main(repeat: int, top: int) -> dict:
+    results = {}
+    for module in ENTRY_MODULES:
+        profiles = [import_profile(module) for _ in range(repeat)]
+        best = min(profiles, key=lambda profile: next(cumulative for cumulative, _, name in profile if name == module))
+        total = next(cumulative for cumulative, _, name in best if name == module)
+        heaviest = sorted(best, key=lambda item: item[1], reverse=True)[:top]
+        results[module] = total
+        print(f"{module}: {total / 1000:.1f} ms, heavy dependencies loaded: "
+              f"{', '.join(loaded_heavy_modules(module)) or 'none'}")
+        for cumulative, own, name in heaviest:
+            print(f"    {own / 1000:>7.2f} ms self {cumulative / 1000:>8.2f} ms cumulative  {name}")
+
+    print(f"{'server':<30} {'time to listen [ms]':>20}")
+    for module, server_class in SERVERS.items():
+        listen_time = min(time_to_listen(module, server_class) for _ in range(repeat))
+        results[f"{module} listen"] = listen_time
+        print(f"{module:<30} {listen_time * 1000:>20.1f}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="runs per module, best run is reported")
+    parser.add_argument("--top", type=int, default=5, help="number of heaviest imports listed per module")
+    arguments = parser.parse_args()
+    main(arguments.repeat, arguments.top)
@@ -0,0 +1,72 @@
+"""Logging overhead per command: synchronous handlers with eager f-strings vs queue logging with lazy arguments
+
+Each command logs what socket server and worker thread log per message: received message, job start,
+job end and sent response. Measured is time spent by the request thread only.
+"before" reproduces previous logger: FileHandler and StreamHandler called by request thread, INFO level.
+"after" uses configure_logging: per-message records are DEBUG, records are written by listener thread.
+Console output goes to os.devnull, so terminal speed is not measured.
+Run from repository root: python -m benchmarks.bench_logging --count 20000
+"""
+import argparse
+import logging
+import os
+import tempfile
+
+from benchmarks.bench_utils import measure, print_results
+from modules.logger import configure_logging, get_logger, shutdown_logging, FORMAT, ROOT_NAME
+
+MESSAGE = "send_raw_service(22 F1 90)"
+RESPONSE = "0X62 0XF1 0X90 0X57 0X56 0X57"
+
+
+def before_logger(path: str, console) -> logging.Logger:
+    logger = logging.getLogger("bench_logging_before")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    formatter = logging.Formatter(FORMAT)
+    for handler in (logging.FileHandler(path), logging.StreamHandler(console)):
+        handler.setFormatter(formatter)
+        logger.addHandler(handler)
+    return logger
+
+
+def before_command(logger, job_id: int = 7) -> None:
+    logger.info(f"Received: {MESSAGE}")
+    logger.info(f"Set _execute flag with job {job_id}: {MESSAGE}")
+    logger.info("Clear _execute flag")
+    logger.info(f"SENT: {RESPONSE}")
+
+
+def after_command(logger, job_id: int = 7) -> None:
+    logger.debug("Received: %s", MESSAGE)
+    logger.debug("Set _execute flag with job %s: %s", job_id, MESSAGE)
+    logger.debug("Clear _execute flag")
+    logger.debug("SENT: %s", RESPONSE)
+
+
+def main(count: int) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as directory, open(os.devnull, "w") as console:
+        logger = before_logger(os.path.join(directory, "before.log"), console)
+        results["before: sync handlers, INFO, f-strings"] = measure(lambda: before_command(logger), count)
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            handler.close()
+
+        logger = get_logger("benchmarks.bench_logging")
+        configure_logging(path=os.path.join(directory, "after.log"), console=console)
+        results["after: queue, per-message DEBUG disabled"] = measure(lambda: after_command(logger), count)
+        configure_logging(path=os.path.join(directory, "after_debug.log"), console=console,
+                          levels={"benchmarks": "DEBUG"})
+        results["after: queue, per-message DEBUG enabled"] = measure(lambda: after_command(logger), count)
+        shutdown_logging()
+        logging.getLogger(ROOT_NAME + ".benchmarks").setLevel(logging.NOTSET)
+    print_results(results)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=20000, help="number of measured commands per variant")
+    arguments = parser.parse_args()
+    main(arguments.count)
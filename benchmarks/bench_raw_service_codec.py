@@ -0,0 +1,56 @@
+"""Micro-benchmark of send_raw_service request encoding and response formatting
+
+Run from repository root: python -m benchmarks.bench_raw_service_codec
+"""
+import os
+import timeit
+
+from odis.raw_service_codec import encode_request, format_response
+
+PAYLOAD_SIZES = [4, 4 * 1024, 64 * 1024]
+
+
+def legacy_encode_request(hex_command):
+    hex_command = str(hex_command).strip().replace(" ", "")
+    hex_list = [hex_command[index: index + 2] for index in range(0, len(hex_command), 2)]
+    hex_list = ["0x" + item for item in hex_list if "0x" not in item]
+    return bytes([(int(item, 0)) for item in hex_list])
+
+
+def legacy_format_response(response):
+    def to_hex(val, nbits):
+        return hex((val + (1 << nbits)) % (1 << nbits))
+
+    answer = ""
+    for item in response:
+        answer = answer + str(to_hex(item, 8)) + " "
+    resp = ""
+    for element in answer.split(" "):
+        if len(element) == 3:
+            element = element.replace("x", "x0")
+        resp = resp + element + " "
+    answer = resp.upper()
+    answer = answer.strip().replace(" ", "").replace("0x", "")
+    return ' '.join(answer[i:i + 4] for i in range(0, len(answer), 4))
+
+
+def measure(function, argument):
+    number, _ = timeit.Timer(lambda: function(argument)).autorange()
+    best = min(timeit.repeat(lambda: function(argument), number=number, repeat=3))
+    return best / number
+
+
+if __name__ == "__main__":
+    print(f"{'payload':>10} {'operation':>10} {'legacy [us]':>14} {'codec [us]':>12} {'speedup':>9}")
+    for size in PAYLOAD_SIZES:
+        response = os.urandom(size)
+        request = response.hex(" ")
+        assert legacy_format_response(response) == format_response(response)
+        assert legacy_encode_request(request) == encode_request(request)
+
+        for operation, legacy, codec, argument in [("encode", legacy_encode_request, encode_request, request),
+                                                   ("format", legacy_format_response, format_response, response)]:
+            legacy_time = measure(legacy, argument)
+            codec_time = measure(codec, argument)
+            print(f"{size:>10} {operation:>10} {legacy_time * 1e6:>14.2f} {codec_time * 1e6:>12.2f} "
+                  f"{legacy_time / codec_time:>8.1f}x")
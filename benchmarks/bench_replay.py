@@ -0,0 +1,91 @@
+"""Record a session against stand-in ODIS automation service, replay it without the service
+
+Recording: send_raw_service through Odis with ODIS_RECORDING set, size of compressed recording per call.
+Replay: the same commands through Odis, CommandInterface and socket server answered by ReplayTransport,
+without delay and at recorded speed. A recording of real ODIS may be given with --recording, its recorded
+sendRawService responses are served for the benchmark requests.
+Run from repository root: python -m benchmarks.bench_replay --count 500 --latency 0.002
+"""
+import argparse
+import os
+import tempfile
+
+from benchmarks.bench_end_to_end import REQUEST, BareClient
+from benchmarks.bench_utils import measure, print_results, free_port, start_in_thread, connect
+from interfaces.command_interface import CommandInterface
+from odis.mock_service import MockOdisService, mock_installation
+from odis.odis import Odis
+from odis.recording import close_recordings, read_records
+from odis.wsdl_cache import WsdlCache
+from socket_connection import SocketServer
+
+REPLAY_SETUP_COMMANDS = ["set_vehicle_project(MOCK)", "connect_to_ecu(3)"]
+
+
+def record(path: str, directory: str, count: int, latency: float) -> dict:
+    results = {}
+    with MockOdisService(latency=latency) as service:
+        tool_path, configuration_path = mock_installation(directory)
+        odis = Odis(tool_path=tool_path, configuration_path=configuration_path, tool_port=service.port)
+        odis.recording_path = path
+        odis.attach()
+        odis.set_vehicle_project("MOCK")
+        odis.connect_to_ecu(3)
+        results["recording: Odis.send_raw_service"] = measure(lambda: odis.send_raw_service(REQUEST), count)
+    close_recordings()
+    return results
+
+
+def replay(results: dict, path: str, directory: str, count: int, speed: float) -> None:
+    label = f"replay speed {speed:g}" if speed else "replay no delay"
+    # installation paths are validated by Odis configuration only, nothing listens on the port
+    tool_path, configuration_path = mock_installation(directory)
+    initialization = f"initialize({tool_path};{configuration_path};{free_port()})"
+
+    odis = Odis(tool_path=tool_path, configuration_path=configuration_path, tool_port=free_port())
+    odis.attach_replay(path, speed)
+    odis.set_vehicle_project("MOCK")
+    odis.connect_to_ecu(3)
+    results[f"{label}: Odis.send_raw_service"] = measure(lambda: odis.send_raw_service(REQUEST), count)
+
+    command_interface = CommandInterface(Odis)
+    command_interface.initialize_object(initialization)
+    command_interface.execute_command(f"attach_replay({path};{speed})")
+    for command in REPLAY_SETUP_COMMANDS:
+        command_interface.execute_command(command)
+    results[f"{label}: CommandInterface.execute_command"] = measure(
+        lambda: command_interface.execute_command(f"send_raw_service({REQUEST})"), count)
+
+    server = SocketServer("127.0.0.1", free_port())
+    start_in_thread(server.start_server)
+    client = connect(lambda: BareClient(server.port))
+    for command in [initialization, f"attach_replay({path};{speed})", *REPLAY_SETUP_COMMANDS]:
+        client.call(command)
+    results[f"{label}: socket_connection bare"] = measure(lambda: client.call(f"send_raw_service({REQUEST})"), count)
+    client.close()
+
+
+def main(count: int, latency: float, recording: str) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        Odis.wsdl_cache = WsdlCache(os.path.join(directory, "wsdl_cache"))
+        if not recording:
+            recording = os.path.join(directory, "session.jsonl.gz")
+            results.update(record(recording, directory, count, latency))
+            size = os.path.getsize(recording)
+            calls = sum(record["kind"] == "call" for record in read_records(recording))
+            print(f"Recording: {calls} calls, {size} bytes including WSDL, {size / calls:.1f} bytes per call")
+        replay(results, recording, directory, count, 0.0)
+        replay(results, recording, directory, count, 1.0)
+    print(f"Stand-in service latency: {latency * 1000:.3f} ms, request: {REQUEST}")
+    print_results(results)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=500, help="number of measured commands per path")
+    parser.add_argument("--latency", type=float, default=0.002, help="stand-in service latency in seconds")
+    parser.add_argument("--recording", default="", help="replayed recording, default: recorded from stand-in")
+    arguments = parser.parse_args()
+    main(arguments.count, arguments.latency, arguments.recording)
@@ -0,0 +1,83 @@
+"""Helpers shared by benchmarks"""
+import socket
+import threading
+import time
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """
+    :param sorted_values: ascending values
+    :param fraction: percentile as fraction, example: 0.99
+    :return: nearest-rank percentile
+    """
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def measure(function, count: int, warmup: int = 10) -> dict:
+    """
+    Calls function count times and collects latency of each call
+    :param function: callable without arguments
+    :param count: number of measured calls
+    :param warmup: number of calls executed before measurement
+    :return: summary with commands per second, p50 and p99 latency
+    """
+    for _ in range(warmup):
+        function()
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(count):
+        call_start = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - call_start)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def summarize(latencies: list, wall_time: float) -> dict:
+    latencies = sorted(latencies)
+    return {"count": len(latencies),
+            "commands_per_second": len(latencies) / wall_time if wall_time else 0.0,
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000}
+
+
+def print_results(results: dict) -> None:
+    """
+    :param results: dictionary name: summary
+    """
+    print(f"{'path':<45} {'count':>7} {'cmd/s':>10} {'p50 [ms]':>10} {'p99 [ms]':>10}")
+    for name, summary in results.items():
+        print(f"{name:<45} {summary['count']:>7} {summary['commands_per_second']:>10.1f} "
+              f"{summary['p50_ms']:>10.3f} {summary['p99_ms']:>10.3f}")
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_in_thread(target) -> threading.Thread:
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    return thread
+
+
+def connect(factory, timeout: float = 10.0):
+    """
+    Retries client creation till server listens
+    Servers are not probed with separate connection as detached server serves only one connection
+    :param factory: callable creating connected client
+    :param timeout: time to wait for server in seconds
+    :return: client
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return factory()
+        except ConnectionRefusedError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.01)
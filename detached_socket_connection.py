@@ -1,8 +1,11 @@
 """Socket that handles ODIS commands"""
 import socket
 from interfaces.detached_command_interface import CommandInterface
+from interfaces.framing import read_first_message, is_handshake, serve_frames
 from odis.odis import Odis
-from modules.logger import logger
+from modules.logger import get_logger, configure_logging
+
+logger = get_logger(__name__)
 
 
 class SocketServer:
@@ -10,6 +13,7 @@ class SocketServer:
         self.host = host
         self.port = port
         self.server_socket = None
+        self.first_call = True
         self.command_interface = CommandInterface(Odis)
 
     def start_server(self):
@@ -18,53 +22,69 @@ class SocketServer:
             self.server_socket.bind((self.host, self.port))
             self.server_socket.listen()  # Maximum number of queued connections
 
-            logger.info(f"Server listening on {self.host}:{self.port}")
+            logger.info("Server listening on %s:%s", self.host, self.port)
 
             while True:
                 client_socket, client_address = self.server_socket.accept()
-                logger.info(f"Accepted connection from {client_address}")
+                logger.info("Accepted connection from %s", client_address)
 
                 # Handle the connection and receive messages
                 self.handle_connection(client_socket)
                 self.command_interface.stop_interface()
 
         except socket.error as e:
-            logger.info(f"Server error: {e}")
+            logger.info("Server error: %s", e)
             self.command_interface.stop_interface()
         finally:
             self.server_socket.close()
             self.command_interface.stop_interface()
 
     def handle_connection(self, client_socket):
-        first_call = True
+        self.first_call = True
+        try:
+            data = read_first_message(client_socket)
+            if is_handshake(data):
+                logger.info("Framed protocol requested")
+                serve_frames(client_socket, data, self.process_message)
+                return
+
+            while data:
+                result = self.process_message(data.decode())
+                logger.debug("SENT: %s", result)
+                client_socket.send(result.encode())
+                data = client_socket.recv(1024)
+        finally:
+            client_socket.close()
 
-        while True:
-            data = client_socket.recv(1024)
-            message = data.decode()
-            logger.info(f"Received: {message}")
+    def process_message(self, message):
+        """
+        Adds task for received message or answers command interface request (busy, get_result, status(id), ...)
+        :param message: command string
+        :return: response string, job id of added task
+        """
+        logger.debug("Received: %s", message)
 
-            if first_call:
-                try:
-                    self.command_interface.add_initialization_task(message)
-                except Exception as error:
-                    result = str(error)
-                else:
-                    result = "Task added"
-                first_call = False
-            elif message in self.command_interface.cmd_interface_commands:
-                result = str(self.command_interface.__getattribute__(message)())
-            else:
-                try:
-                    self.command_interface.add_command_execution_task(message)
-                except Exception as error:
-                    result = str(error)
-                else:
-                    result = "Task added"
-            logger.info(f"SENT: {result}")
-            client_socket.send(result.encode())
+        if self.first_call:
+            try:
+                result = str(self.command_interface.add_initialization_task(message))
+            except Exception as error:
+                result = str(error)
+            self.first_call = False
+        elif self.command_interface.is_interface_command(message):
+            try:
+                result = self.command_interface.execute_interface_command(message)
+            except Exception as error:
+                result = str(error)
+        else:
+            try:
+                result = str(self.command_interface.add_command_execution_task(message))
+            except Exception as error:
+                result = str(error)
+        return result
 
 
 if __name__ == "__main__":
+    configure_logging()
     # Example usage:
     host_ = "127.0.0.1"  # Change this to the desired host
     port_ = 12345  # Change this to the desired port
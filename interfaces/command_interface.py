@@ -1,9 +1,12 @@
 """Socket command"""
-from interfaces.custom_exceptions import CommandTemplateError, InvalidInitialization, InvalidCommand
-import re
+from interfaces.custom_exceptions import InvalidCommand
+from interfaces.dispatcher import CommandTable, tokenize
+from odis.raw_service_codec import format_response
 
-METHOD_PATTERN = r'^.*(?=\()'
-ARGS_PATTERN = r'(?<=\().*(?=\))'
+# batch command name: stop on first negative response flag
+BATCH_METHODS = {"batch": False,
+                 "batch_until_negative": True}
+NEGATIVE_RESPONSE_PREFIX = "0X7F"
 
 
 class CommandInterface:
@@ -21,11 +24,7 @@ class CommandInterface:
         :param message: Raw socket message
         :return: None
         """
-        command = Command(message)
-        method, args = command.dispatch()
-        if "initialize" not in method:
-            raise InvalidInitialization
-        self.obj = self.component_class.initialize(*args)
+        self.obj = CommandTable.for_class(self.component_class).initialize(message)
         return "initialized"
 
     def execute_command(self, message: str):
@@ -34,44 +33,94 @@ class CommandInterface:
         :param message:
         :return:
         """
-        command = Command(message)
-        return command.execute(self.obj)
+        return run_command(self.obj, message)
 
-
-class Command:
-
-    def __init__(self, command: str):
+    async def execute_command_async(self, message: str, run):
         """
-        :param command: string command according to template:
-        command(arg1; arg2; ...; argN)
+        Awaits awaitable counterpart of command (<command>_async) if automation component offers one
+        :param message: Raw socket message
+        :param run: coroutine function which runs blocking callable outside of event loop,
+        used for commands without awaitable counterpart
+        :return: result in string format, bytes results are returned unchanged
         """
-        self.command = command
+        method, args = tokenize(message)
+        spec = CommandTable.for_class(type(self.obj)).awaitables.get(method)
+        if spec is None:
+            return await run(self.execute_command, message)
+        response = await spec.function(self.obj, *spec.coerce(args))
+        if isinstance(response, bytes):
+            return response
+        return str(response)
 
-    def dispatch(self) -> (str, tuple):
-        """
-        Dispatch command to method string and tuple of arguments
-        :return: method string, tuple of arguments
-        """
-        args = re.search(ARGS_PATTERN, self.command)
-        method = re.search(METHOD_PATTERN, self.command)
-        if method is None:
-            raise CommandTemplateError
-        if args and args.group():
-            args = args.group().split(";")
-        else:
-            args = []
-        method = method.group()
-        return method, args
-
-    def execute(self, component: object):
+    def execute_batch(self, messages: list, stop_on_negative: bool = False) -> list:
         """
-        Executes command in accordance to mentioned message & automation component
-        :param component: automation component object
-        :return: result in string format
+        Executes ordered list of commands back to back on automation component
+        :param messages: list of commands according to template: command(arg1; arg2; ...; argN)
+        :param stop_on_negative: if True, stop at first negative response or error
+        :return: list of results in string format
         """
-        method, args = self.dispatch()
-        if not hasattr(component, method):
-            raise InvalidCommand
-        call = component.__getattribute__(method)
-        response = call(*args)
-        return str(response)
+        return run_batch(self.obj, messages, stop_on_negative)
+
+
+def run_command(component: object, message: str):
+    """
+    Executes command or batch of commands on automation component
+    :param component: automation component object
+    :param message: string command according to template: command(arg1; arg2; ...; argN)
+    :return: result in string format, bytes results are returned unchanged
+    """
+    method, args = tokenize(message)
+    if method in BATCH_METHODS:
+        return format_batch(run_batch(component, args, stop_on_negative=BATCH_METHODS[method]))
+    return CommandTable.for_class(type(component)).execute(component, method, args)
+
+
+def run_batch(component: object, messages: list, stop_on_negative: bool = False) -> list:
+    """
+    Executes commands back to back on automation component
+    All commands are dispatched before first one is executed, so invalid batch is rejected as a whole
+    :param component: automation component object
+    :param messages: list of commands according to template: command(arg1; arg2; ...; argN)
+    :param stop_on_negative: if True, stop at first negative response or error
+    :return: list of results in string format, bytes results are formatted as send_raw_service responses
+    """
+    table = CommandTable.for_class(type(component))
+    calls = []
+    for message in messages:
+        try:
+            calls.append(table.compile(message))
+        except InvalidCommand:
+            raise InvalidCommand(f"Invalid command accessed within batch: {message}")
+
+    results = []
+    for spec, args in calls:
+        try:
+            response = spec.function(component, *args)
+            response = format_response(response) if isinstance(response, bytes) else str(response)
+        except Exception as error:
+            results.append(str(error))
+            if stop_on_negative:
+                break
+            continue
+        results.append(response)
+        if stop_on_negative and response.startswith(NEGATIVE_RESPONSE_PREFIX):
+            break
+    return results
+
+
+def encode_response(response) -> bytes:
+    """
+    :param response: command result or error
+    :return: bytes to be sent to socket client
+    """
+    if isinstance(response, bytes):
+        return response
+    return str(response).encode()
+
+
+def format_batch(results: list) -> str:
+    """
+    :param results: list of batch results
+    :return: single reply, one result per line
+    """
+    return "\n".join(results)
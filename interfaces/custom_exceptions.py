@@ -14,3 +14,13 @@ class InvalidInitialization(Exception):
 class InvalidCommand(Exception):
     def __init__(self, message="Invalid command accessed. Command was not found within automation component"):
         super().__init__(message)
+
+
+class FramingError(Exception):
+    def __init__(self, message="Invalid frame received"):
+        super().__init__(message)
+
+
+class InvalidArgument(Exception):
+    def __init__(self, message="Invalid command argument. Arguments do not fit automation component method"):
+        super().__init__(message)
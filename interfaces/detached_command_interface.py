@@ -1,60 +1,70 @@
 """Socket command"""
 import re
-import queue
 import threading
-import time
 
-from queue import Empty
-from interfaces.custom_exceptions import CommandTemplateError, InvalidInitialization, InvalidCommand
-from modules.logger import logger
+from interfaces.custom_exceptions import InvalidCommand
+from interfaces.command_interface import run_command
+from interfaces.dispatcher import CommandTable, tokenize
+from interfaces.job_queue import JobQueue, FINISHED, MAX_PENDING_JOBS, MAX_RESULTS, RESULT_TTL
+from modules.histogram import LatencyHistogram
+from modules.logger import get_logger, configure_logging
 from modules.custom_exceptions import *
 
-METHOD_PATTERN = r'^.*(?=\()'
-ARGS_PATTERN = r'(?<=\().*(?=\))'
+logger = get_logger(__name__)
+
+# command interface command with optional single argument, example: status(3)
+INTERFACE_COMMAND_PATTERN = r'(\w+)(?:\((.*)\))?'
 
 
 class CommandInterface:
     """
     Command Generic class
+    Commands are queued as jobs and executed one after another by worker thread
+    Worker thread blocks on job queue: it wakes up only when job is queued or interface is stopped
     """
 
-    def __init__(self, component_class) -> None:
-        self._tasks = queue.Queue(maxsize=1)
-        self._results = queue.Queue(maxsize=1)
+    def __init__(self, component_class, max_pending=MAX_PENDING_JOBS, max_results=MAX_RESULTS,
+                 result_ttl=RESULT_TTL) -> None:
+        self._jobs = JobQueue(max_pending=max_pending, max_results=max_results, result_ttl=result_ttl)
         self._execute = threading.Event()
         self._obj = None
         self._component_class = component_class
-        self._force_stop = False
-        self._thread = threading.Thread(target=self._main_thread).start()
+        self.start_latency = LatencyHistogram()
+        self._thread = threading.Thread(target=self._main_thread)
+        self._thread.start()
         self.cmd_interface_commands = ["busy",
                                        "get_result",
-                                       "stop_interface"]
+                                       "stop_interface",
+                                       "submit",
+                                       "status",
+                                       "result",
+                                       "cancel",
+                                       "jobs",
+                                       "latency"]
 
     def _main_thread(self):
         """
         Method aim to run in thread
-        Checks tasks queue
-        Once _run events is set get task from queue and executes it
-        Task result is pushed to _results queue
+        Takes jobs from queue and executes them
+        Job result is stored within job queue, completion callbacks are called by job queue
         :return:
         """
-        while not self._force_stop:
-            if self._execute.is_set():
-                logger.info("Running task from queue...")
-                continue
-            try:
-                operation = self._tasks.get(timeout=1)
-            except Empty:
-                logger.info("Queue is empty...")
-                continue
-            if not operation:
-                logger.info("Queue is empty or get timeout reached...")
-                continue
-
-            logger.info(f"Set _execute flag with operation {operation}")
+        while True:
+            job = self._jobs.next()
+            if job is None:
+                logger.info("Job queue closed, worker thread stopped")
+                return
+            self.start_latency.record(job.started_at - job.submitted_at)
+
+            logger.debug("Set _execute flag with job %s: %s", job.id, job.message)
             self._execute.set()
-            operation()
-            logger.info("Clear _execute flag")
+            try:
+                result = job.operation()
+            except Exception as error_:
+                self._jobs.finish(job, error_, failed=True)
+            else:
+                self._jobs.finish(job, result)
+            logger.debug("Clear _execute flag")
             self._execute.clear()
 
     def busy(self):
@@ -65,113 +75,146 @@ class CommandInterface:
         return self._execute.is_set()
 
     def get_result(self):
-        if self._results.qsize():
-            return self._results.get()
-        else:
+        """
+        :return: oldest result which was not read yet
+        """
+        job = self._jobs.oldest_unread()
+        if job is None:
             return "Results queue is empty"
+        job.read = True
+        return job.result
 
     def stop_interface(self):
         """
-        Stops thread execution
+        Stops thread execution, worker thread wakes up immediately
+        Running job is finished, queued jobs are cancelled
         :return:
         """
-        self._force_stop = True
+        self._jobs.close()
 
-    def add_initialization_task(self, message):
-        if self._results.qsize():
-            raise LastResultNotRead
-        if self._tasks.qsize():
-            raise Busy
-
-        self._tasks.put(lambda: self._initialize_object(message))
-
-    def add_command_execution_task(self, message):
-        if self._tasks.qsize():
-            raise Busy
-        if self._results.qsize():
-            raise LastResultNotRead
+    def add_initialization_task(self, message, on_done=None) -> int:
+        """
+        :param message: Raw socket message
+        :param on_done: callable called with finished job
+        :return: job id, JobQueueFull exception if queue is full
+        """
+        return self._jobs.submit(message, lambda: self._initialize_object(message), on_done).id
 
-        self._tasks.put(lambda: self._execute_command(message))
+    def add_command_execution_task(self, message, on_done=None) -> int:
+        """
+        :param message: Raw socket message
+        :param on_done: callable called with finished job
+        :return: job id, JobQueueFull exception if queue is full
+        """
+        return self._jobs.submit(message, lambda: self._execute_command(message), on_done).id
 
-    def _initialize_object(self, message):
+    def submit(self, message, on_done=None) -> int:
         """
-        method responsible to register automated tool object
+        Queues command, initialization command if interface is not initialized yet
         :param message: Raw socket message
-        :return: None
+        :param on_done: callable called with finished job, called from worker thread
+        :return: job id
         """
-        # time.sleep(3)
-        # self._results.put("executed initialize with success")
-        # return
-        logger.info(f"RUN _initialize_object: {message}")
-        command = Command(message)
-        method, args = command.dispatch()
-        if "initialize" not in method:
-            raise InvalidInitialization
-        self._obj = self._component_class.initialize(*args)
-        self._results.put("initialized")
+        if self._obj is None and tokenize(message)[0] == "initialize":
+            return self.add_initialization_task(message, on_done)
+        return self.add_command_execution_task(message, on_done)
 
-    def _execute_command(self, message: str):
+    def add_done_callback(self, job_id, callback) -> None:
+        """
+        :param job_id: job id
+        :param callback: callable called with finished job, called immediately if job is already finished
         """
+        self._jobs.add_done_callback(job_id, callback)
 
-        :param message:
-        :return:
+    def status(self, job_id) -> str:
+        """
+        :param job_id: job id
+        :return: job status: queued, running, done, failed or cancelled
         """
-        # time.sleep(3)
-        # self._results.put("executed CMD with success")
-        # return
-        logger.info(f"RUN _execute_command: {message}")
-        try:
-            command = Command(message)
-            result_ = command.execute(self._obj)
-        except Exception as error_:
-            result_ = error_
+        return self._jobs.get(job_id).status.value
 
-        self._results.put(result_)
+    def result(self, job_id):
+        """
+        :param job_id: job id
+        :return: job result if job is finished, job status otherwise
+        """
+        job = self._jobs.get(job_id)
+        if job.status not in FINISHED:
+            return f"Job {job.id} is {job.status.value}"
+        job.read = True
+        return job.result
 
+    def cancel(self, job_id) -> str:
+        """
+        :param job_id: job id
+        :return: cancellation result, only queued jobs can be cancelled
+        """
+        if self._jobs.cancel(job_id):
+            return f"Job {job_id} cancelled"
+        return f"Job {job_id} is {self.status(job_id)} and cannot be cancelled"
 
-class Command:
+    def jobs(self) -> str:
+        """
+        :return: one line per known job: id, status and message
+        """
+        return "\n".join(f"{job.id} {job.status.value} {job.message}" for job in self._jobs.jobs())
 
-    def __init__(self, command: str):
+    def latency(self) -> str:
         """
-        :param command: string command according to template:
-        command(arg1; arg2; ...; argN)
+        :return: summary of time between job submission and job start
         """
-        self.command = command
+        return self.start_latency.summary()
 
-    def dispatch(self) -> (str, tuple):
+    def join(self, timeout=None) -> None:
         """
-        Dispatch command to method string and tuple of arguments
-        :return: method string, tuple of arguments
+        Waits till worker thread stops, call after stop_interface
+        :param timeout: time to wait in seconds, None to wait forever
         """
-        args = re.search(ARGS_PATTERN, self.command)
-        method = re.search(METHOD_PATTERN, self.command)
-        if method is None:
-            raise CommandTemplateError
-        if args and args.group():
-            args = args.group().split(";")
-        else:
-            args = []
-        method = method.group()
-        return method, args
+        self._thread.join(timeout)
 
-    def execute(self, component: object):
+    def execute_interface_command(self, message: str) -> str:
         """
-        Executes command in accordance to mentioned message & automation component
-        :param component: automation component object
+        Executes command interface command, example: busy, status(3), submit(send_raw_service(10 03))
+        :param message: Raw socket message
         :return: result in string format
         """
-        method, args = self.dispatch()
-        if not hasattr(component, method):
+        match = re.fullmatch(INTERFACE_COMMAND_PATTERN, message.strip(), re.DOTALL)
+        if match is None or match.group(1) not in self.cmd_interface_commands:
             raise InvalidCommand
-        call = component.__getattribute__(method)
-        response = call(*args)
-        return str(response)
+        method, argument = match.groups()
+        if argument is None:
+            return str(self.__getattribute__(method)())
+        return str(self.__getattribute__(method)(argument))
+
+    def is_interface_command(self, message: str) -> bool:
+        match = re.fullmatch(INTERFACE_COMMAND_PATTERN, message.strip(), re.DOTALL)
+        return match is not None and match.group(1) in self.cmd_interface_commands
+
+    def _initialize_object(self, message):
+        """
+        method responsible to register automated tool object
+        :param message: Raw socket message
+        :return: None
+        """
+        logger.info("RUN _initialize_object: %s", message)
+        self._obj = CommandTable.for_class(self._component_class).initialize(message)
+        return "initialized"
+
+    def _execute_command(self, message: str):
+        """
+        Exceptions are left to worker thread, which marks job failed and stores exception as its result
+        :param message: Raw socket message
+        :return: command result
+        """
+        logger.debug("RUN _execute_command: %s", message)
+        return run_command(self._obj, message)
 
 
 if __name__ == "__main__":
+    configure_logging()
     obj = CommandInterface("temp")
-    logger.info(f"busy: {obj.busy()}")
-    logger.info(f"busy: {obj.get_result()}")
+    logger.info("busy: %s", obj.busy())
+    logger.info("busy: %s", obj.get_result())
     logger.info("Add task  1...")
     obj.add_command_execution_task('set_vehicle_project(MQB_2023_Brake)')
     # logger.info(f"Result  1: {obj.get_result()}")
@@ -183,13 +226,13 @@ if __name__ == "__main__":
     import time
 
     time.sleep(3)
-    logger.info(f"Result: {obj.get_result()}")
+    logger.info("Result: %s", obj.get_result())
     logger.info("Add task  2.1 ...")
     try:
         obj.add_command_execution_task('set_vehicle_project(MQB_2023_Brake)')
     except Exception as error:
         logger.info(error)
-    logger.info(f"Result: {obj.get_result()}")
-    logger.info(f"busy: {obj.busy()}")
+    logger.info("Result: %s", obj.get_result())
+    logger.info("busy: %s", obj.busy())
 
     obj.stop_interface()
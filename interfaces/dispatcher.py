@@ -0,0 +1,323 @@
+"""Command dispatch table compiled once per automation component class
+
+Command template: command(arg1; arg2; ...; argN)
+Arguments containing ';' or ')' can be quoted: flash("C:\\flash;v2 (final).odx")
+Nested commands keep their parentheses and quotes, example: batch(connect_to_ecu(3); send_raw_service(10 03))
+"""
+import inspect
+import re
+import time
+import typing
+from types import FunctionType
+
+from interfaces.custom_exceptions import CommandTemplateError, InvalidInitialization, InvalidCommand, InvalidArgument
+from odis.raw_service_codec import encode_request
+from modules.metrics import metrics
+
+# run of argument text up to next separator, quotes within argument are plain text
+TEXT_PATTERN = re.compile(r"[^();]+")
+QUOTES = "\"'"
+# suffix of awaitable counterpart of command, example: send_raw_service_async
+ASYNC_SUFFIX = "_async"
+TRUE_VALUES = {"true", "1", "yes", "on"}
+FALSE_VALUES = {"false", "0", "no", "off", ""}
+
+
+def tokenize(message: str) -> (str, list):
+    """
+    Splits command into method name and list of string arguments within single pass over message
+    Quote starts quoted text only at the beginning of an argument, example: flash(D:\\sw\\it's.odx)
+    :param message: string command according to template: command(arg1; arg2; ...; argN)
+    :return: method string, list of arguments
+    """
+    method, parenthesis, rest = message.partition("(")
+    method = method.strip()
+    if not parenthesis or not method or method[0] in QUOTES or ")" in method or ";" in method:
+        raise CommandTemplateError
+    body, parenthesis, tail = rest.partition(")")
+    if parenthesis and "(" not in body and '"' not in body and "'" not in body and ")" not in tail:
+        # plain command without quotes and nested commands, split by C level string methods
+        if tail.strip():
+            raise CommandTemplateError(f"Unexpected text after command: {message}")
+        if not body:
+            return method, []
+        return method, list(map(str.strip, body.split(";")))
+
+    args = []
+    parts = []
+    depth = 0
+    # True till first non-whitespace character of argument
+    at_start = True
+    index = 0
+    length = len(rest)
+    while index < length:
+        character = rest[index]
+        if at_start and character in QUOTES:
+            end = rest.find(character, index + 1)
+            if end < 0:
+                raise CommandTemplateError(f"Unterminated quote in command: {message}")
+            # nested command is kept verbatim, it is tokenized again when executed
+            parts.append((rest[index:end + 1], False) if depth else (rest[index + 1:end], True))
+            index = end + 1
+            at_start = False
+            continue
+        if character == "(":
+            depth += 1
+            parts.append((character, False))
+            at_start = True
+        elif character == ")":
+            if not depth:
+                if rest[index + 1:].strip():
+                    raise CommandTemplateError(f"Unexpected text after command: {message}")
+                if parts or args:
+                    args.append(_join(parts))
+                return method, args
+            depth -= 1
+            parts.append((character, False))
+            at_start = False
+        elif character == ";":
+            if depth:
+                parts.append((character, False))
+            else:
+                args.append(_join(parts))
+                parts = []
+            at_start = True
+        elif at_start and character.isspace():
+            if depth:
+                parts.append((character, False))
+            # whitespace before argument is dropped
+        else:
+            end = TEXT_PATTERN.match(rest, index).end()
+            parts.append((rest[index:end], False))
+            index = end
+            at_start = False
+            continue
+        index += 1
+    raise CommandTemplateError(f"Missing closing parenthesis in command: {message}")
+
+
+def _join(parts: list) -> str:
+    """
+    :param parts: list of (text, quoted) tuples forming single argument
+    :return: argument, whitespace around unquoted text is dropped
+    """
+    if not parts:
+        return ""
+    if len(parts) == 1:
+        text, quoted = parts[0]
+        return text if quoted else text.strip()
+    texts = [text for text, _ in parts]
+    if not parts[0][1]:
+        texts[0] = texts[0].lstrip()
+    if not parts[-1][1]:
+        texts[-1] = texts[-1].rstrip()
+    return "".join(texts)
+
+
+def to_int(value: str) -> int:
+    """
+    :param value: decimal or prefixed hex, octal or binary integer, example: '33114', '0x815A'
+    """
+    try:
+        # common case: decimal, leading zeros keep decimal meaning
+        return int(value)
+    except ValueError:
+        return int(value.strip(), 0)
+
+
+def to_bool(value: str) -> bool:
+    """
+    :param value: true/false, 1/0, yes/no or on/off, case insensitive
+    """
+    lowered = value.strip().lower()
+    if lowered in TRUE_VALUES:
+        return True
+    if lowered in FALSE_VALUES:
+        return False
+    raise ValueError(f"invalid boolean: {value!r}")
+
+
+# annotation: converter of string argument
+# str and Path arguments are passed as received, methods taking paths accept str
+CONVERTERS = {int: to_int,
+              float: float,
+              bool: to_bool,
+              bytes: encode_request}
+
+
+def _converter(annotation, default):
+    """
+    Chooses argument converter from parameter annotation, from type of default value if not annotated
+    :return: converter or None if argument is passed as received
+    """
+    if annotation is inspect.Parameter.empty:
+        if default is inspect.Parameter.empty or default is None:
+            return None
+        return CONVERTERS.get(type(default))
+    if typing.get_origin(annotation) is typing.Union:
+        members = typing.get_args(annotation)
+        if str in members:
+            # method converts string itself, example: send_raw_service(hex_command: Union[bytes, str])
+            return None
+        # members are tried in declaration order, string is kept as last resort
+        converters = [CONVERTERS[member] for member in members if member in CONVERTERS]
+        if not converters:
+            return None
+        return lambda value: _first_conversion(converters, value)
+    return CONVERTERS.get(annotation)
+
+
+def _first_conversion(converters: list, value: str):
+    for converter in converters:
+        try:
+            return converter(value)
+        except ValueError:
+            continue
+    return value
+
+
+class CommandSpec:
+    """
+    Compiled command: callable, argument converters and accepted number of arguments
+    """
+    __slots__ = ("name", "function", "converters", "rest_converter", "min_args", "max_args", "conversions")
+
+    def __init__(self, name: str, function, bound: bool = False) -> None:
+        """
+        :param name: command name
+        :param function: plain function called with component as first argument, or bound method
+        :param bound: True if function is bound method, example: classmethod accessed on class
+        """
+        self.name = name
+        self.function = function
+        self.converters = []
+        self.rest_converter = None
+        self.min_args = 0
+        self.max_args = 0
+        try:
+            hints = typing.get_type_hints(function)
+        except Exception:
+            hints = {}
+        parameters = list(inspect.signature(function).parameters.values())
+        if not bound:
+            parameters = parameters[1:]
+        for parameter in parameters:
+            annotation = hints.get(parameter.name, parameter.annotation)
+            if parameter.kind in (parameter.POSITIONAL_ONLY, parameter.POSITIONAL_OR_KEYWORD):
+                self.converters.append(_converter(annotation, parameter.default))
+                self.max_args += 1
+                if parameter.default is parameter.empty:
+                    self.min_args = self.max_args
+            elif parameter.kind == parameter.VAR_POSITIONAL:
+                self.rest_converter = _converter(annotation, parameter.empty)
+                self.max_args = None
+        # (position, converter) of arguments which are not passed as received
+        self.conversions = [(index, converter) for index, converter in enumerate(self.converters) if converter]
+
+    def coerce(self, args: list) -> list:
+        """
+        :param args: list of string arguments
+        :return: list of typed arguments, InvalidArgument exception if arguments do not fit signature
+        """
+        if len(args) < self.min_args or (self.max_args is not None and len(args) > self.max_args):
+            expected = self.min_args if self.min_args == self.max_args else \
+                f"{self.min_args} to {'any' if self.max_args is None else self.max_args}"
+            raise InvalidArgument(f"{self.name} expects {expected} argument(s), {len(args)} given")
+        if not self.conversions and self.rest_converter is None:
+            return args
+        values = list(args)
+        try:
+            for index, converter in self.conversions:
+                if index >= len(values):
+                    break
+                values[index] = converter(values[index])
+            if self.rest_converter is not None and len(values) > len(self.converters):
+                values[len(self.converters):] = map(self.rest_converter, values[len(self.converters):])
+        except ValueError as error:
+            raise InvalidArgument(f"Invalid argument of {self.name}: {error}")
+        return values
+
+
+class CommandTable:
+    """
+    Public methods of automation component class, built once per class
+    Unknown commands are rejected by table lookup, component is never inspected per message
+    Coroutine methods named <command>_async are kept apart as awaitable counterparts of commands
+    """
+    _tables = {}
+
+    def __init__(self, component_class) -> None:
+        self.component_class = component_class
+        self.commands = {}
+        self.awaitables = {}
+        # base classes first, so methods overridden by subclass win
+        for klass in reversed(inspect.getmro(component_class)):
+            for name, attribute in vars(klass).items():
+                if name.startswith("_"):
+                    continue
+                if isinstance(attribute, FunctionType) and inspect.iscoroutinefunction(attribute):
+                    if name.endswith(ASYNC_SUFFIX):
+                        self.awaitables[name[:-len(ASYNC_SUFFIX)]] = CommandSpec(name, attribute)
+                elif isinstance(attribute, FunctionType):
+                    self.commands[name] = CommandSpec(name, attribute)
+                else:
+                    self.commands.pop(name, None)
+        initialize = getattr(component_class, "initialize", None)
+        self.initializer = CommandSpec("initialize", initialize, bound=True) \
+            if inspect.ismethod(initialize) else None
+
+    @classmethod
+    def for_class(cls, component_class) -> "CommandTable":
+        """
+        :param component_class: automation component class, example: Odis
+        :return: cached command table of class
+        """
+        table = cls._tables.get(component_class)
+        if table is None:
+            table = cls._tables[component_class] = cls(component_class)
+        return table
+
+    def resolve(self, method: str, args: list) -> (CommandSpec, list):
+        """
+        :param method: command name
+        :param args: list of string arguments
+        :return: command spec and list of typed arguments
+        """
+        spec = self.commands.get(method)
+        if spec is None:
+            raise InvalidCommand(f"Invalid command accessed: {method}. Command was not found within automation "
+                                 f"component")
+        return spec, spec.coerce(args)
+
+    def compile(self, message: str) -> (CommandSpec, list):
+        """
+        :param message: string command according to template: command(arg1; arg2; ...; argN)
+        :return: command spec and list of typed arguments
+        """
+        return self.resolve(*tokenize(message))
+
+    def execute(self, component: object, method: str, args: list):
+        """
+        :param component: automation component object
+        :param method: command name
+        :param args: list of string arguments
+        :return: result in string format, bytes results are returned unchanged
+        """
+        start = time.perf_counter()
+        spec, values = self.resolve(method, args)
+        if metrics.enabled:
+            metrics.observe("command.dispatch", time.perf_counter() - start)
+        response = spec.function(component, *values)
+        if isinstance(response, bytes):
+            return response
+        return str(response)
+
+    def initialize(self, message: str):
+        """
+        :param message: initialization command, example: initialize(tool_path; configuration_path; tool_port)
+        :return: automation component object
+        """
+        method, args = tokenize(message)
+        if method != "initialize" or self.initializer is None:
+            raise InvalidInitialization
+        return self.initializer.function(*self.initializer.coerce(args))
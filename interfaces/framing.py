@@ -0,0 +1,283 @@
+"""Framed wire protocol
+
+Connection starts with handshake: FRAME_MAGIC followed by protocol version byte.
+Old CAPL DLL builds never send NUL byte thus bare string protocol is kept for them.
+After handshake every message is a frame:
+    length (4 bytes, big endian) | request id (4 bytes, big endian) | kind (1 byte) | body
+Length covers request id, kind and body. Replies carry request id of the request they answer,
+so client may pipeline several requests without waiting for each reply.
+Event frames (KIND_EVENT) are pushed by server without request, they carry request id of the subscribe command:
+    timestamp (8 bytes double, unix time) | sequence (4 bytes) | dropped (4 bytes) | samples
+    sample: DID (2 bytes) | response length (2 bytes) | response
+Sequence counts samples of the poll, dropped counts samples discarded for this client since its previous event.
+"""
+import socket
+import struct
+from collections import deque, namedtuple
+
+from interfaces.custom_exceptions import FramingError
+from modules.logger import get_logger
+
+logger = get_logger(__name__)
+
+FRAME_MAGIC = b"\x00ODF"
+PROTOCOL_VERSION = 1
+HANDSHAKE = FRAME_MAGIC + bytes((PROTOCOL_VERSION,))
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+KIND_COMMAND = 0x00
+KIND_OK = 0x80
+KIND_ERROR = 0x81
+KIND_OK_BYTES = 0x82
+KIND_EVENT = 0x83
+
+_LENGTH = struct.Struct("!I")
+_HEADER = struct.Struct("!IB")
+_EVENT_HEADER = struct.Struct("!dII")
+_SAMPLE_HEADER = struct.Struct("!HH")
+
+Frame = namedtuple("Frame", ["request_id", "kind", "body"])
+Event = namedtuple("Event", ["subscription", "timestamp", "sequence", "dropped", "samples"])
+
+
+def is_handshake(data: bytes) -> bool:
+    """
+    Checks whether first bytes of connection start framed protocol
+    :param data: first bytes received on connection
+    :return: True if framed protocol handshake, False for bare string protocol
+    """
+    return data.startswith(FRAME_MAGIC)
+
+
+def handshake_version(data: bytes) -> int:
+    """
+    :param data: handshake bytes
+    :return: protocol version requested by client
+    """
+    if len(data) < len(HANDSHAKE) or not is_handshake(data):
+        raise FramingError("Invalid handshake")
+    return data[len(FRAME_MAGIC)]
+
+
+def encode_frame(request_id: int, kind: int, body: bytes) -> bytes:
+    """
+    :param request_id: request id, replies carry id of the request
+    :param kind: frame kind, example: KIND_COMMAND
+    :param body: frame payload
+    :return: encoded frame
+    """
+    return _LENGTH.pack(_HEADER.size + len(body)) + _HEADER.pack(request_id, kind) + body
+
+
+def encode_samples(dids, responses) -> bytes:
+    """
+    :param dids: data identifiers
+    :param responses: response bytes per DID, empty if reading failed
+    :return: samples part of event body, shared by all subscribers of the poll
+    """
+    return b"".join(_SAMPLE_HEADER.pack(did, len(response)) + response for did, response in zip(dids, responses))
+
+
+def encode_event(request_id: int, timestamp: float, sequence: int, dropped: int, samples: bytes) -> bytes:
+    """
+    :param request_id: request id of subscribe command
+    :param timestamp: unix time of poll start
+    :param sequence: sample number of poll
+    :param dropped: samples discarded for subscriber since its previous event
+    :param samples: encoded samples, see encode_samples
+    :return: encoded event frame
+    """
+    return encode_frame(request_id, KIND_EVENT,
+                        _EVENT_HEADER.pack(timestamp, sequence & 0xFFFFFFFF, dropped & 0xFFFFFFFF) + samples)
+
+
+def decode_event(frame: Frame) -> Event:
+    """
+    :param frame: KIND_EVENT frame
+    :return: event with samples as dictionary DID: response bytes
+    """
+    timestamp, sequence, dropped = _EVENT_HEADER.unpack_from(frame.body)
+    samples = {}
+    offset = _EVENT_HEADER.size
+    while offset < len(frame.body):
+        did, length = _SAMPLE_HEADER.unpack_from(frame.body, offset)
+        offset += _SAMPLE_HEADER.size
+        samples[did] = frame.body[offset:offset + length]
+        offset += length
+    return Event(frame.request_id, timestamp, sequence, dropped, samples)
+
+
+class FrameDecoder:
+    """
+    Incremental decoder, collects received bytes and splits them into frames
+    """
+
+    def __init__(self, max_frame_size=MAX_FRAME_SIZE) -> None:
+        self._buffer = bytearray()
+        self._max_frame_size = max_frame_size
+
+    def feed(self, data: bytes) -> list:
+        """
+        :param data: bytes received from socket
+        :return: list of complete frames
+        """
+        self._buffer += data
+        frames = []
+        offset = 0
+        while len(self._buffer) - offset >= _LENGTH.size:
+            (length,) = _LENGTH.unpack_from(self._buffer, offset)
+            if not _HEADER.size <= length <= self._max_frame_size:
+                raise FramingError(f"Invalid frame length: {length}")
+            end = offset + _LENGTH.size + length
+            if len(self._buffer) < end:
+                break
+            request_id, kind = _HEADER.unpack_from(self._buffer, offset + _LENGTH.size)
+            body = bytes(self._buffer[offset + _LENGTH.size + _HEADER.size:end])
+            frames.append(Frame(request_id, kind, body))
+            offset = end
+        del self._buffer[:offset]
+        return frames
+
+
+def read_first_message(client_socket) -> bytes:
+    """
+    Reads first message of blocking socket connection
+    Framed handshake may be split by TCP thus it is completed before protocol is decided
+    :param client_socket: connected socket
+    :return: received bytes
+    """
+    data = client_socket.recv(1024)
+    while data and data.startswith(b"\x00") and len(data) < len(HANDSHAKE):
+        chunk = client_socket.recv(1024)
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def serve_frames(client_socket, data: bytes, process_message) -> None:
+    """
+    Serves framed protocol on blocking socket till client closes connection
+    Requests are executed in order of arrival and each reply is sent with request id
+    :param client_socket: connected socket
+    :param data: bytes received so far, starting with handshake
+    :param process_message: callable which gets command string and returns response
+    Malformed handshake or frame is answered with error frame carrying request id 0 and serving stops
+    """
+    try:
+        handshake_version(data)
+        client_socket.sendall(HANDSHAKE)
+        decoder = FrameDecoder()
+        data = data[len(HANDSHAKE):]
+
+        while True:
+            for frame in decoder.feed(data):
+                client_socket.sendall(process_frame(frame, process_message))
+            data = client_socket.recv(65536)
+            if not data:
+                return
+    except FramingError as error:
+        logger.info("Framing error: %s", error)
+        client_socket.sendall(encode_frame(0, KIND_ERROR, str(error).encode()))
+
+
+def process_frame(frame: Frame, process_message) -> bytes:
+    """
+    :param frame: received request frame
+    :param process_message: callable which gets command string and returns response
+    :return: encoded reply frame
+    """
+    try:
+        if frame.kind != KIND_COMMAND:
+            raise FramingError(f"Unsupported frame kind: {frame.kind}")
+        response = process_message(frame.body.decode())
+    except Exception as error:
+        return encode_frame(frame.request_id, KIND_ERROR, str(error).encode())
+    return encode_reply(frame.request_id, response)
+
+
+def encode_reply(request_id: int, response) -> bytes:
+    """
+    :param request_id: id of answered request
+    :param response: command result, bytes results are sent unchanged within KIND_OK_BYTES frame
+    :return: encoded reply frame
+    """
+    if isinstance(response, bytes):
+        return encode_frame(request_id, KIND_OK_BYTES, response)
+    return encode_frame(request_id, KIND_OK, str(response).encode())
+
+
+class FramedClient:
+    """
+    Blocking client for framed protocol
+    """
+
+    def __init__(self, host, port, timeout=None) -> None:
+        self.socket = socket.create_connection((host, port), timeout=timeout)
+        self.socket.sendall(HANDSHAKE)
+        self.version = handshake_version(self._receive_exactly(len(HANDSHAKE)))
+        self._decoder = FrameDecoder()
+        self._pending = []
+        self._events = deque()
+        self._next_id = 0
+
+    def _receive_exactly(self, size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            chunk = self.socket.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("Connection closed by server")
+            data += chunk
+        return data
+
+    def send(self, command: str) -> int:
+        """
+        Sends command without waiting for reply
+        :param command: command according to template: command(arg1; arg2; ...; argN)
+        :return: request id
+        """
+        self._next_id = (self._next_id + 1) & 0xFFFFFFFF
+        self.socket.sendall(encode_frame(self._next_id, KIND_COMMAND, command.encode()))
+        return self._next_id
+
+    def _receive_frames(self) -> None:
+        data = self.socket.recv(65536)
+        if not data:
+            raise ConnectionError("Connection closed by server")
+        for frame in self._decoder.feed(data):
+            (self._events if frame.kind == KIND_EVENT else self._pending).append(frame)
+
+    def receive(self, request_id=None) -> Frame:
+        """
+        :param request_id: id of awaited reply, None for next reply in order of arrival
+        :return: reply frame, events are kept for receive_event
+        """
+        while True:
+            for index, frame in enumerate(self._pending):
+                if request_id is None or frame.request_id == request_id:
+                    return self._pending.pop(index)
+            self._receive_frames()
+
+    def receive_event(self) -> Event:
+        """
+        :return: next event pushed by server, see subscribe command of async socket server
+        """
+        while not self._events:
+            self._receive_frames()
+        return decode_event(self._events.popleft())
+
+    def call(self, command: str):
+        """
+        Sends command and waits for its reply
+        :param command: command according to template: command(arg1; arg2; ...; argN)
+        :return: reply body, bytes for KIND_OK_BYTES replies, exception raised with reply body for error replies
+        """
+        frame = self.receive(self.send(command))
+        if frame.kind == KIND_ERROR:
+            raise RuntimeError(frame.body.decode())
+        if frame.kind == KIND_OK_BYTES:
+            return frame.body
+        return frame.body.decode()
+
+    def close(self) -> None:
+        self.socket.close()
@@ -0,0 +1,206 @@
+"""Job queue of detached command interface"""
+import threading
+import time
+from collections import OrderedDict, deque
+from enum import Enum
+
+from modules.custom_exceptions import JobQueueFull, JobNotFound
+from modules.logger import get_logger
+
+logger = get_logger(__name__)
+
+MAX_PENDING_JOBS = 64
+MAX_RESULTS = 256
+RESULT_TTL = 600
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+FINISHED = (JobStatus.DONE, JobStatus.FAILED, JobStatus.CANCELLED)
+
+
+class Job:
+    def __init__(self, job_id: int, message: str, operation) -> None:
+        """
+        :param job_id: job id
+        :param message: raw socket message
+        :param operation: callable executing message and returning result
+        """
+        self.id = job_id
+        self.message = message
+        self.operation = operation
+        self.status = JobStatus.QUEUED
+        self.result = None
+        self.read = False
+        self.submitted_at = None
+        self.started_at = None
+        self.finished_at = None
+        self.callbacks = []
+
+
+class JobQueue:
+    """
+    Bounded FIFO of pending jobs and store of finished jobs
+    Finished jobs are evicted when store exceeds max_results or after result_ttl seconds
+    """
+
+    def __init__(self, max_pending=MAX_PENDING_JOBS, max_results=MAX_RESULTS, result_ttl=RESULT_TTL,
+                 clock=time.monotonic) -> None:
+        self.max_pending = max_pending
+        self.max_results = max_results
+        self.result_ttl = result_ttl
+        self._clock = clock
+        self._pending = deque()
+        self._jobs = {}
+        self._finished = OrderedDict()
+        self._next_id = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def submit(self, message: str, operation, on_done=None) -> Job:
+        """
+        :param message: raw socket message
+        :param operation: callable executing message and returning result
+        :param on_done: callable called with finished job
+        :return: queued job, JobQueueFull exception if max_pending jobs are queued
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Job queue is closed")
+            if len(self._pending) >= self.max_pending:
+                raise JobQueueFull
+            self._next_id += 1
+            job = Job(self._next_id, message, operation)
+            if on_done is not None:
+                job.callbacks.append(on_done)
+            job.submitted_at = self._clock()
+            self._jobs[job.id] = job
+            self._pending.append(job)
+            self._condition.notify()
+            return job
+
+    def next(self, timeout=None):
+        """
+        Blocks till job is queued, takes oldest queued job and marks it running
+        :param timeout: time to wait for job in seconds, None to wait till job is queued or queue is closed
+        :return: job or None if queue was closed or no job was queued within timeout
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._pending or self._closed, timeout)
+            if self._closed or not self._pending:
+                return None
+            job = self._pending.popleft()
+            job.status = JobStatus.RUNNING
+            job.started_at = self._clock()
+            return job
+
+    def finish(self, job: Job, result, failed: bool = False) -> None:
+        with self._condition:
+            job.result = result
+            job.status = JobStatus.FAILED if failed else JobStatus.DONE
+            self._store(job)
+        self._run_callbacks(job)
+
+    @staticmethod
+    def _run_callbacks(job: Job) -> None:
+        callbacks, job.callbacks = job.callbacks, []
+        for callback in callbacks:
+            try:
+                callback(job)
+            except Exception as error:
+                logger.error("Completion callback of job %s failed: %s", job.id, error)
+
+    def add_done_callback(self, job_id: int, callback) -> None:
+        """
+        :param job_id: job id
+        :param callback: callable called with finished job, called immediately if job is already finished
+        """
+        with self._condition:
+            job = self.get(job_id)
+            if job.status not in FINISHED:
+                job.callbacks.append(callback)
+                return
+        callback(job)
+
+    def close(self) -> None:
+        """
+        Cancels queued jobs and wakes up waiting worker
+        """
+        with self._condition:
+            self._closed = True
+            cancelled = list(self._pending)
+            self._pending.clear()
+            for job in cancelled:
+                job.status = JobStatus.CANCELLED
+                self._store(job)
+            self._condition.notify_all()
+        for job in cancelled:
+            self._run_callbacks(job)
+
+    def _store(self, job: Job) -> None:
+        job.finished_at = self._clock()
+        job.operation = None
+        self._finished[job.id] = job
+        self._evict()
+
+    def _evict(self) -> None:
+        now = self._clock()
+        while self._finished:
+            job = next(iter(self._finished.values()))
+            if len(self._finished) <= self.max_results and now - job.finished_at <= self.result_ttl:
+                break
+            del self._finished[job.id]
+            del self._jobs[job.id]
+
+    def cancel(self, job_id: int) -> bool:
+        """
+        :param job_id: job id
+        :return: True if queued job was cancelled, False if job already runs or is finished
+        """
+        with self._condition:
+            job = self.get(job_id)
+            if job.status != JobStatus.QUEUED:
+                return False
+            self._pending.remove(job)
+            job.status = JobStatus.CANCELLED
+            self._store(job)
+        self._run_callbacks(job)
+        return True
+
+    def get(self, job_id: int) -> Job:
+        """
+        :param job_id: job id
+        :return: job, JobNotFound exception if job is unknown or evicted
+        """
+        with self._condition:
+            self._evict()
+            try:
+                return self._jobs[int(job_id)]
+            except KeyError:
+                raise JobNotFound(f"Job {job_id} not found, it was never submitted or its result was evicted")
+
+    def oldest_unread(self):
+        """
+        :return: oldest finished job whose result was not read yet, None if there is no such job
+        """
+        with self._condition:
+            self._evict()
+            for job in self._finished.values():
+                if not job.read and job.status != JobStatus.CANCELLED:
+                    return job
+            return None
+
+    def jobs(self) -> list:
+        with self._condition:
+            self._evict()
+            return list(self._jobs.values())
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
@@ -0,0 +1,85 @@
+"""Sessions binding socket connections to automation component objects"""
+import asyncio
+
+from interfaces.command_interface import CommandInterface
+from interfaces.dispatcher import tokenize
+
+
+class Session:
+    """
+    Automation component binding shared by one or several socket connections
+    Commands of a session are serialized as automation component is not thread safe
+    """
+
+    def __init__(self, name, component_class) -> None:
+        """
+        :param name: session name, None for private (per connection) session
+        :param component_class: automation component class, example: Odis
+        """
+        self.name = name
+        self.command_interface = CommandInterface(component_class)
+        self.lock = asyncio.Lock()
+        self.clients = 0
+
+    @property
+    def initialized(self) -> bool:
+        return self.command_interface.obj is not None
+
+    async def handle_message(self, message: str, run):
+        """
+        Initializes session with first message or executes command on session component
+        :param message: raw socket message
+        :param run: coroutine function which runs blocking callable outside of event loop
+        :return: response to be sent back to client
+        """
+        async with self.lock:
+            if not self.initialized:
+                return await run(self.command_interface.initialize_object, message)
+            method, _ = tokenize(message)
+            if method == "initialize":
+                return f"Session {self.name} already initialized"
+            return await self.command_interface.execute_command_async(message, run)
+
+
+class SessionRegistry:
+    """
+    Keeps named sessions which can be joined by several connections
+    """
+
+    def __init__(self, component_class) -> None:
+        self._component_class = component_class
+        self._sessions = {}
+
+    @property
+    def sessions(self) -> dict:
+        return dict(self._sessions)
+
+    def create_private(self) -> Session:
+        """
+        Creates session used by single connection only
+        :return: new not registered session
+        """
+        session = Session(None, self._component_class)
+        session.clients += 1
+        return session
+
+    def join(self, name: str) -> Session:
+        """
+        Joins named session, session is created if it does not exist yet
+        :param name: session name
+        :return: named session
+        """
+        session = self._sessions.get(name)
+        if session is None:
+            session = Session(name, self._component_class)
+            self._sessions[name] = session
+        session.clients += 1
+        return session
+
+    def release(self, session: Session) -> None:
+        """
+        Releases session at connection close
+        Named sessions are kept alive so ODIS stays opened for next connections
+        :param session: session used by closed connection
+        """
+        session.clients -= 1
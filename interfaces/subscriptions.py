@@ -0,0 +1,259 @@
+"""Cyclic DID polling pushed to framed socket clients
+
+subscribe(F190 F18C; 100; 0) - read DIDs every 100 ms on connection handle (0: current handle of session)
+unsubscribe(<request id of subscribe>)
+
+Subscriptions of the same session with equal DIDs, period and handle share one poll, so ECU is read once
+per period however many clients listen. Every client has bounded queue of samples: when client reads slower
+than samples arrive, oldest samples are dropped and the next event reports how many, poll itself never waits
+for clients.
+Reads of a poll hold the session lock, so they never run together with commands of the session, and are
+skipped while component reports background_paused (Odis does during flashing).
+"""
+import asyncio
+import time
+from collections import deque
+from contextlib import nullcontext
+
+from interfaces.framing import encode_event, encode_samples
+from modules.logger import get_logger
+
+logger = get_logger(__name__)
+
+SUBSCRIPTION_METHODS = ("subscribe", "unsubscribe", "subscriptions")
+MIN_PERIOD = 0.01
+# samples kept per client, older ones are dropped when client does not keep up
+MAX_QUEUED_SAMPLES = 4
+
+
+def parse_dids(text: str) -> tuple:
+    """
+    :param text: DIDs in hex separated by space or comma, example: 'F190 F18C'
+    :return: tuple of DIDs
+    """
+    dids = tuple(int(item, 16) for item in text.replace(",", " ").split())
+    if not dids or any(not 0 <= did <= 0xFFFF for did in dids):
+        raise ValueError(f"DIDs expected in hex, example: F190 F18C, got: {text}")
+    return dids
+
+
+class Subscriber:
+    """
+    Client of a poll, samples wait in bounded queue till they are written to client socket
+    """
+
+    def __init__(self, connection: object, request_id: int, writer, max_queued: int = MAX_QUEUED_SAMPLES) -> None:
+        self.connection = connection
+        self.request_id = request_id
+        self.writer = writer
+        self.samples = deque()
+        self.max_queued = max_queued
+        self.dropped = 0
+        self.dropped_total = 0
+        self.ready = asyncio.Event()
+        self.task = None
+
+    def push(self, timestamp: float, sequence: int, samples: bytes) -> None:
+        if len(self.samples) >= self.max_queued:
+            self.samples.popleft()
+            self.dropped += 1
+            self.dropped_total += 1
+        self.samples.append((timestamp, sequence, samples))
+        self.ready.set()
+
+    async def deliver(self) -> None:
+        """
+        Writes queued samples as event frames, waits while socket buffer is full
+        """
+        while True:
+            await self.ready.wait()
+            self.ready.clear()
+            while self.samples:
+                timestamp, sequence, samples = self.samples.popleft()
+                self.writer.write(encode_event(self.request_id, timestamp, sequence, self.dropped, samples))
+                self.dropped = 0
+                try:
+                    await self.writer.drain()
+                except ConnectionError:
+                    # connection close removes subscriptions of connection
+                    return
+
+
+class DidPoll:
+    """
+    Reads DIDs of one connection handle once per period for all its subscribers
+    """
+
+    def __init__(self, component: object, handle: int, dids: tuple, period: float, lock=None) -> None:
+        """
+        :param lock: asyncio lock of session commands held while DIDs are read, None if reads need no lock
+        """
+        self.component = component
+        self.handle = handle
+        self.dids = dids
+        self.period = period
+        self.lock = lock
+        self.requests = [bytes((0x22, did >> 8, did & 0xFF)) for did in dids]
+        self.subscribers = []
+        self.sequence = 0
+        self.overruns = 0
+        # periods skipped because component paused background traffic
+        self.paused = 0
+        self.task = None
+
+    def read(self) -> list:
+        """
+        :return: response per DID, empty bytes if reading failed
+        """
+        responses = []
+        for request in self.requests:
+            try:
+                responses.append(self.component.send_raw_service_bytes_to_handle(self.handle, request))
+            except Exception as error:
+                logger.debug("Polling %s on handle %s failed: %s", request.hex(" "), self.handle, error)
+                responses.append(b"")
+        return responses
+
+    async def run(self, run_blocking) -> None:
+        """
+        Polls till last subscriber leaves, missed periods are skipped and counted as overruns
+        :param run_blocking: coroutine function which runs blocking callable outside of event loop
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        while self.subscribers:
+            async with self.lock if self.lock is not None else nullcontext():
+                if getattr(self.component, "background_paused", False):
+                    responses = None
+                else:
+                    timestamp = time.time()
+                    responses = await run_blocking(self.read)
+            if responses is None:
+                self.paused += 1
+            else:
+                samples = encode_samples(self.dids, responses)
+                self.sequence += 1
+                for subscriber in self.subscribers:
+                    subscriber.push(timestamp, self.sequence, samples)
+            deadline += self.period
+            now = loop.time()
+            if deadline < now:
+                skipped = int((now - deadline) / self.period) + 1
+                self.overruns += skipped
+                deadline += skipped * self.period
+            await asyncio.sleep(deadline - now)
+
+
+class SubscriptionHub:
+    """
+    Polls of one socket server, keyed by component, handle, DIDs and period
+    """
+
+    def __init__(self, run_blocking) -> None:
+        """
+        :param run_blocking: coroutine function which runs blocking callable outside of event loop
+        """
+        self._run_blocking = run_blocking
+        self._polls = {}
+
+    def handle(self, method: str, args: list, connection: object, request_id: int, writer, component,
+               lock=None) -> str:
+        """
+        :param method: one of SUBSCRIPTION_METHODS
+        :param args: command arguments
+        :param connection: connection owning subscriptions
+        :param request_id: request id of command frame
+        :param writer: stream writer of connection
+        :param component: automation component of connection session
+        :param lock: asyncio lock serializing commands of connection session
+        :return: response
+        """
+        if method == "subscribe":
+            if component is None:
+                raise ValueError("Session is not initialized")
+            if len(args) not in (2, 3):
+                raise ValueError("Expected: subscribe(DIDs; period in ms; connection handle)")
+            handle = int(args[2], 0) if len(args) == 3 and args[2] else 0
+            return self.subscribe(connection, request_id, writer, component, parse_dids(args[0]),
+                                  float(args[1]) / 1000, handle or component.connection_handle, lock)
+        if method == "unsubscribe":
+            if len(args) != 1:
+                raise ValueError("Expected: unsubscribe(request id of subscribe)")
+            return self.unsubscribe(connection, int(args[0]))
+        return self.summary()
+
+    def subscribe(self, connection: object, request_id: int, writer, component, dids: tuple, period: float,
+                  handle: int, lock=None) -> str:
+        """
+        Adds subscriber to poll with the same component, handle, DIDs and period or starts new poll
+        :param lock: asyncio lock serializing commands of component, held while poll reads
+        :return: response, events carry request_id
+        """
+        if period < MIN_PERIOD:
+            raise ValueError(f"Period shall be at least {MIN_PERIOD * 1000:g} ms")
+        if handle is None:
+            raise ConnectionError("No ECU connected, connection handle expected")
+        key = (id(component), handle, dids, period)
+        poll = self._polls.get(key)
+        if poll is None:
+            poll = self._polls[key] = DidPoll(component, handle, dids, period, lock)
+        subscriber = Subscriber(connection, request_id, writer)
+        subscriber.task = asyncio.ensure_future(subscriber.deliver())
+        poll.subscribers.append(subscriber)
+        if poll.task is None:
+            self._start(key, poll)
+        return f"Subscribed {request_id}: {len(dids)} DIDs every {period * 1000:g} ms on handle {handle}, " \
+               f"{len(poll.subscribers)} subscribers"
+
+    def _start(self, key, poll: DidPoll) -> None:
+        poll.task = asyncio.ensure_future(poll.run(self._run_blocking))
+        poll.task.add_done_callback(lambda task: self._finished(key, task))
+
+    def _finished(self, key, task) -> None:
+        failed = not task.cancelled() and task.exception() is not None
+        if failed:
+            logger.error("DID poll stopped: %s", task.exception())
+        poll = self._polls.get(key)
+        if poll is None or poll.task is not task:
+            return
+        if poll.subscribers and not failed:
+            # subscriber joined after poll saw no subscriber left
+            self._start(key, poll)
+            return
+        del self._polls[key]
+        for subscriber in poll.subscribers:
+            subscriber.task.cancel()
+
+    def _remove(self, matches) -> int:
+        removed = 0
+        for poll in list(self._polls.values()):
+            for subscriber in [subscriber for subscriber in poll.subscribers if matches(subscriber)]:
+                poll.subscribers.remove(subscriber)
+                subscriber.task.cancel()
+                removed += 1
+            # poll task ends at next period when no subscriber is left
+        return removed
+
+    def unsubscribe(self, connection: object, request_id: int) -> str:
+        removed = self._remove(lambda subscriber: subscriber.connection is connection
+                               and subscriber.request_id == request_id)
+        if not removed:
+            raise ValueError(f"No subscription {request_id}")
+        return f"Unsubscribed {request_id}"
+
+    def release(self, connection: object) -> None:
+        """
+        Removes subscriptions of closed connection
+        """
+        self._remove(lambda subscriber: subscriber.connection is connection)
+
+    def summary(self) -> str:
+        """
+        :return: one line per poll
+        """
+        lines = [f"handle {poll.handle} DIDs {' '.join(f'{did:04X}' for did in poll.dids)} "
+                 f"period={poll.period * 1000:g}ms subscribers={len(poll.subscribers)} samples={poll.sequence} "
+                 f"overruns={poll.overruns} paused={poll.paused} "
+                 f"dropped={sum(subscriber.dropped_total for subscriber in poll.subscribers)}"
+                 for poll in self._polls.values()]
+        return "\n".join(lines) or "No subscriptions"
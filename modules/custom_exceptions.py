@@ -25,3 +25,33 @@ class TaskQueueIsEmpty(Exception):
 class Busy(Exception):
     def __init__(self, message="Thread is currently busy with other running task"):
         super().__init__(message)
+
+
+class StartupTimeout(RuntimeError):
+    def __init__(self, message="Application did not start within timeout time"):
+        super().__init__(message)
+
+
+class JobQueueFull(Exception):
+    def __init__(self, message="Job queue is full, please wait till queued jobs are executed"):
+        super().__init__(message)
+
+
+class JobNotFound(Exception):
+    def __init__(self, message="Job not found, it was never submitted or its result was evicted"):
+        super().__init__(message)
+
+
+class CampaignValidationError(Exception):
+    def __init__(self, message="Flash campaign is not valid, no ECU was flashed"):
+        super().__init__(message)
+
+
+class ReplayMismatch(LookupError):
+    def __init__(self, message="Request was not recorded within replayed session"):
+        super().__init__(message)
+
+
+class SequenceSyntaxError(ValueError):
+    def __init__(self, message="Sequence script is not valid, nothing was sent"):
+        super().__init__(message)
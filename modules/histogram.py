@@ -0,0 +1,84 @@
+"""Latency histogram with fixed exponential buckets"""
+import bisect
+import threading
+
+# bucket upper bounds in seconds: 100us doubling up to ~210s
+DEFAULT_BOUNDS = tuple(0.0001 * 2 ** index for index in range(22))
+
+
+class LatencyHistogram:
+    """
+    Thread safe histogram, recording costs one bisect and one counter increment
+    Percentiles are estimated by upper bound of the bucket holding requested rank
+    """
+
+    def __init__(self, bounds=DEFAULT_BOUNDS) -> None:
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        index = bisect.bisect_left(self.bounds, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, fraction: float) -> float:
+        """
+        :param fraction: percentile as fraction, example: 0.99
+        :return: estimated percentile in seconds, 0.0 if nothing was recorded
+        """
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = max(1, round(fraction * self.count))
+            cumulative = 0
+            for index, count in enumerate(self.counts):
+                cumulative += count
+                if cumulative >= rank:
+                    if index == len(self.bounds):
+                        return self.max
+                    return min(self.bounds[index], self.max)
+            return self.max
+
+    def snapshot(self) -> dict:
+        """
+        :return: count, mean, p50, p95, p99 and max in seconds
+        """
+        with self._lock:
+            count, total, maximum = self.count, self.sum, self.max
+        return {"count": count,
+                "mean": total / count if count else 0.0,
+                "p50": self.percentile(0.50),
+                "p95": self.percentile(0.95),
+                "p99": self.percentile(0.99),
+                "max": maximum}
+
+    def buckets(self) -> (list, int, float):
+        """
+        :return: consistent copy of per-bucket counts (last bucket counts values above largest bound), count and sum
+        """
+        with self._lock:
+            return list(self.counts), self.count, self.sum
+
+    def summary(self) -> str:
+        """
+        :return: one line summary with latencies in milliseconds
+        """
+        snapshot = self.snapshot()
+        return (f"count={snapshot['count']} mean={snapshot['mean'] * 1000:.3f}ms "
+                f"p50<={snapshot['p50'] * 1000:.3f}ms p95<={snapshot['p95'] * 1000:.3f}ms "
+                f"p99<={snapshot['p99'] * 1000:.3f}ms max={snapshot['max'] * 1000:.3f}ms")
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counts = [0] * (len(self.bounds) + 1)
+            self.count = 0
+            self.sum = 0.0
+            self.max = 0.0
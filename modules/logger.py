@@ -1,25 +1,126 @@
+"""Logging of all modules through one queue
+
+Modules get their logger with get_logger(__name__), all loggers are children of ROOT_NAME logger.
+Records are put into a queue by the calling thread, formatting and file/console output happen
+in QueueListener thread. Nothing is written, and no log file is created, until configure_logging is called.
+
+Example:
+    configure_logging(levels={"interfaces.session": "DEBUG"})  # console and odis_<timestamp>.log
+    configure_logging(path=None)  # console only
+"""
+import atexit
 import logging
+import os
+import queue
+import threading
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
-# Create a logger object
-logger = logging.getLogger(__name__)
+ROOT_NAME = "odis"
+FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+MAX_BYTES = 10 * 1024 * 1024
+BACKUP_COUNT = 5
+# per-module levels, example: ODIS_LOG_LEVELS="interfaces.session=DEBUG,odis.fast_path=WARNING"
+LEVELS_VARIABLE = "ODIS_LOG_LEVELS"
 
-# Set the logging level (you can adjust this as needed)
-logger.setLevel(logging.INFO)
+_listener = None
+_queue_handler = None
+_lock = threading.Lock()
+
+
+def _logger_name(name: str) -> str:
+    return name if name == ROOT_NAME or name.startswith(ROOT_NAME + ".") else f"{ROOT_NAME}.{name}"
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    :param name: module name, usually __name__
+    :return: logger of module, child of ROOT_NAME logger
+    """
+    return logging.getLogger(_logger_name(name))
+
+
+class _QueueHandler(QueueHandler):
+    """
+    Puts records into queue without formatting them, only message arguments are merged
+    so later changes of argument objects do not change logged message
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
 
-# Create a file handler to log to a file (optional)
-file_handler = logging.FileHandler(f'odis_{datetime.now().strftime("%Y_%m_%d_%H_%M_%S")}.log')
-file_handler.setLevel(logging.INFO)
 
-# Create a console handler to log to the console (optional)
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
+def _parse_levels(value: str) -> dict:
+    levels = {}
+    for item in filter(None, (item.strip() for item in value.split(","))):
+        name, _, level = item.partition("=")
+        levels[name.strip()] = level.strip().upper()
+    return levels
 
-# Define a formatter for log messages
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-file_handler.setFormatter(formatter)
-console_handler.setFormatter(formatter)
 
-# Add the handlers to the logger
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
+def default_log_path() -> str:
+    return f'odis_{datetime.now().strftime("%Y_%m_%d_%H_%M_%S")}.log'
+
+
+def configure_logging(level=logging.INFO, path: str = "", console=True, levels: dict = None,
+                      max_bytes: int = MAX_BYTES, backup_count: int = BACKUP_COUNT):
+    """
+    (Re)configures logging of all modules, may be called again to change configuration
+    :param level: level of ROOT_NAME logger
+    :param path: log file, empty string for odis_<timestamp>.log, None for no log file
+    :param console: True to write records also to stderr, stream to write them to, False for no console output
+    :param levels: per-module levels, example: {"interfaces.session": "DEBUG"}, default: LEVELS_VARIABLE environment
+    :param max_bytes: size of log file at which it is rotated
+    :param backup_count: number of rotated log files kept
+    :return: log file path, None if records are not written to file
+    """
+    global _listener, _queue_handler
+    if path == "":
+        path = default_log_path()
+    if levels is None:
+        levels = _parse_levels(os.environ.get(LEVELS_VARIABLE, ""))
+
+    formatter = logging.Formatter(FORMAT)
+    handlers = []
+    if path is not None:
+        handlers.append(RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"))
+    if console:
+        handlers.append(logging.StreamHandler(None if console is True else console))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    with _lock:
+        shutdown_logging()
+        root = logging.getLogger(ROOT_NAME)
+        root.setLevel(level)
+        for name, module_level in levels.items():
+            logging.getLogger(_logger_name(name)).setLevel(module_level)
+        records = queue.SimpleQueue()
+        _queue_handler = _QueueHandler(records)
+        root.addHandler(_queue_handler)
+        _listener = QueueListener(records, *handlers)
+        _listener.start()
+    return path
+
+
+def shutdown_logging() -> None:
+    """
+    Writes queued records and closes handlers, called at exit
+    """
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger(ROOT_NAME).removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
+logger = logging.getLogger(ROOT_NAME)
+logger.setLevel(logging.INFO)
@@ -0,0 +1,279 @@
+"""Operation metrics: call count, error count and latency histogram per operation, flash throughput
+
+Operations are named by layer:
+    command.dispatch - resolution and argument conversion of socket command
+    odis.<method> - public Odis method, includes zeep and ODIS time
+    service.<operation> - SOAP call of ODIS automation service, includes zeep serialization and ODIS time
+    fast_path.sendRawService - sendRawService sent without zeep
+
+Example:
+    print(metrics.summary())
+    metrics.write_prometheus("C:\\metrics\\odis.prom")  # textfile collector of node exporter
+    metrics.serve_prometheus(9464)  # http://127.0.0.1:9464/metrics
+"""
+import functools
+import os
+import threading
+import time
+
+from modules.histogram import LatencyHistogram
+
+# flash duration bucket upper bounds in seconds: 1s doubling up to ~4.5h
+FLASH_BOUNDS = tuple(2.0 ** index for index in range(15))
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class OperationStats:
+    __slots__ = ("errors", "histogram")
+
+    def __init__(self) -> None:
+        self.errors = 0
+        self.histogram = LatencyHistogram()
+
+
+class MetricsRegistry:
+    """
+    Thread safe collection of operation metrics
+    Recording costs two perf_counter calls and one histogram update, set enabled to False to skip it
+    """
+
+    def __init__(self) -> None:
+        self.enabled = True
+        self._operations = {}
+        self._lock = threading.Lock()
+        self.flash_duration = LatencyHistogram(FLASH_BOUNDS)
+        self.flash_bytes = 0
+        self.flash_errors = 0
+
+    def operation(self, name: str) -> OperationStats:
+        stats = self._operations.get(name)
+        if stats is None:
+            with self._lock:
+                stats = self._operations.setdefault(name, OperationStats())
+        return stats
+
+    def observe(self, name: str, seconds: float, error: bool = False) -> None:
+        """
+        :param name: operation name, example: odis.send_raw_service
+        :param seconds: operation latency
+        :param error: True if operation raised exception
+        """
+        stats = self.operation(name)
+        stats.histogram.record(seconds)
+        if error:
+            with self._lock:
+                stats.errors += 1
+
+    def record_flash(self, duration: float, container_size: int, error: bool = False) -> None:
+        """
+        :param duration: flash duration in seconds
+        :param container_size: flashed container size in bytes
+        :param error: True if flashing failed
+        """
+        self.flash_duration.record(float(duration or 0.0))
+        with self._lock:
+            if error:
+                self.flash_errors += 1
+            else:
+                self.flash_bytes += int(container_size or 0)
+
+    def snapshot(self) -> dict:
+        """
+        :return: per operation count, errors, mean, p50, p95, p99 and max in seconds, flash duration and throughput
+        """
+        with self._lock:
+            operations = dict(self._operations)
+        snapshot = {name: dict(stats.histogram.snapshot(), errors=stats.errors)
+                    for name, stats in sorted(operations.items())}
+        flash = self.flash_duration.snapshot()
+        flash_time = flash["mean"] * flash["count"]
+        snapshot["flash"] = dict(flash, errors=self.flash_errors, bytes=self.flash_bytes,
+                                 bytes_per_second=self.flash_bytes / flash_time if flash_time else 0.0)
+        return snapshot
+
+    def summary(self) -> str:
+        """
+        :return: one line per operation with latencies in milliseconds, flash throughput line
+        """
+        snapshot = self.snapshot()
+        flash = snapshot.pop("flash")
+        lines = []
+        for name, stats in snapshot.items():
+            lines.append(f"{name} count={stats['count']} errors={stats['errors']} "
+                         f"p50<={stats['p50'] * 1000:.3f}ms p95<={stats['p95'] * 1000:.3f}ms "
+                         f"p99<={stats['p99'] * 1000:.3f}ms max={stats['max'] * 1000:.3f}ms")
+        lines.append(f"flash count={flash['count']} errors={flash['errors']} mean={flash['mean']:.1f}s "
+                     f"bytes={flash['bytes']} throughput={flash['bytes_per_second'] / 1024:.1f}KiB/s")
+        return "\n".join(lines)
+
+    def prometheus(self) -> str:
+        """
+        :return: metrics in Prometheus text exposition format
+        """
+        lines = ["# HELP odis_operation_seconds Latency of socket command dispatch, Odis methods and SOAP calls",
+                 "# TYPE odis_operation_seconds histogram"]
+        with self._lock:
+            operations = sorted(self._operations.items())
+        for name, stats in operations:
+            lines.extend(_histogram_lines("odis_operation_seconds", stats.histogram, f'operation="{name}"'))
+        lines.extend(["# HELP odis_operation_errors_total Operations which raised exception",
+                      "# TYPE odis_operation_errors_total counter"])
+        lines.extend(f'odis_operation_errors_total{{operation="{name}"}} {stats.errors}' for name, stats in operations)
+
+        flash = self.snapshot()["flash"]
+        lines.extend(["# HELP odis_flash_duration_seconds Flash duration reported by ODIS",
+                      "# TYPE odis_flash_duration_seconds histogram",
+                      *_histogram_lines("odis_flash_duration_seconds", self.flash_duration),
+                      "# HELP odis_flash_errors_total Failed flash sessions",
+                      "# TYPE odis_flash_errors_total counter",
+                      f"odis_flash_errors_total {flash['errors']}",
+                      "# HELP odis_flash_container_bytes_total Size of successfully flashed containers",
+                      "# TYPE odis_flash_container_bytes_total counter",
+                      f"odis_flash_container_bytes_total {flash['bytes']}",
+                      "# HELP odis_flash_throughput_bytes_per_second Flashed bytes per second of flash duration",
+                      "# TYPE odis_flash_throughput_bytes_per_second gauge",
+                      f"odis_flash_throughput_bytes_per_second {flash['bytes_per_second']:.3f}"])
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        """
+        Writes metrics atomically, so textfile collectors never read partial file
+        :param path: output file, usually with .prom extension
+        """
+        temporary_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            file.write(self.prometheus())
+        os.replace(temporary_path, path)
+
+    def serve_prometheus(self, port: int, host: str = "127.0.0.1") -> "ThreadingHTTPServer":
+        """
+        Serves metrics at http://host:port/metrics from daemon thread
+        :return: HTTP server, call shutdown() to stop it
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics_http", daemon=True).start()
+        return server
+
+    def reset(self) -> None:
+        with self._lock:
+            self._operations.clear()
+            self.flash_bytes = 0
+            self.flash_errors = 0
+        self.flash_duration.reset()
+
+
+def _histogram_lines(metric: str, histogram: LatencyHistogram, labels: str = "") -> list:
+    counts, count, total = histogram.buckets()
+    separator = "," if labels else ""
+    lines, cumulative = [], 0
+    for bound, bucket_count in zip(histogram.bounds, counts):
+        cumulative += bucket_count
+        lines.append(f'{metric}_bucket{{{labels}{separator}le="{bound:g}"}} {cumulative}')
+    lines.append(f'{metric}_bucket{{{labels}{separator}le="+Inf"}} {count}')
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{metric}_sum{suffix} {total:.6f}")
+    lines.append(f"{metric}_count{suffix} {count}")
+    return lines
+
+
+def instrument(name: str, function, registry: "MetricsRegistry" = None):
+    """
+    :param name: operation name
+    :param function: function to be measured
+    :param registry: registry recording calls, default: process registry
+    :return: function recording latency and errors of each call
+    """
+    registry = registry or metrics
+
+    @functools.wraps(function)
+    def measured(*args, **kwargs):
+        if not registry.enabled:
+            return function(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            result = function(*args, **kwargs)
+        except BaseException:
+            registry.observe(name, time.perf_counter() - start, error=True)
+            raise
+        registry.observe(name, time.perf_counter() - start)
+        return result
+    return measured
+
+
+def instrument_async(name: str, function, registry: "MetricsRegistry" = None):
+    """
+    :return: coroutine function recording latency and errors of awaited calls, see instrument
+    """
+    registry = registry or metrics
+
+    @functools.wraps(function)
+    async def measured(*args, **kwargs):
+        if not registry.enabled:
+            return await function(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            result = await function(*args, **kwargs)
+        except BaseException:
+            registry.observe(name, time.perf_counter() - start, error=True)
+            raise
+        registry.observe(name, time.perf_counter() - start)
+        return result
+    return measured
+
+
+class InstrumentedService:
+    """
+    Proxy of zeep service recording every operation call as <prefix><operation>
+    """
+
+    def __init__(self, service, asynchronous: bool = False, registry: "MetricsRegistry" = None,
+                 prefix: str = "service.") -> None:
+        """
+        :param service: zeep service proxy, or other object whose public methods are measured
+        :param asynchronous: True for service of zeep async client, operations return awaitables
+        :param registry: registry recording calls, default: process registry
+        :param prefix: prefix of operation names
+        """
+        self._service = service
+        self._wrap = instrument_async if asynchronous else instrument
+        self._registry = registry or metrics
+        self._prefix = prefix
+        self._operations = {}
+
+    def __repr__(self) -> str:
+        return repr(self._service)
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            return getattr(self._service, name)
+        operation = self._operations.get(name)
+        if operation is None:
+            operation = self._wrap(self._prefix + name, getattr(self._service, name), self._registry)
+            self._operations[name] = operation
+        return operation
+
+    def __getitem__(self, name: str):
+        return getattr(self, name)
+
+
+# process registry used by Odis, command dispatch and socket servers
+metrics = MetricsRegistry()
@@ -0,0 +1,145 @@
+"""Readiness probes with exponential backoff used to wait for application startup"""
+import socket
+import time
+
+from modules.custom_exceptions import StartupTimeout
+from modules.logger import get_logger
+
+logger = get_logger(__name__)
+
+INITIAL_DELAY = 0.05
+MAX_DELAY = 1.0
+
+
+class Deadline:
+    """
+    Point in time shared by several waits
+    """
+
+    def __init__(self, timeout: float, clock=time.monotonic) -> None:
+        self.timeout = timeout
+        self._clock = clock
+        self._end = clock() + timeout
+
+    def remaining(self) -> float:
+        return max(0.0, self._end - self._clock())
+
+
+def wait_until(condition, deadline: Deadline, initial_delay=INITIAL_DELAY, max_delay=MAX_DELAY,
+               sleep=time.sleep) -> int:
+    """
+    Polls condition with exponentially growing delay between attempts
+    :param condition: callable returning True once ready
+    :param deadline: deadline of wait
+    :param initial_delay: delay after first failed attempt in seconds
+    :param max_delay: upper bound of delay in seconds
+    :param sleep: sleep function
+    :return: number of attempts, StartupTimeout exception if deadline is reached
+    """
+    delay = initial_delay
+    attempts = 0
+    while True:
+        attempts += 1
+        if condition():
+            return attempts
+        remaining = deadline.remaining()
+        if remaining <= 0:
+            raise StartupTimeout(f"Condition not fulfilled within {deadline.timeout}s after {attempts} attempts")
+        sleep(min(delay, remaining))
+        delay = min(delay * 2, max_delay)
+
+
+def tcp_probe(port: int, host="127.0.0.1"):
+    """
+    :return: probe which is ready once port accepts TCP connections
+    """
+    def probe():
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return True
+        except OSError:
+            return False
+    return probe
+
+
+def http_probe(url: str, timeout=5):
+    """
+    :return: probe which is ready once GET request of url succeeds
+    """
+    import urllib.error
+    import urllib.request
+
+    def probe():
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as response:
+                return response.status == 200
+        except (urllib.error.URLError, OSError):
+            return False
+    return probe
+
+
+def call_probe(function):
+    """
+    :return: probe which is ready once function call does not raise exception
+    """
+    def probe():
+        try:
+            function()
+        except Exception as error:
+            logger.info("Probe %s failed: %s", getattr(function, '__name__', function), error)
+            return False
+        return True
+    return probe
+
+
+def window_probe(backend, title_part: str):
+    """
+    Windows matching title are looked up once, at probe creation
+    :param backend: window backend, see modules.window_backend
+    :param title_part: part of window title
+    :return: probe which is ready once all matching windows are hidden
+    """
+    windows = backend.find_windows(title_part)
+
+    def probe():
+        for window in windows:
+            if backend.is_visible(window):
+                logger.info("Waiting until %s is loading", backend.window_text(window))
+                return False
+        return True
+    return probe
+
+
+class Readiness:
+    """
+    Runs startup phases one after another within common deadline and records duration of each phase
+    """
+
+    def __init__(self, timeout: float, initial_delay=INITIAL_DELAY, max_delay=MAX_DELAY,
+                 clock=time.monotonic, sleep=time.sleep) -> None:
+        self.deadline = Deadline(timeout, clock)
+        self.phases = {}
+        self._initial_delay = initial_delay
+        self._max_delay = max_delay
+        self._clock = clock
+        self._sleep = sleep
+
+    def wait(self, phase: str, probe) -> float:
+        """
+        :param phase: phase name
+        :param probe: callable returning True once phase is finished
+        :return: phase duration in seconds, StartupTimeout exception if deadline is reached
+        """
+        start = self._clock()
+        try:
+            attempts = wait_until(probe, self.deadline, self._initial_delay, self._max_delay, self._sleep)
+        except StartupTimeout:
+            logger.error("Startup phase %s not finished within %ss. Timeout reached", phase, self.deadline.timeout)
+            raise StartupTimeout(f"Startup phase {phase} not finished within {self.deadline.timeout}s. "
+                                 f"Timeout reached")
+        self.phases[phase] = self._clock() - start
+        logger.info("Startup phase %s finished in %.3fs after %d attempts", phase, self.phases[phase], attempts)
+        return self.phases[phase]
+
+    def report(self) -> str:
+        return ", ".join(f"{phase}: {duration:.3f}s" for phase, duration in self.phases.items())
@@ -1,9 +1,14 @@
-"""Utilitary used for module development"""
-import psutil
+"""Utilitary used for module development
+
+psutil is imported on first use, so importing this module does not delay socket server start
+"""
 import socket
 
-from func_timeout import func_timeout, FunctionTimedOut
-from modules.logger import logger
+from modules.custom_exceptions import StartupTimeout
+from modules.logger import get_logger
+from modules.readiness import Deadline, wait_until
+
+logger = get_logger(__name__)
 
 
 def process_exists(process_name):
@@ -12,6 +17,8 @@ def process_exists(process_name):
     :param process_name:
     :return: True if process exists else False
     """
+    import psutil
+
     for process in psutil.process_iter(attrs=['name']):
         if process.info['name'] == process_name:
             return True
@@ -24,6 +31,8 @@ def kill_process_by_name(process_name):
     :param process_name: process name aimed to be killed
     :return: True if process if found and killed else False
     """
+    import psutil
+
     for process in psutil.process_iter(attrs=['pid', 'name']):
         if process.info['name'] == process_name:
             pid = process.info['pid']
@@ -39,24 +48,22 @@ def kill_process_by_name(process_name):
 def start_process(call: str, timeout: int = 0, **kwargs):
     """
     Function that starts process and waits till it is started
-    If timeout is reached exception FunctionTimedOut (from func_timeout library) is raised
+    If timeout is reached exception StartupTimeout is raised
     :param call: call aimed to start process
     :param timeout: timeout time in seconds
     :param kwargs: other psutil kwargs
-    :return: None, either exception from psutil or func-timeout libraries
+    :return: None, either exception from psutil or StartupTimeout
     """
-    def wait_for_process(pid):
-        while not psutil.pid_exists(pid):
-            pass
+    import psutil
 
     # Start the process using psutil.Popen
     process = psutil.Popen(call, **kwargs)
 
     try:
         # Check if the process is running
-        func_timeout(timeout, wait_for_process, args=(process.pid, ))
-    except FunctionTimedOut:
-        logger.exception(f"Process didn't opened within timeout time:{timeout}")
+        wait_until(lambda: psutil.pid_exists(process.pid), Deadline(timeout))
+    except StartupTimeout:
+        logger.exception("Process didn't opened within timeout time:%s", timeout)
         raise
 
 
@@ -0,0 +1,51 @@
+"""Platform backends used to watch application windows"""
+import sys
+
+
+class WindowBackend:
+    """
+    Backend for platforms without window inspection, windows are never found
+    """
+
+    def find_windows(self, title_part: str) -> list:
+        """
+        :param title_part: part of window title
+        :return: list of window handles of top-level windows with matching title
+        """
+        return []
+
+    def is_visible(self, handle) -> bool:
+        return False
+
+    def window_text(self, handle) -> str:
+        return ""
+
+
+class Win32WindowBackend(WindowBackend):
+    """
+    Backend using win32gui
+    """
+
+    def __init__(self) -> None:
+        import win32gui
+        self._win32gui = win32gui
+
+    def find_windows(self, title_part: str) -> list:
+        top_windows = []
+        self._win32gui.EnumWindows(lambda hwnd, windows: windows.append(hwnd), top_windows)
+        return [hwnd for hwnd in top_windows if title_part in self._win32gui.GetWindowText(hwnd)]
+
+    def is_visible(self, handle) -> bool:
+        return bool(self._win32gui.IsWindowVisible(handle))
+
+    def window_text(self, handle) -> str:
+        return self._win32gui.GetWindowText(handle)
+
+
+def get_window_backend() -> WindowBackend:
+    """
+    :return: window backend of current platform
+    """
+    if sys.platform == "win32":
+        return Win32WindowBackend()
+    return WindowBackend()
@@ -0,0 +1,190 @@
+"""Odis with awaitable counterparts of public methods
+
+Example:
+    odis = AsyncOdis(tool_path="c:\\Program Files\\OE", configuration_path="c:\\ProgramData\\OE\\", tool_port=8086)
+    await odis.attach_async()
+    await odis.set_vehicle_project_async("BRAKE2023")
+    await odis.connect_to_ecu_async(0x3)
+    health, answer = await asyncio.gather(odis.health_check_async(), odis.send_raw_service_async("22 F1 90"))
+"""
+import asyncio
+import functools
+import inspect
+import os
+from pathlib import Path
+from typing import Union
+
+try:
+    from odis.odis import Odis, zeep_settings, FLASH_SUCCESS
+    from odis.raw_service_codec import encode_request, to_bytes, format_response
+    from odis.transport import async_transport
+except ModuleNotFoundError:
+    from odis import Odis, zeep_settings, FLASH_SUCCESS
+    from raw_service_codec import encode_request, to_bytes, format_response
+    from transport import async_transport
+from modules.logger import get_logger
+from modules.metrics import InstrumentedService
+
+logger = get_logger(__name__)
+
+ASYNC_SUFFIX = "_async"
+
+
+class AsyncOdis(Odis):
+    """
+    Odis whose SOAP operations can also be awaited, so one event loop can drive several ODIS instances
+    and overlap long operations like flash with health checks or trace toggles.
+    Methods calling ODIS web service have native counterparts on zeep async client,
+    other public methods get counterparts running them in worker thread, so do vehicle project and
+    ECU connection methods, which share open connections with sync methods (see connect_to_ecu).
+    Async client is bound to event loop which uses it first.
+    """
+    # zeep async transport of operation calls, new transport per instance if None
+    async_transport = None
+
+    def __init__(self, *args, **kwargs):
+        self.async_service = None
+        self._async_client = None
+        super().__init__(*args, **kwargs)
+
+    def attach(self, readiness=None) -> str:
+        result = super().attach(readiness)
+        self._async_client = self.wsdl_cache.async_client(self.wsdl_url, settings=zeep_settings(),
+                                                          transport=self.async_transport or async_transport())
+        self.async_service = InstrumentedService(self._async_client.service, asynchronous=True)
+        return result
+
+    async def aclose(self) -> None:
+        """
+        Closes connections of async client
+        """
+        if self._async_client is not None:
+            await self._async_client.transport.aclose()
+            self._async_client = None
+            self.async_service = None
+
+    async def health_check_async(self) -> str:
+        if self.async_service is None:
+            raise ConnectionError("ODIS service not connected")
+        return str(await self.async_service.getAutomationApiVersion())
+
+    async def send_raw_service_async(self, hex_command: Union[bytes, str]):
+        return format_response(await self.send_raw_service_bytes_async(hex_command))
+
+    async def send_raw_service_bytes_async(self, hex_command: Union[bytes, str]) -> bytes:
+        if not self.operable:
+            raise ConnectionError("Diagnostic connection not initialized either vehicle project is not set")
+
+        request = encode_request(hex_command)
+        cache = self.response_cache
+        if cache is not None and cache.cacheable(request):
+            response = cache.get(self.connection_handle, request)
+            if response is None:
+                response = await self._send_raw_async(request)
+                cache.put(self.connection_handle, request, response)
+            return response
+        try:
+            return await self._send_raw_async(request)
+        finally:
+            if cache is not None:
+                cache.observe(self.connection_handle, request)
+
+    async def _send_raw_async(self, request: bytes) -> bytes:
+        if self.tester_present is None:
+            return to_bytes(await self.async_service.sendRawService(self.connection_handle, request))
+        # handle lock keeps TesterPresent out of user request, it is held by worker thread,
+        # so concurrent requests on the same handle wait there instead of blocking event loop
+        return await asyncio.to_thread(self._send_raw, request, self.connection_handle)
+
+    async def identify_ecu_async(self):
+        cache = self.response_cache
+        result_identification = None if cache is None else cache.get(self.connection_handle, "readIdentification")
+        if result_identification is None:
+            result_identification = await self.async_service.readIdentification(self.connection_handle)
+            if cache is not None:
+                cache.put(self.connection_handle, "readIdentification", result_identification)
+        if len(result_identification) == 0:
+            return "No ECU data identified"
+        return f"Identified ECU: {result_identification[0].ecuAddress}"
+
+    async def check_flashing_preconditions_async(self):
+        return str(await self.async_service.checkFlashPreConditions(self.connection_handle))
+
+    async def is_flashable_async(self):
+        if await self.async_service.checkFlashProgramming(self.connection_handle):
+            return "Current control unit is flashable"
+        return "Current control unit is NOT flashable"
+
+    async def set_communication_trace_async(self, trace_state: str):
+        if trace_state not in ["ON", "OFF"]:
+            return "Invalid traceState: Possible values:[ON][OFF]"
+        await self.async_service.setCommunicationTrace(trace_state)
+        return f"Trace state set to: {trace_state}"
+
+    async def start_protocol_async(self):
+        try:
+            await self.async_service.discardProtocol()
+            await self.async_service.initProtocol()
+            await self.async_service.startProtocol()
+            logger.info("Protocol started")
+            return "Protocol started"
+        except Exception as error:
+            logger.error(error)
+            raise ValueError(f"Protocol not started due to error: {error}")
+
+    async def stop_protocol_async(self):
+        try:
+            await self.async_service.stopProtocol()
+            await self.async_service.saveProtocol()
+            return "Protocol stopped"
+        except Exception as error:
+            logger.error(error)
+            raise ValueError(f"Protocol not stopped due to error: {error}")
+
+    async def flash_async(self, odx_container: Path):
+        odx_container = str(odx_container)
+        if not os.path.exists(odx_container):
+            logger.info("ODX container: %s do not exists", odx_container)
+            raise ValueError("ODX_CONTAINER_DO_NOT_EXISTS")
+
+        self._invalidate_response_cache()
+        logger.info("Initiate flash session; ODX: %s", odx_container)
+        if await self.async_service.checkFlashPreConditions(self.connection_handle):
+            logger.error("Preconditions for flashing are not fulfilled")
+            raise ConnectionError("FLASH_PRECONDITIONS_NOT_FULFILLED")
+        logger.info("Preconditions for flashing are fulfilled")
+
+        await self.start_protocol_async()
+        logger.info("Flashing started. It will take several minutes...")
+        try:
+            # TesterPresent and DID polls would interleave with flash programming
+            with self._paused_background():
+                flash_session = await self.async_service.flashProgramming(self.connection_handle, odx_container,
+                                                                          checkSessionWithEcu=False)
+        except Exception as error:
+            await self.stop_protocol_async()
+            return str(error)
+        await self.stop_protocol_async()
+
+        self._report_flash_session(flash_session)
+        return FLASH_SUCCESS
+
+
+def _threaded(method):
+    """
+    :param method: blocking method
+    :return: coroutine function running method in worker thread
+    """
+    @functools.wraps(method)
+    async def counterpart(self, *args, **kwargs):
+        return await asyncio.to_thread(method, self, *args, **kwargs)
+
+    counterpart.__name__ = method.__name__ + ASYNC_SUFFIX
+    counterpart.__qualname__ = f"AsyncOdis.{counterpart.__name__}"
+    return counterpart
+
+
+for _name, _method in inspect.getmembers(AsyncOdis, inspect.isfunction):
+    if not _name.startswith("_") and not _name.endswith(ASYNC_SUFFIX) and not inspect.iscoroutinefunction(_method) \
+            and not hasattr(AsyncOdis, _name + ASYNC_SUFFIX):
+        setattr(AsyncOdis, _name + ASYNC_SUFFIX, _threaded(_method))
@@ -14,6 +14,43 @@ RESERVED_PORTS = {
     23: "Telnet"
 }
 
+WEBSERVICE_INI = os.path.join("configuration", "webservice.ini")
+# webservice.ini of single instance among several ones, formatted with tool port
+INSTANCE_WEBSERVICE_INI = os.path.join("configuration", "webservice_{}.ini")
+WEBSERVICE_ENABLED_KEY = "de.volkswagen.odis.vaudas.vehiclefunction.automation.webservice.enabled"
+WEBSERVICE_PORT_KEY = "de.volkswagen.odis.vaudas.vehiclefunction.automation.webservice.port"
+END_OF_FILE = "eof=eof"
+
+
+def write_instance_configuration(configuration_path: str, tool_port: int) -> str:
+    """
+    Writes webservice ini of one ODIS instance enabling automation web service on tool port,
+    other keys are copied from webservice.ini of configuration path which is left unchanged,
+    file is written only if it changes
+    :param configuration_path: Path to ODIS configuration
+    :param tool_port: Port for connection to ODIS webservice
+    :return: path of instance webservice ini
+    """
+    content = ""
+    template = os.path.join(configuration_path, WEBSERVICE_INI)
+    if os.path.exists(template):
+        with open(template, encoding="utf-8") as file:
+            content = file.read()
+    lines = [line for line in content.splitlines()
+             if line.split("=", 1)[0].strip() not in (WEBSERVICE_ENABLED_KEY, WEBSERVICE_PORT_KEY)
+             and line.strip() != END_OF_FILE]
+    lines += [f"{WEBSERVICE_ENABLED_KEY}=true", f"{WEBSERVICE_PORT_KEY}={int(tool_port)}", END_OF_FILE]
+    updated = "\n".join(lines) + "\n"
+    path = os.path.join(configuration_path, INSTANCE_WEBSERVICE_INI.format(int(tool_port)))
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as file:
+            if file.read() == updated:
+                return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(updated)
+    return path
+
 
 @dataclass()
 class Configuration(metaclass=TriggerSetterMeta):
@@ -0,0 +1,128 @@
+"""Open ECU connections keyed by ECU address
+
+connect_to_ecu reuses the connection handle of an ECU whose connection is still open instead of connecting again.
+When more than max_open connections are open, least recently used ones are closed, connections which were
+not used for idle_timeout seconds are closed on next connect. Connections leased by running calls are never closed.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+MAX_OPEN = 8
+IDLE_TIMEOUT = 300.0
+
+
+class EcuConnection:
+    __slots__ = ("address", "handle", "last_used", "users")
+
+    def __init__(self, address: int, handle: int, last_used: float) -> None:
+        self.address = address
+        self.handle = handle
+        self.last_used = last_used
+        self.users = 0
+
+
+class ConnectionRegistry:
+    """
+    LRU registry of open connections, thread safe
+    Registry does not call ODIS, evicted connections are returned to caller which closes them
+    """
+
+    def __init__(self, max_open: int = MAX_OPEN, idle_timeout: float = IDLE_TIMEOUT, clock=time.monotonic) -> None:
+        """
+        :param max_open: number of connections kept open
+        :param idle_timeout: seconds after which unused connection is evicted, None to keep idle connections
+        :param clock: time source
+        """
+        self.max_open = max_open
+        self.idle_timeout = idle_timeout
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._connections = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._connections)
+
+    def __contains__(self, address: int) -> bool:
+        return address in self._connections
+
+    def get(self, address: int):
+        """
+        :param address: ECU address
+        :return: connection handle of open connection, None if ECU is not connected
+        """
+        with self._lock:
+            connection = self._connections.get(address)
+            if connection is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            connection.last_used = self._clock()
+            self._connections.move_to_end(address)
+            return connection.handle
+
+    def add(self, address: int, handle: int) -> list:
+        """
+        :param address: ECU address
+        :param handle: connection handle of newly opened connection
+        :return: evicted connections, to be closed by caller
+        """
+        with self._lock:
+            now = self._clock()
+            replaced = self._connections.pop(address, None)
+            self._connections[address] = EcuConnection(address, handle, now)
+            evicted = [replaced] if replaced is not None and replaced.handle != handle else []
+            for connection in list(self._connections.values())[:-1]:
+                idle = self.idle_timeout is not None and now - connection.last_used > self.idle_timeout
+                if connection.users == 0 and (idle or len(self._connections) > self.max_open):
+                    del self._connections[connection.address]
+                    evicted.append(connection)
+            return evicted
+
+    def remove(self, address: int):
+        """
+        :return: removed connection, None if ECU was not connected
+        """
+        with self._lock:
+            return self._connections.pop(address, None)
+
+    def clear(self) -> list:
+        """
+        :return: all connections, registry is empty afterwards
+        """
+        with self._lock:
+            connections = list(self._connections.values())
+            self._connections.clear()
+            return connections
+
+    def acquire(self, address: int):
+        """
+        Leases connection, leased connection is not evicted till it is released
+        :return: connection handle, None if ECU is not connected
+        """
+        with self._lock:
+            connection = self._connections.get(address)
+            if connection is None:
+                return None
+            connection.users += 1
+            return connection.handle
+
+    def release(self, address: int) -> None:
+        with self._lock:
+            connection = self._connections.get(address)
+            if connection is not None:
+                connection.users = max(0, connection.users - 1)
+                connection.last_used = self._clock()
+
+    def summary(self) -> str:
+        """
+        :return: one line per open connection, most recently used last
+        """
+        with self._lock:
+            now = self._clock()
+            lines = [f"ECU 0x{connection.address:X}: handle {connection.handle} idle {now - connection.last_used:.1f}s"
+                     for connection in self._connections.values()]
+        lines.append(f"open={len(lines)} max={self.max_open} hits={self.hits} misses={self.misses}")
+        return "\n".join(lines)
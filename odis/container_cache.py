@@ -0,0 +1,155 @@
+"""Content hash cache of flash containers and of their validation results
+
+Containers are identified by SHA-256 of their content, hashes are remembered per path, size and mtime,
+so an unchanged container is hashed once. Results of checkFlashProgrammingWithFlashContainer are stored
+per (container hash, ECU identification), so the same container is checked against the same ECU
+software only once, also across runs.
+"""
+import hashlib
+import json
+import mmap
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from modules.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_CACHE_PATH = os.environ.get("ODIS_CONTAINER_CACHE",
+                                    os.path.join(os.path.expanduser("~"), ".odis", "container_cache.json"))
+MAX_WORKERS = 4
+
+
+def hash_file(path: str) -> str:
+    """
+    Hashes file through memory map, hashlib releases GIL while hashing so several files can be hashed in parallel
+    :param path: file path
+    :return: SHA-256 hex digest of file content
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                digest.update(content)
+    return digest.hexdigest()
+
+
+class ContainerValidator:
+    """
+    Remembers container hashes and validation results within JSON file
+    Example:
+        validator = ContainerValidator()
+        validator.prefetch(["D:\\sw\\brake.odx", "D:\\sw\\gateway.odx"])  # hashed in background
+        validator.is_flashable(odis, "D:\\sw\\brake.odx")
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_workers: int = MAX_WORKERS) -> None:
+        """
+        :param path: JSON file storing hashes and validation results
+        :param max_workers: number of threads hashing containers
+        """
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="container_hash")
+        try:
+            with open(path) as file:
+                content = json.load(file)
+        except (OSError, ValueError):
+            content = {}
+        self._hashes = content.get("hashes", {})
+        self._results = content.get("results", {})
+
+    @staticmethod
+    def _file_key(path: str) -> str:
+        stat = os.stat(path)
+        return f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+
+    def digest(self, path: str) -> str:
+        """
+        :param path: container path
+        :return: content hash, file is hashed only if it changed since it was hashed last time
+        """
+        return self._future(path).result()
+
+    def _future(self, path: str) -> Future:
+        key = self._file_key(path)
+        with self._lock:
+            digest = self._hashes.get(key)
+            if digest is not None:
+                future = Future()
+                future.set_result(digest)
+                return future
+            future = self._pending.get(key)
+            if future is None:
+                future = self._pending[key] = self._executor.submit(self._hash, key, path)
+            return future
+
+    def _hash(self, key: str, path: str) -> str:
+        try:
+            digest = hash_file(path)
+            with self._lock:
+                self._hashes[key] = digest
+                self._save()
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+        logger.info("Container hashed: %s: %s", path, digest)
+        return digest
+
+    def prefetch(self, paths) -> list:
+        """
+        Hashes containers in background, example: containers of next ECUs while current ECU is flashed
+        :param paths: container paths
+        :return: list of futures with content hashes
+        """
+        return [self._future(path) for path in paths if os.path.isfile(path)]
+
+    @staticmethod
+    def identification_key(identification) -> str:
+        """
+        :param identification: result of readIdentification
+        :return: hash of ECU identification, changes with ECU software version
+        """
+        from zeep.helpers import serialize_object
+
+        data = json.dumps(serialize_object(identification), sort_keys=True, default=str)
+        return hashlib.sha256(data.encode()).hexdigest()[:16]
+
+    def is_flashable(self, odis, container: str) -> bool:
+        """
+        :param odis: Odis object connected to ECU
+        :param container: container path
+        :return: result of checkFlashProgrammingWithFlashContainer, stored result if container was already
+        checked against ECU with the same identification
+        """
+        key = f"{self.digest(container)}|{self.identification_key(odis.read_identification())}"
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self.hits += 1
+                return result
+            self.misses += 1
+        result = bool(odis.service.checkFlashProgrammingWithFlashContainer(odis.connection_handle, container, ""))
+        with self._lock:
+            self._results[key] = result
+            self._save()
+        return result
+
+    def _save(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary_path = f"{self.path}.{threading.get_ident()}.tmp"
+        with open(temporary_path, "w") as file:
+            json.dump({"hashes": self._hashes, "results": self._results}, file)
+        os.replace(temporary_path, self.path)
+
+    def stats(self) -> str:
+        return f"hits={self.hits} misses={self.misses} hashes={len(self._hashes)} results={len(self._results)}"
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,268 @@
+"""SQLite catalog of PDX/ODX flash containers
+
+Directories are scanned incrementally, only containers whose size or mtime changed are read again.
+From PDX archives only zip central directory and index.xml (beginning of ODX-F members if archive has
+no index.xml) are read; ODX files are parsed only until metadata is found or flash data starts,
+flash data blocks are never read and parsed elements are released, so memory does not grow with container size.
+
+Example:
+    catalog = ContainerCatalog()
+    catalog.scan("D:\\sw")
+    catalog.latest(0x03)  # path of container with highest software version for ECU 0x03
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+import zipfile
+from xml.etree.ElementTree import iterparse, ParseError
+
+from modules.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_CATALOG_PATH = os.environ.get("ODIS_CONTAINER_CATALOG",
+                                      os.path.join(os.path.expanduser("~"), ".odis", "container_catalog.sqlite"))
+CONTAINER_EXTENSIONS = (".pdx", ".odx")
+# ODX members of PDX archive without index.xml searched for metadata
+ODX_MEMBER_EXTENSIONS = (".odx-f", ".odx", ".odx-d", ".odx-c")
+INDEX_NAME = "index.xml"
+# elements holding flash data, parsing stops at first of them
+DATA_ELEMENTS = {"FLASHDATAS", "FLASHDATA", "DATA"}
+
+# element names, or SHORT-NAMEs of EXPECTED-IDENT / SD elements, holding container metadata
+FIELD_NAMES = {
+    "ecu_address": {"ECU-ADDRESS", "LOGICAL-ADDRESS", "DIAG-ADDRESS", "ECUADDRESS"},
+    "part_number": {"PART-NUMBER", "ECU-PART-NUMBER", "SPARE-PART-NUMBER", "PARTNUMBER", "VW-PART-NUMBER"},
+    "software_version": {"SOFTWARE-VERSION", "SW-VERSION", "SOFTWAREVERSION", "ECU-SOFTWARE-VERSION"},
+    "ecu_name": {"ECU-NAME", "ECUNAME", "ECU-VARIANT"},
+}
+_FIELD_OF_NAME = {name: field for field, names in FIELD_NAMES.items() for name in names}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS containers (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    ecu_address INTEGER,
+    ecu_name TEXT,
+    part_number TEXT,
+    software_version TEXT,
+    scanned_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS containers_ecu ON containers (ecu_address, part_number);
+"""
+COLUMNS = ("path", "size", "mtime_ns", "ecu_address", "ecu_name", "part_number", "software_version")
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1].upper()
+
+
+def _normalize(name: str) -> str:
+    return re.sub(r"[\s_]+", "-", name.strip()).upper()
+
+
+def parse_address(value: str):
+    """
+    :param value: ECU address as written within container, example: '0x03', '03', '3'
+    :return: address as integer, None if value is not an address
+    """
+    value = value.strip()
+    for base in (0, 16):
+        try:
+            return int(value, base)
+        except ValueError:
+            pass
+    return None
+
+
+def version_key(version) -> tuple:
+    """
+    :param version: software version, example: '0004', '1.12.3', 'X012'
+    :return: sort key comparing numeric parts as numbers
+    """
+    return tuple(int(part) for part in re.findall(r"\d+", version or ""))
+
+
+def read_metadata(stream, metadata: dict = None) -> dict:
+    """
+    Parses XML stream until all metadata fields are found or flash data starts, rest of stream is not read
+    Every element is released when it ends, only last SHORT-NAME and IDENT-VALUE texts are kept
+    :param stream: binary file object with ODX or index XML
+    :param metadata: already found fields, they are not overwritten
+    :return: dictionary with found fields of FIELD_NAMES
+    """
+    metadata = dict(metadata or {})
+    short_name = ident_value = None
+    # open elements, ended element is removed from its parent
+    parents = []
+    try:
+        for event, element in iterparse(stream, events=("start", "end")):
+            if event == "start":
+                if _local_name(element.tag) in DATA_ELEMENTS:
+                    break
+                parents.append(element)
+                continue
+            parents.pop()
+            name = _local_name(element.tag)
+            text = (element.text or "").strip()
+            field = value = None
+            if name == "SHORT-NAME":
+                short_name = text
+            elif name == "IDENT-VALUE":
+                ident_value = ident_value or text
+            elif name == "SD":
+                # <SD SI="PartNumber">8W0907115</SD>
+                field, value = _FIELD_OF_NAME.get(_normalize(element.get("SI", ""))), text
+            elif name == "EXPECTED-IDENT":
+                # <EXPECTED-IDENT><SHORT-NAME>PartNumber</SHORT-NAME><IDENT-VALUES><IDENT-VALUE>8W0907115...
+                if short_name is not None:
+                    field, value = _FIELD_OF_NAME.get(_normalize(short_name)), ident_value
+                ident_value = None
+            elif name in _FIELD_OF_NAME:
+                field, value = _FIELD_OF_NAME[name], text
+            if field is not None and value and field not in metadata:
+                metadata[field] = value
+            element.clear()
+            if parents:
+                parents[-1].remove(element)
+            if len(metadata) == len(FIELD_NAMES):
+                break
+    except ParseError as error:
+        logger.warning("Container metadata incomplete: %s", error)
+    return metadata
+
+
+def read_container(path: str) -> dict:
+    """
+    :param path: PDX archive or ODX file
+    :return: dictionary with found fields of FIELD_NAMES
+    """
+    if not zipfile.is_zipfile(path):
+        with open(path, "rb") as stream:
+            metadata = read_metadata(stream)
+    else:
+        with zipfile.ZipFile(path) as archive:
+            names = {name.lower(): name for name in archive.namelist()}
+            metadata = {}
+            if INDEX_NAME in names:
+                with archive.open(names[INDEX_NAME]) as stream:
+                    metadata = read_metadata(stream)
+            # ODX members are read only if archive has no index
+            members = [] if INDEX_NAME in names else sorted(
+                (name for lower, name in names.items() if lower.endswith(ODX_MEMBER_EXTENSIONS)),
+                key=lambda name: ODX_MEMBER_EXTENSIONS.index(os.path.splitext(name.lower())[1]))
+            for member in members:
+                if len(metadata) == len(FIELD_NAMES):
+                    break
+                with archive.open(member) as stream:
+                    metadata = read_metadata(stream, metadata)
+    if "ecu_address" in metadata:
+        metadata["ecu_address"] = parse_address(metadata["ecu_address"])
+    return metadata
+
+
+class ContainerCatalog:
+    """
+    Index of containers within SQLite database, connection is shared by threads through lock
+    """
+
+    def __init__(self, path: str = DEFAULT_CATALOG_PATH) -> None:
+        """
+        :param path: SQLite database, ':memory:' to keep catalog in memory only
+        """
+        self.path = path
+        directory = os.path.dirname(path) if path != ":memory:" else ""
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        with self._connection:
+            self._connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def scan(self, *directories: str) -> dict:
+        """
+        Adds new and changed containers of directories (recursively) to catalog, removes deleted ones
+        :param directories: directories with containers
+        :return: number of added, updated, removed, unchanged and unreadable containers
+        """
+        start = time.monotonic()
+        found = {}
+        for directory in directories:
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    if name.lower().endswith(CONTAINER_EXTENSIONS):
+                        path = os.path.abspath(os.path.join(root, name))
+                        try:
+                            stat = os.stat(path)
+                        except OSError:
+                            continue
+                        found[path] = (stat.st_size, stat.st_mtime_ns)
+
+        prefixes = tuple(os.path.join(os.path.abspath(directory), "") for directory in directories)
+        with self._lock:
+            known = {row["path"]: (row["size"], row["mtime_ns"])
+                     for row in self._connection.execute("SELECT path, size, mtime_ns FROM containers")
+                     if row["path"].startswith(prefixes)}
+        removed = [path for path in known if path not in found]
+        changed = [path for path, version in found.items() if known.get(path) != version]
+
+        rows, unreadable = [], 0
+        for path in changed:
+            try:
+                metadata = read_container(path)
+            except (OSError, zipfile.BadZipFile) as error:
+                logger.warning("Container not readable: %s: %s", path, error)
+                unreadable += 1
+                continue
+            rows.append((path, *found[path], metadata.get("ecu_address"), metadata.get("ecu_name"),
+                         metadata.get("part_number"), metadata.get("software_version"), time.time()))
+
+        with self._lock, self._connection:
+            self._connection.executemany("DELETE FROM containers WHERE path = ?", ((path,) for path in removed))
+            self._connection.executemany(f"INSERT OR REPLACE INTO containers ({', '.join(COLUMNS)}, scanned_at) "
+                                         f"VALUES ({', '.join('?' * (len(COLUMNS) + 1))})", rows)
+        result = {"added": sum(path not in known for path, *_ in rows),
+                  "updated": sum(path in known for path, *_ in rows),
+                  "removed": len(removed),
+                  "unchanged": len(found) - len(changed),
+                  "unreadable": unreadable}
+        logger.info("Containers scanned in %.3fs: %s", time.monotonic() - start, result)
+        return result
+
+    def find(self, ecu_address: int = None, part_number: str = None, software_version: str = None) -> list:
+        """
+        :param ecu_address: ECU address, None for any
+        :param part_number: part number, None for any
+        :param software_version: software version, None for any
+        :return: list of dictionaries with container metadata, highest software version first
+        """
+        conditions, parameters = [], []
+        for column, value in (("ecu_address", ecu_address), ("part_number", part_number),
+                              ("software_version", software_version)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                parameters.append(value)
+        query = f"SELECT {', '.join(COLUMNS)} FROM containers"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        with self._lock:
+            rows = [dict(row) for row in self._connection.execute(query, parameters)]
+        return sorted(rows, key=lambda row: (version_key(row["software_version"]), row["mtime_ns"]), reverse=True)
+
+    def latest(self, ecu_address: int, part_number: str = None):
+        """
+        :param ecu_address: ECU address
+        :param part_number: part number, None for any
+        :return: path of container with highest software version (newest file if versions are equal), None if
+        catalog contains no container for ECU
+        """
+        containers = self.find(ecu_address, part_number)
+        return containers[0]["path"] if containers else None
@@ -0,0 +1,227 @@
+"""Fast path for sendRawService bypassing zeep serialization
+
+Request envelope is compiled once by zeep with placeholder arguments and split into template parts.
+Each call fills in connection handle and base64 request and posts it over a persistent keep-alive connection,
+concurrent calls (example: fan-out to several ECUs) take further connections of a small pool.
+Fast path is used only if WSDL declares the response as single base64Binary return element.
+Response is parsed by searching for the return element only. Faults and responses which do not match
+the expected shape are handed to zeep, so they end with the same result or exception as the generic path.
+Request is sent again only if writing it to an idle keep-alive connection failed, a request which may have
+reached the service is never repeated, so non-idempotent services (11 01, 2E ...) run at most once.
+"""
+import base64
+import binascii
+import http.client
+import re
+import select
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+try:
+    from odis.raw_service_codec import to_bytes
+except ModuleNotFoundError:
+    from raw_service_codec import to_bytes
+
+OPERATION = "sendRawService"
+# placeholders are distinctive enough not to appear anywhere else within envelope
+HANDLE_PLACEHOLDER = 1357924680
+REQUEST_PLACEHOLDER = b"\xde\xad\xbe\xef\xfa\xce"
+RETURN_PATTERN = re.compile(rb"<(?:[\w.-]+:)?return>([^<]*)</(?:[\w.-]+:)?return>")
+EMPTY_RESPONSE_PATTERN = re.compile(rb"<(?:[\w.-]+:)?sendRawServiceResponse[^>]*?(?:/>|>\s*</)")
+# idle keep-alive connections kept for later calls
+MAX_IDLE_CONNECTIONS = 8
+
+
+class RawServiceFastPath:
+    """
+    Sends sendRawService requests without building and parsing zeep objects
+    Connection is used by one call at a time, concurrent calls open further connections
+    """
+
+    def __init__(self, client, timeout: float = 300, recorder=None) -> None:
+        """
+        :param client: zeep client of ODIS automation service, SOAP 1.1 binding expected
+        :param timeout: socket timeout in seconds
+        :param recorder: SessionRecorder of odis.recording recording every call, not recorded if None
+        """
+        from zeep.wsdl.bindings.soap import Soap11Binding
+
+        service = client.service
+        binding = service._binding
+        if not isinstance(binding, Soap11Binding):
+            raise ValueError(f"Fast path supports SOAP 1.1 binding only, got {type(binding).__name__}")
+        self._client = client
+        self._binding = binding
+        self._operation = binding.get(OPERATION)
+        self._check_output(self._operation)
+        self._prefix, self._middle, self._suffix, self._handle_first = self._compile(client, service)
+        address = urlsplit(service._binding_options["address"])
+        self._host = address.hostname
+        self._port = address.port or 80
+        self._path = address.path + (f"?{address.query}" if address.query else "")
+        self._headers = {"Content-Type": "text/xml; charset=utf-8",
+                         "SOAPAction": f'"{self._operation.soapaction or ""}"',
+                         "Connection": "keep-alive"}
+        self._timeout = timeout
+        self._recorder = recorder
+        self._address = service._binding_options["address"]
+        self._idle = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _check_output(operation) -> None:
+        """
+        Raises ValueError unless response consists of single base64Binary element, example: list of signed bytes
+        """
+        from zeep.xsd.types.builtins import Base64Binary
+
+        elements = getattr(getattr(operation.output.body, "type", None), "elements", [])
+        if len(elements) != 1 or elements[0][1].accepts_multiple or not isinstance(elements[0][1].type,
+                                                                                     Base64Binary):
+            raise ValueError(f"{OPERATION} response is not single base64Binary element")
+
+    @staticmethod
+    def _compile(client, service) -> (bytes, bytes, bytes, bool):
+        """
+        Builds envelope with placeholder arguments and splits it around them
+        :return: prefix, middle and suffix of envelope, True if handle comes before request
+        """
+        from zeep.wsdl.utils import etree_to_string
+
+        envelope = etree_to_string(client.create_message(service, OPERATION, connectionHandle=HANDLE_PLACEHOLDER,
+                                                         request=REQUEST_PLACEHOLDER))
+        handle = str(HANDLE_PLACEHOLDER).encode()
+        request = base64.b64encode(REQUEST_PLACEHOLDER)
+        if envelope.count(handle) != 1 or envelope.count(request) != 1:
+            raise ValueError("Placeholders not found exactly once within sendRawService envelope")
+        handle_first = envelope.index(handle) < envelope.index(request)
+        first, second = (handle, request) if handle_first else (request, handle)
+        prefix, rest = envelope.split(first)
+        middle, suffix = rest.split(second)
+        return prefix, middle, suffix, handle_first
+
+    def envelope(self, handle: int, request: bytes) -> bytes:
+        """
+        :param handle: connection handle
+        :param request: raw diagnostic request
+        :return: SOAP request envelope
+        """
+        handle = str(int(handle)).encode()
+        request = base64.b64encode(request)
+        first, second = (handle, request) if self._handle_first else (request, handle)
+        return b"".join((self._prefix, first, self._middle, second, self._suffix))
+
+    def _acquire(self) -> (http.client.HTTPConnection, bool):
+        """
+        :return: idle connection or new not yet connected one, True if connection was used before
+        """
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                connection = self._idle.pop()
+            if not self._closed_by_server(connection):
+                return connection, True
+            connection.close()
+        return http.client.HTTPConnection(self._host, self._port, timeout=self._timeout), False
+
+    @staticmethod
+    def _closed_by_server(connection: http.client.HTTPConnection) -> bool:
+        """
+        Idle connection is readable only if server closed it or sent unexpected data, it is not reused then
+        """
+        try:
+            return bool(select.select([connection.sock], [], [], 0)[0])
+        except (OSError, ValueError):
+            return True
+
+    def _release(self, connection: http.client.HTTPConnection) -> None:
+        with self._lock:
+            if len(self._idle) < MAX_IDLE_CONNECTIONS:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    def _post(self, body: bytes) -> (int, dict, bytes):
+        connection, reused = self._acquire()
+        try:
+            if not reused:
+                connection.connect()
+                # headers and body are sent separately, without NODELAY body waits for delayed ACK
+                connection.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            connection.request("POST", self._path, body, self._headers)
+        except BrokenPipeError:
+            connection.close()
+            if not reused:
+                raise
+            # idle keep-alive connection was closed by server, request was not written
+            return self._post(body)
+        except Exception:
+            connection.close()
+            raise
+        try:
+            response = connection.getresponse()
+            content = response.read()
+        except Exception:
+            # request may have reached service, it is not repeated
+            connection.close()
+            raise
+        if response.will_close:
+            connection.close()
+        else:
+            self._release(connection)
+        return response.status, dict(response.getheaders()), content
+
+    def send_raw_service(self, handle: int, request: bytes) -> bytes:
+        """
+        :param handle: connection handle
+        :param request: raw diagnostic request
+        :return: response bytes
+        """
+        envelope = self.envelope(handle, request)
+        if self._recorder is None:
+            status, headers, content = self._post(envelope)
+        else:
+            started, start = time.time(), time.perf_counter()
+            status, headers, content = self._post(envelope)
+            duration = time.perf_counter() - start
+            self._recorder.record_call(self._address, self._headers, envelope, status,
+                                       headers.get("Content-Type", ""), content, started, duration)
+        return self._reply(status, headers, content)
+
+    def _reply(self, status: int, headers: dict, content: bytes) -> bytes:
+        """
+        :return: response bytes of return element, replies of other shape are processed by zeep
+        """
+        if status == 200:
+            match = RETURN_PATTERN.search(content)
+            if match is not None:
+                try:
+                    return base64.b64decode(match.group(1), validate=True)
+                except binascii.Error:
+                    # example: base64 split into lines, zeep decodes it
+                    pass
+            if EMPTY_RESPONSE_PATTERN.search(content) and b"Fault>" not in content:
+                return b""
+        return self._zeep_reply(status, headers, content)
+
+    def _zeep_reply(self, status: int, headers: dict, content: bytes) -> bytes:
+        """
+        Lets zeep process reply which fast path does not understand, example: SOAP fault, base64 with line breaks
+        :return: response bytes, zeep exception for faults
+        """
+        import requests
+
+        response = requests.Response()
+        response.status_code = status
+        response.headers.update(headers)
+        response._content = content
+        return to_bytes(self._binding.process_reply(self._client, self._operation, response))
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
@@ -0,0 +1,292 @@
+"""Flash campaign: flashing many ECUs of a vehicle with their containers through a pool of ODIS instances
+
+Manifest example (JSON):
+    {"vehicle_project": "MQB_2023",
+     "containers": {"0x09": "D:\\sw\\gateway.odx", "0x03": "D:\\sw\\brake.odx", "0x44": "D:\\sw\\steering.odx"},
+     "gateways": {"extended_can": ["0x03", "0x44"]}}
+ECUs of one gateway group are flashed one after another, ECUs of different groups and ECUs without group in parallel.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from odis.odis import FLASH_SUCCESS
+except ModuleNotFoundError:
+    from odis import FLASH_SUCCESS
+from modules.custom_exceptions import CampaignValidationError, FlashingError
+from modules.logger import get_logger
+
+logger = get_logger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def parse_address(address) -> int:
+    """
+    :param address: ECU address as integer or string, example: 3, '3', '0x03'
+    """
+    return address if isinstance(address, int) else int(str(address).strip(), 0)
+
+
+class CampaignItem:
+    def __init__(self, address: int, container: str, gateway=None) -> None:
+        """
+        :param address: ECU address
+        :param container: path to flash container
+        :param gateway: name of gateway group, None if ECU does not share gateway with other ECUs of campaign
+        """
+        self.address = address
+        self.container = container
+        self.gateway = gateway
+        self.status = PENDING
+        self.duration = None
+        self.error = None
+        self.attempts = 0
+
+    @property
+    def key(self) -> str:
+        """
+        Identifies ECU with container version, checkpoint of a changed container is not reused
+        """
+        try:
+            stat = os.stat(self.container)
+            version = f"{stat.st_size}:{stat.st_mtime_ns}"
+        except OSError:
+            version = "missing"
+        return f"{self.address}|{os.path.abspath(self.container)}|{version}"
+
+    def as_dict(self) -> dict:
+        return {"address": self.address, "container": self.container, "gateway": self.gateway,
+                "status": self.status, "duration": self.duration, "error": self.error, "attempts": self.attempts}
+
+
+class FlashCampaign:
+    """
+    Validates whole campaign before first ECU is flashed, flashes ECUs through OdisPool,
+    stores progress after each ECU within checkpoint file, so failed campaign resumes with ECUs not flashed yet
+    """
+
+    def __init__(self, pool, manifest: dict, checkpoint_path: str = None, validator=None) -> None:
+        """
+        :param pool: started OdisPool
+        :param manifest: dictionary with vehicle_project, containers (ECU address: container path)
+        and optional gateways (group name: list of ECU addresses)
+        :param checkpoint_path: JSON file storing campaign progress, None to keep progress in memory only
+        :param validator: ContainerValidator skipping container checks already done, None to check every time
+        """
+        self.pool = pool
+        self.validator = validator
+        self.vehicle_project = manifest.get("vehicle_project")
+        self.items = {}
+        for address, container in manifest.get("containers", {}).items():
+            address = parse_address(address)
+            if address in self.items:
+                raise CampaignValidationError(f"ECU 0x{address:X} listed more than once")
+            self.items[address] = CampaignItem(address, str(container))
+        for gateway, addresses in manifest.get("gateways", {}).items():
+            for address in map(parse_address, addresses):
+                if address not in self.items:
+                    raise CampaignValidationError(f"ECU 0x{address:X} of gateway {gateway} has no container")
+                self.items[address].gateway = gateway
+        self.checkpoint_path = checkpoint_path
+        self.wall_time = None
+        self._lock = threading.Lock()
+        self._load_checkpoint()
+
+    @classmethod
+    def from_file(cls, pool, manifest_path: str, checkpoint_path: str = None, validator=None) -> "FlashCampaign":
+        """
+        :param pool: started OdisPool
+        :param manifest_path: JSON manifest
+        :param checkpoint_path: JSON checkpoint, default: manifest path with .checkpoint.json suffix
+        :param validator: ContainerValidator, see __init__
+        """
+        with open(manifest_path) as file:
+            manifest = json.load(file)
+        return cls(pool, manifest, checkpoint_path or os.path.splitext(manifest_path)[0] + ".checkpoint.json",
+                   validator)
+
+    def lanes(self, items: list) -> list:
+        """
+        Groups items into lanes flashed in parallel, items of one lane are flashed one after another
+        Lanes with largest containers come first, so the longest lane does not start last
+        :param items: campaign items
+        :return: list of lanes (lists of items)
+        """
+        groups = {}
+        for item in items:
+            groups.setdefault(item.gateway if item.gateway is not None else ("ecu", item.address), []).append(item)
+        return sorted(groups.values(), key=lambda lane: sum(self._size(item) for item in lane), reverse=True)
+
+    @staticmethod
+    def _size(item: CampaignItem) -> int:
+        try:
+            return os.path.getsize(item.container)
+        except OSError:
+            return 0
+
+    def _run_lanes(self, items: list, job) -> None:
+        lanes = self.lanes(items)
+        if not lanes:
+            return
+        with ThreadPoolExecutor(max_workers=min(len(lanes), len(self.pool.instances)),
+                                thread_name_prefix="flash_campaign") as executor:
+            for future in [executor.submit(self._run_lane, lane, job) for lane in lanes]:
+                future.result()
+
+    def _run_lane(self, lane: list, job) -> None:
+        """
+        Leases instance per item, so instance which crashed during failed item is health checked
+        and restarted by pool before next item of the lane
+        :param job: callable with Odis object and item, it records failure of item and raises
+        """
+        for item in lane:
+            try:
+                with self.pool.lease() as odis:
+                    job(odis, item)
+            except Exception as error:
+                logger.debug("ECU 0x%X of lane failed: %s", item.address, error)
+
+    def validate(self, check_preconditions: bool = True) -> str:
+        """
+        Checks all containers exist and, if requested, that each ECU is flashable with its container
+        and flash preconditions are fulfilled
+        :param check_preconditions: if True, ECUs are checked through ODIS
+        :return: success string, CampaignValidationError exception listing all problems otherwise
+        """
+        problems = []
+        for item in self.items.values():
+            if not os.path.isfile(item.container):
+                problems.append(f"ECU 0x{item.address:X}: container not found: {item.container}")
+        if problems:
+            raise CampaignValidationError("\n".join(problems))
+
+        if check_preconditions:
+            self.prefetch()
+
+            def check(odis, item):
+                try:
+                    self._prepare(odis, item)
+                    if not self._container_flashable(odis, item):
+                        problems.append(f"ECU 0x{item.address:X}: not flashable with {item.container}")
+                    preconditions = odis.service.checkFlashPreConditions(odis.connection_handle)
+                    if preconditions:
+                        problems.append(f"ECU 0x{item.address:X}: unfulfilled preconditions: {preconditions}")
+                except Exception as error:
+                    problems.append(f"ECU 0x{item.address:X}: {error}")
+                    raise
+
+            self._run_lanes(self._open_items(), check)
+            if problems:
+                raise CampaignValidationError("\n".join(problems))
+        return f"Flash campaign of {len(self.items)} ECUs validated"
+
+    def prefetch(self) -> list:
+        """
+        Hashes containers of ECUs not flashed yet in background of validator, so checks and flashes
+        of first ECUs overlap with hashing of containers of next ECUs
+        :return: list of futures with content hashes, empty list without validator
+        """
+        if self.validator is None:
+            return []
+        return self.validator.prefetch(item.container for item in self._open_items())
+
+    def _container_flashable(self, odis, item: CampaignItem) -> bool:
+        if self.validator is not None:
+            return self.validator.is_flashable(odis, item.container)
+        return odis.service.checkFlashProgrammingWithFlashContainer(odis.connection_handle, item.container, "")
+
+    def _prepare(self, odis, item: CampaignItem) -> None:
+        if self.vehicle_project is not None and odis.vehicle_project != self.vehicle_project:
+            odis.set_vehicle_project(self.vehicle_project)
+        odis.connect_to_ecu(item.address)
+
+    def _open_items(self) -> list:
+        return [item for item in self.items.values() if item.status != DONE]
+
+    def _flash(self, odis, item: CampaignItem) -> None:
+        with self._lock:
+            item.status = RUNNING
+            item.attempts += 1
+            item.error = None
+        start = time.monotonic()
+        try:
+            self._prepare(odis, item)
+            result = odis.flash(item.container)
+            if result != FLASH_SUCCESS:
+                raise FlashingError(result)
+        except Exception as error:
+            logger.error("Flashing ECU 0x%X failed: %s", item.address, error)
+            self._finish(item, FAILED, start, str(error) or type(error).__name__)
+            # pool checks health of instance
+            raise
+        logger.info("ECU 0x%X flashed in %.1fs", item.address, time.monotonic() - start)
+        self._finish(item, DONE, start)
+
+    def _finish(self, item: CampaignItem, status: str, start: float, error: str = None) -> None:
+        with self._lock:
+            item.duration = time.monotonic() - start
+            item.status = status
+            item.error = error
+            self._save_checkpoint()
+
+    def run(self, validate: bool = True) -> dict:
+        """
+        Flashes all ECUs not flashed yet by previous run of campaign
+        :param validate: if True, campaign is validated before first ECU is flashed
+        :return: report, see report()
+        """
+        if validate:
+            self.validate()
+        else:
+            self.prefetch()
+        start = time.monotonic()
+        items = self._open_items()
+        logger.info("Flash campaign started: %d ECUs, %d already flashed", len(items), len(self.items) - len(items))
+        self._run_lanes(items, self._flash)
+        self.wall_time = time.monotonic() - start
+        return self.report()
+
+    def report(self) -> dict:
+        """
+        :return: per-ECU status, duration and error, number of flashed and failed ECUs and wall time
+        """
+        with self._lock:
+            ecus = [item.as_dict() for item in self.items.values()]
+        return {"ecus": ecus,
+                "done": sum(ecu["status"] == DONE for ecu in ecus),
+                "failed": sum(ecu["status"] == FAILED for ecu in ecus),
+                "pending": sum(ecu["status"] in (PENDING, RUNNING) for ecu in ecus),
+                "wall_time": self.wall_time,
+                "flash_time": sum(ecu["duration"] or 0.0 for ecu in ecus)}
+
+    def _load_checkpoint(self) -> None:
+        if self.checkpoint_path is None or not os.path.exists(self.checkpoint_path):
+            return
+        with open(self.checkpoint_path) as file:
+            checkpoint = json.load(file)
+        entries = {entry["key"]: entry for entry in checkpoint.get("ecus", [])}
+        for item in self.items.values():
+            entry = entries.get(item.key)
+            if entry is None:
+                continue
+            item.attempts = entry.get("attempts", 0)
+            if entry.get("status") == DONE:
+                item.status, item.duration = DONE, entry.get("duration")
+        logger.info("Flash campaign resumed from %s: %d ECUs already flashed",
+                    self.checkpoint_path, sum(item.status == DONE for item in self.items.values()))
+
+    def _save_checkpoint(self) -> None:
+        if self.checkpoint_path is None:
+            return
+        checkpoint = {"ecus": [dict(item.as_dict(), key=item.key) for item in self.items.values()]}
+        temporary_path = self.checkpoint_path + ".tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(checkpoint, file, indent=1)
+        os.replace(temporary_path, self.checkpoint_path)
@@ -0,0 +1,383 @@
+"""Local stand-in for ODIS automation web service
+
+Implements OdisAutomationService operations used by Odis with configurable latency and payloads,
+so Odis, command interfaces and socket servers can be tested and benchmarked without ODIS and ECU.
+
+Example:
+    with MockOdisService(port=8086, latency=0.002) as service:
+        odis = Odis(*mock_installation("D:\\Temp\\mock_odis"), tool_port=service.port)
+        odis.attach()
+"""
+import base64
+import os
+import threading
+import time
+import xml.etree.ElementTree as ElementTree
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+NAMESPACE = "http://mock.automation.odis/"
+SOAP_ENVELOPE = "http://schemas.xmlsoap.org/soap/envelope/"
+API_VERSION = "mock-1.0"
+
+# type name: list of (element name, xsd type)
+COMPLEX_TYPES = {
+    "connectionResult": [("connectionHandle", "xs:int"), ("ecuAddress", "xs:int")],
+    "doIPVCI": [("name", "xs:string"), ("ipAddress", "xs:string"), ("vin", "xs:string")],
+    "ecuIdentification": [("ecuAddress", "xs:int"), ("ecuName", "xs:string"), ("partNumber", "xs:string"),
+                          ("softwareVersion", "xs:string"), ("hardwareVersion", "xs:string")],
+    "flashResult": [("errorOccurred", "xs:boolean"), ("errorMessage", "xs:string"),
+                    ("negativeResponse", "xs:string"), ("ecuId", "xs:string"), ("sessionName", "xs:string"),
+                    ("duration", "xs:long"), ("containerSize", "xs:long")],
+}
+
+# operation name: (list of (parameter name, xsd type), (return type, is list) or None)
+OPERATIONS = {
+    "getAutomationApiVersion": ([], ("xs:string", False)),
+    "exit": ([], None),
+    "discardProtocol": ([], None),
+    "initProtocol": ([], None),
+    "startProtocol": ([], None),
+    "stopProtocol": ([], None),
+    "saveProtocol": ([], None),
+    "setVehicleProject": ([("projectName", "xs:string")], None),
+    "searchDoIPVCIs": ([("ipAddress", "xs:string")], ("tns:doIPVCI", True)),
+    "setDoIPVehicleProject": ([("identifier", "tns:doIPVCI"), ("projectName", "xs:string")], None),
+    "connectToEcu": ([("address", "xs:int")], ("tns:connectionResult", False)),
+    "openConnection": ([("connectionHandle", "xs:int")], None),
+    "closeConnection": ([("connectionHandle", "xs:int")], None),
+    "sendRawService": ([("connectionHandle", "xs:int"), ("request", "xs:base64Binary")],
+                       ("xs:base64Binary", False)),
+    "readIdentification": ([("connectionHandle", "xs:int")], ("tns:ecuIdentification", True)),
+    "checkFlashPreConditions": ([("connectionHandle", "xs:int")], ("xs:string", True)),
+    "checkFlashProgramming": ([("connectionHandle", "xs:int")], ("xs:boolean", False)),
+    "checkFlashProgrammingWithFlashContainer": ([("connectionHandle", "xs:int"),
+                                                 ("containerFileName", "xs:string"),
+                                                 ("sessionName", "xs:string")], ("xs:boolean", False)),
+    "flashProgramming": ([("connectionHandle", "xs:int"), ("containerFileName", "xs:string"),
+                          ("checkSessionWithEcu", "xs:boolean")], ("tns:flashResult", False)),
+    "setCommunicationTrace": ([("traceState", "xs:string")], None),
+}
+
+
+def _sequence(elements, list_element=None) -> str:
+    items = "".join(f'<xs:element name="{name}" type="{xsd_type}" minOccurs="0"/>' for name, xsd_type in elements)
+    if list_element is not None:
+        items += f'<xs:element name="return" type="{list_element}" minOccurs="0" maxOccurs="unbounded"/>'
+    return f"<xs:sequence>{items}</xs:sequence>"
+
+
+def build_wsdl(location: str) -> str:
+    """
+    :param location: service endpoint address
+    :return: WSDL document of stand-in service
+    """
+    schema = []
+    for name, elements in COMPLEX_TYPES.items():
+        schema.append(f'<xs:complexType name="{name}">{_sequence(elements)}</xs:complexType>')
+    messages, operations, bindings = [], [], []
+    for operation, (parameters, result) in OPERATIONS.items():
+        schema.append(f'<xs:element name="{operation}"><xs:complexType>{_sequence(parameters)}'
+                      f'</xs:complexType></xs:element>')
+        if result is None:
+            response = _sequence([])
+        elif result[1]:
+            response = _sequence([], list_element=result[0])
+        else:
+            response = _sequence([("return", result[0])])
+        schema.append(f'<xs:element name="{operation}Response"><xs:complexType>{response}'
+                      f'</xs:complexType></xs:element>')
+        messages.append(f'<message name="{operation}"><part name="parameters" element="tns:{operation}"/></message>'
+                        f'<message name="{operation}Response"><part name="parameters" '
+                        f'element="tns:{operation}Response"/></message>')
+        operations.append(f'<operation name="{operation}"><input message="tns:{operation}"/>'
+                          f'<output message="tns:{operation}Response"/></operation>')
+        bindings.append(f'<operation name="{operation}"><soap:operation soapAction=""/>'
+                        f'<input><soap:body use="literal"/></input><output><soap:body use="literal"/></output>'
+                        f'</operation>')
+    return (f'<?xml version="1.0" encoding="UTF-8"?>'
+            f'<definitions xmlns="http://schemas.xmlsoap.org/wsdl/" '
+            f'xmlns:soap="http://schemas.xmlsoap.org/wsdl/soap/" xmlns:tns="{NAMESPACE}" '
+            f'xmlns:xs="http://www.w3.org/2001/XMLSchema" targetNamespace="{NAMESPACE}" '
+            f'name="OdisAutomationService">'
+            f'<types><xs:schema targetNamespace="{NAMESPACE}" elementFormDefault="unqualified">'
+            f'{"".join(schema)}</xs:schema></types>'
+            f'{"".join(messages)}'
+            f'<portType name="OdisAutomation">{"".join(operations)}</portType>'
+            f'<binding name="OdisAutomationPortBinding" type="tns:OdisAutomation">'
+            f'<soap:binding transport="http://schemas.xmlsoap.org/soap/http" style="document"/>'
+            f'{"".join(bindings)}</binding>'
+            f'<service name="OdisAutomationService"><port name="OdisAutomationPort" '
+            f'binding="tns:OdisAutomationPortBinding"><soap:address location="{location}"/></port></service>'
+            f'</definitions>')
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _parse_value(element, xsd_type: str):
+    if xsd_type.startswith("tns:"):
+        return {_local_name(child.tag): child.text or "" for child in element}
+    text = element.text or ""
+    if xsd_type in ["xs:int", "xs:long"]:
+        return int(text)
+    if xsd_type == "xs:boolean":
+        return text.strip() == "true"
+    if xsd_type == "xs:base64Binary":
+        return base64.b64decode(text)
+    return text
+
+
+def _escape(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _serialize_value(name: str, value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, dict):
+        return f"<{name}>{''.join(_serialize_value(key, item) for key, item in value.items())}</{name}>"
+    if isinstance(value, bool):
+        text = "true" if value else "false"
+    elif isinstance(value, (bytes, bytearray)):
+        text = base64.b64encode(value).decode()
+    else:
+        text = _escape(str(value))
+    return f"<{name}>{text}</{name}>"
+
+
+def default_raw_responder(request: bytes, read_payload_size: int = 16) -> bytes:
+    """
+    Positive response to any request: service id + 0x40 followed by echoed request parameters
+    Read data by identifier (0x22) response is padded with read_payload_size bytes of data
+    :param request: request bytes
+    :param read_payload_size: number of data bytes of 0x22 response
+    :return: response bytes
+    """
+    if not request:
+        return b"\x7f\x00\x13"
+    response = bytes(((request[0] + 0x40) & 0xFF,)) + request[1:]
+    if request[0] == 0x22:
+        response += bytes(index & 0xFF for index in range(read_payload_size))
+    return response
+
+
+class MockOdisService:
+    """
+    Stand-in ODIS automation web service running in background thread
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, raw_responder=None, read_payload_size=16,
+                 flash_duration=0.0, flash_error=None, preconditions=None, identification=None) -> None:
+        """
+        :param host: interface to listen on
+        :param port: port to listen on, 0 selects free port
+        :param latency: delay of every operation in seconds, float or dictionary operation name: delay
+        :param raw_responder: callable returning sendRawService response bytes for request bytes
+        :param read_payload_size: number of data bytes of default 0x22 response
+        :param flash_duration: duration of flashProgramming in seconds
+        :param flash_error: error message returned by flashProgramming, None for success
+        :param preconditions: list of unfulfilled flash preconditions
+        :param identification: list of ECU identification dictionaries returned by readIdentification
+        """
+        self.latency = latency
+        self.raw_responder = raw_responder or (lambda request: default_raw_responder(request, read_payload_size))
+        self.flash_duration = flash_duration
+        self.flash_error = flash_error
+        self.preconditions = preconditions or []
+        self.identification = identification
+        self.calls = {}
+        self.connections = {}
+        self.open_connections = set()
+        self._next_handle = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self.host, self.port = self._server.server_address[:2]
+        self.wsdl = build_wsdl(f"http://{self.host}:{self.port}/OdisAutomationService").encode()
+
+    def _handler_class(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status: int, body: bytes):
+                self.send_response(status)
+                self.send_header("Content-Type", "text/xml; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.lower().endswith("?wsdl"):
+                    self._reply(200, service.wsdl)
+                else:
+                    self._reply(404, b"")
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                status, response = service.handle_request(body)
+                self._reply(status, response)
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def handle_request(self, body: bytes) -> (int, bytes):
+        """
+        :param body: SOAP request envelope
+        :return: HTTP status and SOAP response envelope
+        """
+        try:
+            envelope = ElementTree.fromstring(body)
+            request = next(iter(envelope.find(f"{{{SOAP_ENVELOPE}}}Body")))
+            operation = _local_name(request.tag)
+            if operation not in OPERATIONS:
+                raise ValueError(f"Unknown operation: {operation}")
+            parameters, result_type = OPERATIONS[operation]
+            types = dict(parameters)
+            arguments = {_local_name(child.tag): _parse_value(child, types.get(_local_name(child.tag), "xs:string"))
+                         for child in request}
+            with self._lock:
+                self.calls[operation] = self.calls.get(operation, 0) + 1
+            latency = self.latency.get(operation, 0.0) if isinstance(self.latency, dict) else self.latency
+            if latency:
+                time.sleep(latency)
+            result = getattr(self, f"_{operation}")(**arguments)
+        except Exception as error:
+            fault = (f'<S:Envelope xmlns:S="{SOAP_ENVELOPE}"><S:Body><S:Fault><faultcode>S:Server</faultcode>'
+                     f'<faultstring>{_escape(str(error))}</faultstring></S:Fault></S:Body></S:Envelope>')
+            return 500, fault.encode()
+
+        if result_type is None or result is None:
+            content = ""
+        elif result_type[1]:
+            content = "".join(_serialize_value("return", item) for item in result)
+        else:
+            content = _serialize_value("return", result)
+        response = (f'<S:Envelope xmlns:S="{SOAP_ENVELOPE}"><S:Body><ns2:{operation}Response '
+                    f'xmlns:ns2="{NAMESPACE}">{content}</ns2:{operation}Response></S:Body></S:Envelope>')
+        return 200, response.encode()
+
+    def _handle(self, connectionHandle) -> int:
+        if connectionHandle not in self.connections:
+            raise ValueError(f"Invalid connection handle: {connectionHandle}")
+        return connectionHandle
+
+    def _getAutomationApiVersion(self):
+        return API_VERSION
+
+    def _exit(self):
+        return None
+
+    def _discardProtocol(self):
+        return None
+
+    def _initProtocol(self):
+        return None
+
+    def _startProtocol(self):
+        return None
+
+    def _stopProtocol(self):
+        return None
+
+    def _saveProtocol(self):
+        return None
+
+    def _setCommunicationTrace(self, traceState=""):
+        return None
+
+    def _setVehicleProject(self, projectName=""):
+        return None
+
+    def _searchDoIPVCIs(self, ipAddress=""):
+        return [{"name": "MockVCI", "ipAddress": ipAddress or "fd00::1", "vin": "WVWZZZMOCK0000001"}]
+
+    def _setDoIPVehicleProject(self, identifier=None, projectName=""):
+        return None
+
+    def _connectToEcu(self, address=0):
+        with self._lock:
+            self._next_handle += 1
+            self.connections[self._next_handle] = address
+            return {"connectionHandle": self._next_handle, "ecuAddress": address}
+
+    def _openConnection(self, connectionHandle=0):
+        self.open_connections.add(self._handle(connectionHandle))
+
+    def _closeConnection(self, connectionHandle=0):
+        self.open_connections.discard(self._handle(connectionHandle))
+        self.connections.pop(connectionHandle)
+
+    def _sendRawService(self, connectionHandle=0, request=b""):
+        self._handle(connectionHandle)
+        return self.raw_responder(request)
+
+    def _readIdentification(self, connectionHandle=0):
+        address = self.connections[self._handle(connectionHandle)]
+        if self.identification is not None:
+            return self.identification
+        return [{"ecuAddress": address, "ecuName": f"ECU_{address:X}", "partNumber": "5Q0907530",
+                 "softwareVersion": "0001", "hardwareVersion": "H01"}]
+
+    def _checkFlashPreConditions(self, connectionHandle=0):
+        self._handle(connectionHandle)
+        return self.preconditions
+
+    def _checkFlashProgramming(self, connectionHandle=0):
+        self._handle(connectionHandle)
+        return True
+
+    def _checkFlashProgrammingWithFlashContainer(self, connectionHandle=0, containerFileName="", sessionName=""):
+        self._handle(connectionHandle)
+        return os.path.exists(containerFileName)
+
+    def _flashProgramming(self, connectionHandle=0, containerFileName="", checkSessionWithEcu=False):
+        address = self.connections[self._handle(connectionHandle)]
+        start = time.monotonic()
+        if self.flash_duration:
+            time.sleep(self.flash_duration)
+        return {"errorOccurred": self.flash_error is not None, "errorMessage": self.flash_error or "",
+                "negativeResponse": "", "ecuId": f"{address:X}", "sessionName": "mock",
+                "duration": int(time.monotonic() - start),
+                "containerSize": os.path.getsize(containerFileName) if os.path.exists(containerFileName) else 0}
+
+
+def mock_installation(directory: str) -> (str, str):
+    """
+    Creates directory layout passing Configuration validation
+    :param directory: directory where fake installation is created
+    :return: tool path and configuration path
+    """
+    tool_path = os.path.join(directory, "tool")
+    configuration_path = os.path.join(directory, "configuration")
+    os.makedirs(tool_path, exist_ok=True)
+    os.makedirs(configuration_path, exist_ok=True)
+    open(os.path.join(tool_path, "OffboardDiagLauncher.exe"), "a").close()
+    return tool_path, configuration_path
+
+
+if __name__ == "__main__":
+    with MockOdisService(port=8086) as mock_service:
+        print(f"Mock ODIS automation service listening on {mock_service.host}:{mock_service.port}")
+        threading.Event().wait()
@@ -1,34 +1,109 @@
 import os
-import win32gui
+import threading
 import time
-import func_timeout
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from types import FunctionType
+from typing import Union
 
 try:
-    from odis.configuration import Configuration
+    from odis.configuration import Configuration, write_instance_configuration
+    from odis.wsdl_cache import WsdlCache
+    from odis.raw_service_codec import encode_request, to_bytes, format_response
+    from odis.response_cache import ResponseCache, MAX_ENTRIES, TTL
+    from odis.transport import shared_transport
+    from odis.container_catalog import ContainerCatalog
+    from odis.recording import RECORDING_VARIABLE, RecordingTransport, ReplayTransport
+    from odis.sequence import load_sequence
+    from odis.tester_present import TesterPresentScheduler
+    from odis.connection_registry import ConnectionRegistry, MAX_OPEN, IDLE_TIMEOUT
 except ModuleNotFoundError:
-    from configuration import Configuration
-from modules.logger import logger
+    from configuration import Configuration, write_instance_configuration
+    from wsdl_cache import WsdlCache
+    from raw_service_codec import encode_request, to_bytes, format_response
+    from response_cache import ResponseCache, MAX_ENTRIES, TTL
+    from transport import shared_transport
+    from container_catalog import ContainerCatalog
+    from recording import RECORDING_VARIABLE, RecordingTransport, ReplayTransport
+    from sequence import load_sequence
+    from tester_present import TesterPresentScheduler
+    from connection_registry import ConnectionRegistry, MAX_OPEN, IDLE_TIMEOUT
+from modules.logger import get_logger, configure_logging
 from modules.custom_exceptions import FlashingError
-from modules.utils import process_exists, kill_process_by_name, start_process, is_port_open
-from zeep import Client, Settings
+from modules.metrics import metrics, instrument, InstrumentedService
+from modules.utils import process_exists, kill_process_by_name, start_process
+from modules.readiness import Readiness, window_probe, tcp_probe, http_probe, call_probe
+from modules.window_backend import get_window_backend
+
+logger = get_logger(__name__)
 
 STARTUP_TIMEOUT = 30
 
-settings = Settings(strict=False, xml_huge_tree=True, xsd_ignore_sequence_order=True)
+FLASH_SUCCESS = "ECU flashed successfully"
+# threads sending one raw service to several ECUs, see send_raw_service_bytes_to_ecus
+MAX_FAN_OUT = 8
+_settings = None
+_fan_out_executor = None
+
+
+def zeep_settings():
+    """
+    :return: zeep settings of ODIS clients, zeep is imported on first call so the package imports quickly
+    """
+    global _settings
+    if _settings is None:
+        from zeep import Settings
+        _settings = Settings(strict=False, xml_huge_tree=True, xsd_ignore_sequence_order=True)
+    return _settings
 
 
 class Odis(Configuration):
+    # WSDL/XSD documents and compiled clients shared by all instances
+    wsdl_cache = WsdlCache()
+    # send raw services through precompiled envelope and keep-alive connection instead of zeep
+    use_fast_path = True
+    # zeep transport of operation calls, pooled transport shared by all instances if None
+    transport = None
+    # ContainerValidator remembering container checks per content hash and ECU identification, disabled if None
+    container_validator = None
+    # ContainerCatalog resolving containers of flash_latest, catalog at default path is opened on first use if None
+    container_catalog = None
+    # file every SOAP call and document of attach() is appended to, see odis.recording; not recorded if None
+    recording_path = os.environ.get(RECORDING_VARIABLE) or None
+    # ECU connections kept open for reuse by connect_to_ecu, least recently used ones are closed beyond max_connections
+    max_connections = MAX_OPEN
+    # seconds after which unused ECU connection is closed on next connect, None keeps idle connections open
+    connection_idle_timeout = IDLE_TIMEOUT
+    # open() starts ODIS with its own webservice ini for tool port, set by OdisPool running several instances
+    instance_configuration = False
 
     def __init__(self, *args, **kwargs):
         # Client interface for interacting with SOAP server
         self.service = None
         self.vehicle_project_set = False
+        self.vehicle_project = None
         self.connection_handle = None
         self.ecu_connected = False
+        # open ECU connections by ECU address, connection_handle is the one of the current ECU
+        self.connections = ConnectionRegistry(self.max_connections, self.connection_idle_timeout)
+        # current ECU, its connection is leased so it is never evicted
+        self.ecu_address = None
+        # opt-in cache of read-only service responses, see enable_response_cache
+        self.response_cache = None
+        self.fast_path = None
+        # TesterPresent keep-alive of connection handles, see start_tester_present
+        self.tester_present = None
+        # background traffic (TesterPresent, DID polls of socket subscriptions) is paused while > 0
+        self._background_pauses = 0
+        self._background_lock = threading.Lock()
+        transport = kwargs.pop("transport", None)
+        if transport is not None:
+            self.transport = transport
         super().__init__(*args, **kwargs)
 
     @classmethod
-    def initialize(cls, tool_path, configuration_path, tool_port):
+    def initialize(cls, tool_path: str, configuration_path: str, tool_port: int):
         """
         :param tool_path: Path to OffboardDiagLauncher.exe
         usually installed in: c:\\Program Files\\Offboard_Diagnostic_Information_System_Engineering
@@ -58,56 +133,27 @@ class Odis(Configuration):
                    configuration_path=configuration_path,  # "c:\\ProgramData\\OE\\",
                    tool_port=tool_port)
 
-    @staticmethod
-    def _window_enumeration_callback(hwnd, top_windows):
-        """
-        Callback function enum_windows_callback that receives information about each top-level window
-        :param hwnd:  window handle (HWND)
-        :param top_windows: user defined arg, list of all top windows
-        :return:
-        """
-        top_windows.append((hwnd, win32gui.GetWindowText(hwnd)))
+    @property
+    def wsdl_url(self) -> str:
+        return f"http://localhost:{self.tool_port}/OdisAutomationService?wsdl"
 
-    def _wait_until_reading_finishes(self):
+    def _wait_until_reading_finishes(self, readiness: Readiness = None) -> Readiness:
         """
-
-        :return:
+        ODIS application startup takes several seconds where in all configuration and data are read,
+        clean up is executed or latest close session is inspected
+        Waits till ODIS windows finish loading
+        :param readiness: startup readiness holding common deadline, new one with STARTUP_TIMEOUT if None
+        :return: readiness with phase durations or StartupTimeout exception
         """
-        top_windows = []
-        win32gui.EnumWindows(self._window_enumeration_callback, top_windows)
-
-        @func_timeout.func_set_timeout(STARTUP_TIMEOUT)
-        def wait_for_startup():
-            """
-            ODIS application startup takes several seconds where in all configuration and data are read,
-            clean up is executed or latest close session is inspected
-            Function inspects ODIS windows and waits till ODIS is fully started UP and can accept other commands
-            :return: None or FunctionTimedOut exception from func-timeout library
-            """
-            for window in top_windows:
-                if "OffboardDiagLauncher" in window[1]:
-                    # logger.info(win32gui.GetWindowText(i[0]))
-                    logger.info("Waiting...")
-                    while win32gui.IsWindowVisible(window[0]):
-                        logger.info("Waiting until {} is loading".format(win32gui.GetWindowText(window[0])))
-                        # win32gui.ShowWindow(i[0], 5)
-                        # win32gui.SetForegroundWindow(i[0])
-                        time.sleep(1)
-                    break
-            while not is_port_open(self.tool_port):
-                pass
-
-            return True
+        readiness = readiness or Readiness(STARTUP_TIMEOUT)
+        readiness.wait("window", window_probe(get_window_backend(), "OffboardDiagLauncher"))
+        return readiness
 
-        try:
-            wait_for_startup()
-        except func_timeout.exceptions.FunctionTimedOut:
-            logger.error(f"ODIS did not opened within {STARTUP_TIMEOUT}s. Timeout reached")
-            raise RuntimeError(f"ODIS did not opened within {STARTUP_TIMEOUT}s. Timeout reached")
-
-    def open(self, force_kill=False) -> str:
+    def open(self, force_kill: bool = False) -> str:
         """
         Starts up ODIS, connects to ODIS service
+        With instance_configuration, ODIS is started with its own webservice ini enabling web service on tool port,
+        see write_instance_configuration
         :param force_kill: if True, Kill ODIS before startup if existing
         :return: Client object is stored under `client` instance attribute; returned success string
         """
@@ -119,20 +165,122 @@ class Odis(Configuration):
             kill_process_by_name("OffboardDiagLauncher.exe")
 
         executable_path = os.path.join(self.tool_path, "OffboardDiagLauncher.exe")
-        cmd_line_call = fr'{executable_path} -configuration configuration\webservice.ini'
-        start_process(call=cmd_line_call, timeout=10)
-        self._wait_until_reading_finishes()
-        self.service = Client(f"http://localhost:{self.tool_port}/OdisAutomationService?wsdl",
-                              settings=settings).service
-        logger.info(f"Initialized: {self.service}: {self.service.getAutomationApiVersion()}")
+        if self.instance_configuration:
+            webservice_configuration = write_instance_configuration(self.configuration_path, self.tool_port)
+            start_process(call=[executable_path, "-configuration", webservice_configuration], timeout=10)
+        else:
+            cmd_line_call = fr'{executable_path} -configuration configuration\webservice.ini'
+            start_process(call=cmd_line_call, timeout=10)
+        self.attach(self._wait_until_reading_finishes())
         return "ODIS opened"
 
+    def attach(self, readiness: Readiness = None) -> str:
+        """
+        Connects to ODIS service which is already running, example: started by open() or by other process
+        Waits till web service port accepts connections, WSDL is served and automation API answers
+        :param readiness: startup readiness holding common deadline, new one with STARTUP_TIMEOUT if None
+        :return: Client object is stored under `service` instance attribute; returned success string
+        """
+        readiness = readiness or Readiness(STARTUP_TIMEOUT)
+        readiness.wait("TCP", tcp_probe(self.tool_port))
+        readiness.wait("WSDL", http_probe(self.wsdl_url))
+        transport = self.transport or shared_transport()
+        if self.recording_path:
+            transport = RecordingTransport(self.recording_path, transport)
+            transport.record_documents(self.wsdl_url, zeep_settings())
+        client = self.wsdl_cache.client(self.wsdl_url, settings=zeep_settings(), transport=transport)
+        self.service = InstrumentedService(client.service)
+        readiness.wait("automation API", call_probe(self.service.getAutomationApiVersion))
+        self.fast_path = self._create_fast_path(client)
+        logger.info("Initialized: %s: %s", self.service, self.service.getAutomationApiVersion())
+        logger.info("ODIS startup phases: %s", readiness.report())
+        return "ODIS attached"
+
+    def attach_replay(self, path: Path, speed: float = 0.0) -> str:
+        """
+        Connects to recorded ODIS session instead of ODIS service, neither ODIS nor ECU is needed
+        Calls are answered from recording written while recording_path was set, see odis.recording
+        :param path: recording file
+        :param speed: 1.0 replays recorded service latency, 10.0 ten times faster, 0 without delay
+        :return: success string
+        """
+        transport = ReplayTransport(path, speed)
+        self.service = InstrumentedService(transport.client(zeep_settings()).service)
+        self.fast_path = None
+        logger.info("Replaying %s recorded calls of %s at speed %s", len(transport), path, speed)
+        return "ODIS replay attached"
+
+    def _create_fast_path(self, client):
+        """
+        :param client: zeep client
+        :return: sendRawService fast path, None if disabled or not supported by service WSDL
+        """
+        if not self.use_fast_path:
+            return None
+        # imported with zeep client, http.client is not needed before
+        try:
+            from odis.fast_path import RawServiceFastPath
+        except ModuleNotFoundError:
+            from fast_path import RawServiceFastPath
+        try:
+            recorder = client.transport.recorder if isinstance(client.transport, RecordingTransport) else None
+            return InstrumentedService(RawServiceFastPath(client, recorder=recorder), prefix="fast_path.")
+        except Exception as error:
+            logger.info("sendRawService fast path not available, zeep is used: %s", error)
+            return None
+
+    @property
+    def background_paused(self) -> bool:
+        """
+        :return: True while background traffic must not be sent to ECU, example: during flashing
+        """
+        return self._background_pauses > 0
+
+    @contextmanager
+    def _paused_background(self):
+        """
+        Pauses TesterPresent, DID polls check background_paused before they read
+        """
+        with self._background_lock:
+            self._background_pauses += 1
+        try:
+            with self.tester_present.paused() if self.tester_present is not None else nullcontext():
+                yield
+        finally:
+            with self._background_lock:
+                self._background_pauses -= 1
+
+    def _send_raw(self, request: bytes, handle: int = None) -> bytes:
+        handle = self.connection_handle if handle is None else handle
+        if self.tester_present is None:
+            return self._send_raw_to(handle, request)
+        with self.tester_present.busy(handle):
+            return self._send_raw_to(handle, request)
+
+    def _send_raw_to(self, handle: int, request: bytes) -> bytes:
+        if self.fast_path is not None:
+            return self.fast_path.send_raw_service(handle, request)
+        return to_bytes(self.service.sendRawService(handle, request))
+
+    def health_check(self) -> str:
+        """
+        Checks that ODIS service answers
+        :return: automation API version, exception if service does not answer
+        """
+        if self.service is None:
+            raise ConnectionError("ODIS service not connected")
+        return str(self.service.getAutomationApiVersion())
+
     def close(self):
         """
         Close ODIS
         Returns immediately and closes the application in a separate thread.
         This might take some seconds. So there is a period of time between the return of the exit method and the shutdown.
         """
+        # connections end with ODIS
+        self.connections.clear()
+        self.connection_handle = self.ecu_address = None
+        self.ecu_connected = False
         self.service.exit()
         time.sleep(3)
         return "Odis has been closed"
@@ -169,15 +317,98 @@ class Odis(Configuration):
             logger.error(error)
             raise ValueError(f"Protocol not stopped due to error: {error}")
 
-    def set_vehicle_project(self, project):
+    def enable_response_cache(self, max_entries: int = MAX_ENTRIES, ttl: float = TTL) -> str:
+        """
+        Caches responses of read-only services (22 xx xx, 19 0A) and readIdentification per connection handle
+        Cache is invalidated by any other service sent, by flash, connect_to_ecu and close_connection_to_ecu
+        :param max_entries: maximal number of cached responses
+        :param ttl: time in seconds a cached response stays valid
+        :return:
+        """
+        self.response_cache = ResponseCache(max_entries=max_entries, ttl=ttl)
+        return f"Response cache enabled: max_entries={max_entries} ttl={ttl}s"
+
+    def disable_response_cache(self) -> str:
+        self.response_cache = None
+        return "Response cache disabled"
+
+    def response_cache_stats(self) -> str:
+        """
+        :return: cache hit and miss counters
+        """
+        if self.response_cache is None:
+            return "Response cache disabled"
+        return self.response_cache.stats()
+
+    def stats(self) -> str:
+        """
+        :return: count, errors and latency percentiles of command dispatch, Odis methods and SOAP calls,
+        flash duration and throughput
+        """
+        return metrics.summary()
+
+    def export_metrics(self, path: Path) -> str:
+        """
+        Writes metrics in Prometheus text format, example: for textfile collector of node exporter
+        :param path: output file
+        """
+        metrics.write_prometheus(str(path))
+        return f"Metrics written to {path}"
+
+    def serve_metrics(self, port: int) -> str:
+        """
+        Serves metrics in Prometheus text format at http://127.0.0.1:<port>/metrics
+        :param port: HTTP port
+        """
+        metrics.serve_prometheus(int(port))
+        return f"Metrics served at http://127.0.0.1:{port}/metrics"
+
+    def start_tester_present(self, period: float = 2.0) -> str:
+        """
+        Sends TesterPresent (3E 80) on every connected ECU handle once per period from background thread
+        Pauses while flashing, each send_raw_service restarts the period of its handle
+        :param period: seconds between TesterPresent requests of a handle
+        """
+        if self.tester_present is None:
+            self.tester_present = TesterPresentScheduler(self._send_raw_to, period=float(period))
+        else:
+            self.tester_present.period = float(period)
+        if self.ecu_connected:
+            self.tester_present.add(self.connection_handle)
+        self.tester_present.start()
+        return f"TesterPresent started, period: {float(period):g}s"
+
+    def stop_tester_present(self) -> str:
+        if self.tester_present is not None:
+            self.tester_present.stop()
+            self.tester_present = None
+        return "TesterPresent stopped"
+
+    def tester_present_stats(self) -> str:
+        """
+        :return: per connection handle sent, errors, deferred and missed TesterPresent requests and send jitter
+        """
+        if self.tester_present is None:
+            return "TesterPresent not started"
+        return self.tester_present.summary()
+
+    def _invalidate_response_cache(self) -> None:
+        if self.response_cache is not None:
+            self.response_cache.invalidate()
+
+    def set_vehicle_project(self, project: str):
         """
         Sets vehicle project (PDX) which usually is imported using PDXImporter
         :param project: PDX name
         :return:
         """
         project = str(project)
+        self._invalidate_response_cache()
+        # connections belong to previous vehicle project
+        self._close_evicted(self.connections.clear())
         self.service.setVehicleProject(project)
         self.vehicle_project_set = True
+        self.vehicle_project = project
         return f"Vehicle project {project} was set"
 
     def set_doip_vehicle_project(self, project_name: str, ecu_ip_address: str) -> str:
@@ -201,16 +432,45 @@ class Odis(Configuration):
         self.service.setDoIPVehicleProject(ido_ipvci, project_name)
         return "DoIp set successfully"
 
-    def close_connection_to_ecu(self, ecu_address: str) -> str:
+    def close_connection_to_ecu(self, ecu_address: int) -> str:
         """
-        Closes the connection to the current control unit and switches to CLOSE_CONNECTION_BEHAVIOUR.
+        Closes the connection to the control unit and switches to CLOSE_CONNECTION_BEHAVIOUR.
         :param ecu_address: Communication ECU address
         :return:
         """
-        ecu_handle = self.service.get_connection_handle(ecu_address)
-        self.service.closeConnection(ecu_handle)
+        ecu_address = int(ecu_address)
+        connection = self.connections.remove(ecu_address)
+        if connection is None:
+            logger.info("No open connection to ECU 0x%X", ecu_address)
+            raise ValueError("ECU_NOT_CONNECTED")
+        self._close_handle(connection.handle)
         return "Connection closed successfully."
 
+    def _close_handle(self, handle: int) -> None:
+        if self.tester_present is not None:
+            self.tester_present.remove(handle)
+        if self.response_cache is not None:
+            self.response_cache.invalidate(handle)
+        if handle == self.connection_handle:
+            self.connection_handle = None
+            self.ecu_address = None
+            self.ecu_connected = False
+        self.service.closeConnection(handle)
+
+    def _close_evicted(self, connections: list) -> None:
+        for connection in connections:
+            logger.info("Close idle connection to ECU 0x%X", connection.address)
+            try:
+                self._close_handle(connection.handle)
+            except Exception as error:
+                logger.warning("Closing connection to ECU 0x%X failed: %s", connection.address, error)
+
+    def open_connections(self) -> str:
+        """
+        :return: one line per open ECU connection with its handle and idle time, reuse statistics
+        """
+        return self.connections.summary()
+
     def check_flashing_preconditions(self):
         """
         Checks the flashing preconditions for the current control unit and delivers the list of unfulfilled conditions
@@ -218,7 +478,7 @@ class Odis(Configuration):
         """
         return str(self.service.checkFlashPreConditions(self.connection_handle))
 
-    def flash_container_is_flashable(self, flash_container: str):
+    def flash_container_is_flashable(self, flash_container: Path):
         """
         FROM odis DOCS:
         connectionHandle - Handle for control unit connection.
@@ -230,9 +490,14 @@ class Odis(Configuration):
         :param flash_container:  Name of the container file with full path.
         :return:
         """
+        flash_container = str(flash_container)
         if not os.path.exists(flash_container):
             return "Flash container not found."
-        if self.service.checkFlashProgrammingWithFlashContainer(self.connection_handle, flash_container, ""):
+        if self.container_validator is not None:
+            flashable = self.container_validator.is_flashable(self, flash_container)
+        else:
+            flashable = self.service.checkFlashProgrammingWithFlashContainer(self.connection_handle, flash_container, "")
+        if flashable:
             return "Current control unit is flashable with the containerFileName content."
         else:
             return "Current control unit is NOT flashable with the containerFileName content."
@@ -250,14 +515,27 @@ class Odis(Configuration):
         else:
             return "Current control unit is NOT flashable"
 
+    def read_identification(self):
+        """
+        Reads all identification data from the currently selected control unit including
+        extended information and slave control units.
+        :return: identification data as returned by ODIS service
+        """
+        if self.response_cache is None:
+            return self.service.readIdentification(self.connection_handle)
+        result_identification = self.response_cache.get(self.connection_handle, "readIdentification")
+        if result_identification is None:
+            result_identification = self.service.readIdentification(self.connection_handle)
+            self.response_cache.put(self.connection_handle, "readIdentification", result_identification)
+        return result_identification
+
     def identify_ecu(self):
         """
         Reads all identification data from the currently selected control unit including
         extended information and slave control units.
         :return:
         """
-
-        result_identification = self.service.readIdentification(self.connection_handle)
+        result_identification = self.read_identification()
         if len(result_identification) == 0:
             return "No ECU data identified"
         else:
@@ -269,13 +547,32 @@ class Odis(Configuration):
         :return:
         """
         address = int(address)
-        logger.info("Connect to ECU")
-        self.connection_handle = self.service.connectToEcu(address).connectionHandle
-        logger.info("Open connection")
-        self.service.openConnection(self.connection_handle)
+        self._invalidate_response_cache()
+        self.connection_handle = self._connection_to(address)
+        if address != self.ecu_address:
+            self.connections.acquire(address)
+            if self.ecu_address is not None:
+                self.connections.release(self.ecu_address)
+            self.ecu_address = address
         self.ecu_connected = True
         return f"Connected to ECU: {address}"
 
+    def _connection_to(self, address: int) -> int:
+        """
+        :return: handle of open connection to ECU, new connection is opened if ECU is not connected
+        """
+        handle = self.connections.get(address)
+        if handle is not None:
+            return handle
+        logger.info("Connect to ECU")
+        handle = self.service.connectToEcu(address).connectionHandle
+        logger.info("Open connection")
+        self.service.openConnection(handle)
+        self._close_evicted(self.connections.add(address, handle))
+        if self.tester_present is not None:
+            self.tester_present.add(handle)
+        return handle
+
     @property
     def operable(self):
         """
@@ -287,52 +584,115 @@ class Odis(Configuration):
         else:
             raise ConnectionError("Diagnostic connection not initialized either vehicle project is not set")
 
-    @staticmethod
-    def __to_hex(val, nbits):
-        return hex((val + (1 << nbits)) % (1 << nbits))
-
-    def __format_response(self, response):
-        response_formatted = ""
-        for item in response:
-            response_formatted = response_formatted + str(self.__to_hex(item, 8)) + " "
-        return response_formatted
-
-    @staticmethod
-    def __m_zero(string):
-        resp = ""
-        string_splitted = string.split(" ")
-
-        for element in string_splitted:
-            if len(element) == 3:
-                element = element.replace("x", "x0")
-            resp = resp + element + " "
-        return resp
-
-    def send_raw_service(self, hex_command):
+    def send_raw_service(self, hex_command: Union[bytes, str]):
         """
         Sends raw diagnostic service, example: Extended diagnostic session: '10 03'
         :param hex_command: Command in hex
-        :return:
+        :return: response string, example: '0X50 0X03 0X00 0X32 0X01 0XF4'
+        """
+        return format_response(self.send_raw_service_bytes(hex_command))
+
+    def run_sequence(self, path: Path) -> str:
+        """
+        Runs diagnostic sequence script on connected ECU, see odis.sequence for script syntax
+        :param path: script file, compiled on first run and after it changed
+        :return: PASS, FAIL or ABORT with step counts, timings per send statement and failed steps
+        """
+        return load_sequence(str(path)).run(self).report()
+
+    def send_raw_service_bytes(self, hex_command: Union[bytes, str]) -> bytes:
+        """
+        Sends raw diagnostic service and returns response without formatting
+        :param hex_command: Command in hex or bytes, example: '10 03', b'\\x10\\x03'
+        :return: response bytes
         """
-        hex_command = str(hex_command)
         if not self.operable:
             raise ConnectionError("Diagnostic connection not initialized either vehicle project is not set")
 
-        hex_command = hex_command.strip().replace(" ", "")
-        hex_list = [hex_command[index: index + 2] for index in range(0, len(hex_command), 2)]
-        hex_list = ["0x" + item for item in hex_list if "0x" not in item]
-        hex_data = [(int(item, 0)) for item in hex_list]
-        hex_data = bytes(hex_data)
+        request = encode_request(hex_command)
+        cache = self.response_cache
+        if cache is None:
+            return self._send_raw(request)
+
+        if cache.cacheable(request):
+            response = cache.get(self.connection_handle, request)
+            if response is None:
+                response = self._send_raw(request)
+                cache.put(self.connection_handle, request, response)
+            return response
+        try:
+            return self._send_raw(request)
+        finally:
+            cache.observe(self.connection_handle, request)
 
-        answer = self.service.sendRawService(self.connection_handle, hex_data)
+    def _send_raw_observed(self, request: bytes, handle: int) -> bytes:
+        """
+        Sends request on handle bypassing response cache, cached responses of handle are dropped if request
+        may change ECU state
+        """
+        try:
+            return self._send_raw(request, handle)
+        finally:
+            cache = self.response_cache
+            if cache is not None:
+                cache.observe(handle, request)
 
-        answer = self.__format_response(answer)
-        answer = self.__m_zero(answer)
-        answer = answer.upper()
-        answer = answer.strip().replace(" ", "").replace("0x", "")
-        answer = ' '.join(answer[i:i + 4] for i in range(0, len(answer), 4))
+    def send_raw_service_bytes_to_handle(self, handle: int, hex_command: Union[bytes, str]) -> bytes:
+        """
+        Sends raw diagnostic service on given connection handle, response is not cached
+        Requests which may change ECU state drop cached responses of the handle
+        :param handle: connection handle, example: handle of ECU connected before the current one
+        :param hex_command: Command in hex or bytes, example: '22 F1 90'
+        :return: response bytes
+        """
+        if not self.operable:
+            raise ConnectionError("Diagnostic connection not initialized either vehicle project is not set")
+        return self._send_raw_observed(encode_request(hex_command), int(handle))
 
-        return answer
+    def send_raw_service_bytes_to_ecus(self, ecu_addresses: list, hex_command: Union[bytes, str]) -> dict:
+        """
+        Sends the same raw diagnostic service to several ECUs concurrently, responses are not cached
+        ECUs which are not connected yet are connected first, one by one; current ECU stays the same
+        :param ecu_addresses: ECU addresses
+        :param hex_command: Command in hex or bytes, example: '22 F1 90'
+        :return: ECU address: response bytes, or exception raised for that ECU
+        """
+        global _fan_out_executor
+        if not self.vehicle_project_set:
+            raise ConnectionError("Diagnostic connection not initialized either vehicle project is not set")
+        request = encode_request(hex_command)
+        results, leased = {}, {}
+        try:
+            for address in dict.fromkeys(int(address) for address in ecu_addresses):
+                try:
+                    self._connection_to(address)
+                    leased[address] = self.connections.acquire(address)
+                except Exception as error:
+                    results[address] = error
+            if _fan_out_executor is None:
+                _fan_out_executor = ThreadPoolExecutor(max_workers=MAX_FAN_OUT, thread_name_prefix="odis_fan_out")
+            futures = {address: _fan_out_executor.submit(self._send_raw_observed, request, handle)
+                       for address, handle in leased.items()}
+            for address, future in futures.items():
+                error = future.exception()
+                results[address] = future.result() if error is None else error
+        finally:
+            for address in leased:
+                self.connections.release(address)
+        return {address: results[address] for address in sorted(results)}
+
+    def send_raw_service_to_ecus(self, ecu_addresses: str, hex_command: str) -> str:
+        """
+        Sends the same raw diagnostic service to several ECUs concurrently
+        :param ecu_addresses: ECU addresses separated by space or comma, example: '0x01 0x17 0x19'
+        :param hex_command: Command in hex, example: '22 F1 90'
+        :return: one line per ECU, example: '0x17: 0X62 0XF1 0X90 ...', 'error: ' followed by message for failed ECUs
+        """
+        addresses = [int(address, 0) for address in str(ecu_addresses).replace(",", " ").split()]
+        results = self.send_raw_service_bytes_to_ecus(addresses, hex_command)
+        return "\n".join(f"0x{address:X}: " + (f"error: {result}" if isinstance(result, Exception)
+                                                 else format_response(result))
+                         for address, result in results.items())
 
     def set_communication_trace(self, trace_state: str):
         """
@@ -346,10 +706,10 @@ class Odis(Configuration):
         if trace_state not in ["ON", "OFF"]:
             return "Invalid traceState: Possible values:[ON][OFF]"
 
-        self.service.setCommunicationTrace("ON")
+        self.service.setCommunicationTrace(trace_state)
         return f"Trace state set to: {trace_state}"
 
-    def flash(self, odx_container):
+    def flash(self, odx_container: Path):
         """
         Precondition: clear DTC should be performed as precondition
         :param odx_container: path to ODX container
@@ -357,11 +717,12 @@ class Odis(Configuration):
         """
         odx_container = str(odx_container)
         if not os.path.exists(odx_container):
-            logger.info("ODX container: {} do not exists".format(odx_container))
+            logger.info("ODX container: %s do not exists", odx_container)
             raise ValueError("ODX_CONTAINER_DO_NOT_EXISTS")
 
         # self.service.resetAllOBDFaultMemories()
-        logger.info(f"Initiate flash session; ODX: {odx_container}")
+        self._invalidate_response_cache()
+        logger.info("Initiate flash session; ODX: %s", odx_container)
         preconditions = self.service.checkFlashPreConditions(self.connection_handle)
         if not preconditions:
             logger.info("Preconditions for flashing are fulfilled")
@@ -372,34 +733,83 @@ class Odis(Configuration):
         self.start_protocol()
         logger.info("Flashing started. It will take several minutes...")
         try:
-            flash_session = self.service.flashProgramming(self.connection_handle, odx_container,
-                                                          checkSessionWithEcu=False)
+            # TesterPresent and DID polls would interleave with flash programming
+            with self._paused_background():
+                flash_session = self.service.flashProgramming(self.connection_handle, odx_container,
+                                                              checkSessionWithEcu=False)
         except Exception as error:
             self.stop_protocol()
             return str(error)
 
         self.stop_protocol()
 
+        self._report_flash_session(flash_session)
+        return FLASH_SUCCESS
+
+    @classmethod
+    def _catalog(cls) -> ContainerCatalog:
+        if cls.container_catalog is None:
+            cls.container_catalog = ContainerCatalog()
+        return cls.container_catalog
+
+    def scan_containers(self, directory: Path):
+        """
+        Adds new and changed PDX/ODX containers of directory to container catalog, removes deleted ones
+        :param directory: directory searched recursively
+        :return: number of added, updated, removed, unchanged and unreadable containers
+        """
+        result = self._catalog().scan(str(directory))
+        return ", ".join(f"{key}: {value}" for key, value in result.items())
+
+    def flash_latest(self, ecu_address: int):
+        """
+        Connects to ECU and flashes container with highest software version found for ECU by container catalog
+        :param ecu_address: ECU address
+        :return: flash result, see flash
+        """
+        ecu_address = int(ecu_address)
+        odx_container = self._catalog().latest(ecu_address)
+        if odx_container is None:
+            logger.info("No container for ECU 0x%X within container catalog", ecu_address)
+            raise ValueError("ODX_CONTAINER_NOT_IN_CATALOG")
+        logger.info("Latest container for ECU 0x%X: %s", ecu_address, odx_container)
+        self.connect_to_ecu(ecu_address)
+        return self.flash(odx_container)
+
+    @staticmethod
+    def _report_flash_session(flash_session) -> None:
+        """
+        Logs flash session result and records its duration and container size
+        :param flash_session: result of flashProgramming
+        :return: None, FlashingError exception if error occurred during flashing
+        """
+        metrics.record_flash(flash_session.duration, flash_session.containerSize,
+                             error=flash_session.errorOccurred is not False)
         if flash_session.errorOccurred is not False:
             logger.error("Error occurred during flashing.")
-            logger.error("Error message: {}".format(flash_session.errorMessage))
+            logger.error("Error message: %s", flash_session.errorMessage)
             logger.error(flash_session.negativeResponse)
-            logger.error("ECU ID: {}".format(flash_session.ecuId))
-            logger.error("Session name: {}".format(flash_session.sessionName))
-            logger.error("Duration path: {}s".format(flash_session.duration))
-            logger.error("Container size: {}".format(flash_session.containerSize))
+            logger.error("ECU ID: %s", flash_session.ecuId)
+            logger.error("Session name: %s", flash_session.sessionName)
+            logger.error("Duration path: %ss", flash_session.duration)
+            logger.error("Container size: %s", flash_session.containerSize)
             raise FlashingError
         else:
             logger.info("Flashing process ends with success")
-            logger.info("ECU ID: {}".format(flash_session.ecuId))
-            logger.info("Session name: {}".format(flash_session.sessionName))
-            logger.info("Duration path: {}s".format(flash_session.duration))
-            logger.info("Container size: {}".format(flash_session.containerSize))
+            logger.info("ECU ID: %s", flash_session.ecuId)
+            logger.info("Session name: %s", flash_session.sessionName)
+            logger.info("Duration path: %ss", flash_session.duration)
+            logger.info("Container size: %s", flash_session.containerSize)
+
 
-        return "ECU flashed successfully"
+# public methods record count, errors and latency as odis.<method>
+for _name, _method in list(vars(Odis).items()):
+    if not _name.startswith("_") and isinstance(_method, FunctionType):
+        setattr(Odis, _name, instrument(f"odis.{_name}", _method))
 
 
 if __name__ == "__main__":
+    configure_logging()
     obj = Odis(tool_path="c:\\Program Files\\OE",
                configuration_path="c:\\ProgramData\\OE\\",
                tool_port=8081)
@@ -0,0 +1,211 @@
+"""Pool of ODIS instances running on different web service ports"""
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+try:
+    from odis.odis import Odis
+except ModuleNotFoundError:
+    from odis import Odis
+from modules.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class PooledOdis:
+    """
+    ODIS instance owned by pool together with its usage statistics
+    """
+
+    def __init__(self, index: int, odis: Odis) -> None:
+        self.index = index
+        self.odis = odis
+        self.jobs = 0
+        self.failures = 0
+        self.restarts = 0
+        self.busy_time = 0.0
+        self.leased_since = None
+        # False after failed restart, instance is restarted again before its next job
+        self.usable = True
+
+
+class OdisPool:
+    """
+    Starts several ODIS instances, each one with its own configuration directory and web service port,
+    and leases them to jobs, so several ECUs can be flashed in parallel
+
+    Example:
+        pool = OdisPool([{"tool_path": "c:\\Program Files\\OE", "configuration_path": "c:\\ProgramData\\OE1\\",
+                          "tool_port": 8086},
+                         {"tool_path": "c:\\Program Files\\OE", "configuration_path": "c:\\ProgramData\\OE2\\",
+                          "tool_port": 8087}])
+        pool.start()
+        future = pool.submit(lambda odis: odis.flash("D:\\odx.container"))
+    """
+
+    def __init__(self, configurations: list, odis_class=Odis, start_method: str = "open") -> None:
+        """
+        :param configurations: list of Odis keyword arguments: tool_path, configuration_path, tool_port
+        :param odis_class: class of pooled instances
+        :param start_method: Odis method which brings instance up, 'open' starts ODIS process,
+        'attach' connects to already running service
+        """
+        if start_method not in ["open", "attach"]:
+            raise ValueError(f"Invalid start method: {start_method}. Possible values:[open][attach]")
+        self.instances = [PooledOdis(index, odis_class(**configuration))
+                          for index, configuration in enumerate(configurations)]
+        for instance in self.instances:
+            # instances must not share web service port of installed webservice.ini
+            instance.odis.instance_configuration = True
+        self._start_method = start_method
+        self._free = queue.Queue()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._started_at = None
+
+    def start(self) -> str:
+        """
+        Starts and health checks all instances
+        :return: success string
+        """
+        for instance in self.instances:
+            self._start_instance(instance)
+            self._free.put(instance)
+        self._executor = ThreadPoolExecutor(max_workers=len(self.instances), thread_name_prefix="odis_pool")
+        self._started_at = time.monotonic()
+        return f"{len(self.instances)} ODIS instances started"
+
+    def _start_instance(self, instance: PooledOdis):
+        # open(force_kill=True) would kill all ODIS processes of the pool
+        getattr(instance.odis, self._start_method)()
+        logger.info("ODIS instance %d on port %s started, automation API: %s",
+                    instance.index, instance.odis.tool_port, instance.odis.health_check())
+
+    def _healthy(self, instance: PooledOdis) -> bool:
+        try:
+            instance.odis.health_check()
+        except Exception as error:
+            logger.error("ODIS instance %d health check failed: %s", instance.index, error)
+            return False
+        return True
+
+    def restart(self, instance: PooledOdis):
+        """
+        Restarts crashed instance
+        :param instance: pooled instance
+        """
+        logger.info("Restart ODIS instance %d on port %s", instance.index, instance.odis.tool_port)
+        instance.restarts += 1
+        try:
+            instance.odis.close()
+        except Exception as error:
+            logger.info("ODIS instance %d not closed: %s", instance.index, error)
+        instance.odis.service = None
+        instance.usable = False
+        self._start_instance(instance)
+        instance.usable = True
+
+    @contextmanager
+    def lease(self, timeout: float = None):
+        """
+        Leases free instance, instance is returned to pool at exit
+        Instance which does not pass health check after failed job is restarted before it is returned,
+        instance whose restart failed is restarted again when it is leased next time
+        :param timeout: time to wait for free instance in seconds, None to wait forever
+        :return: Odis object
+        """
+        try:
+            instance = self._free.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No free ODIS instance within {timeout}s")
+        if not instance.usable:
+            try:
+                self.restart(instance)
+            except Exception:
+                self._free.put(instance)
+                raise
+        instance.leased_since = time.monotonic()
+        try:
+            yield instance.odis
+        except Exception:
+            instance.failures += 1
+            if not self._healthy(instance):
+                try:
+                    self.restart(instance)
+                except Exception as error:
+                    logger.error("ODIS instance %d not restarted: %s", instance.index, error)
+            # job error, not restart error
+            raise
+        finally:
+            with self._lock:
+                instance.jobs += 1
+                instance.busy_time += time.monotonic() - instance.leased_since
+                instance.leased_since = None
+            self._free.put(instance)
+
+    def submit(self, job, *args, **kwargs):
+        """
+        Runs job on first free instance
+        :param job: callable with Odis object as first argument, example: lambda odis: odis.flash(container)
+        :return: concurrent.futures.Future with job result
+        """
+        if self._executor is None:
+            raise RuntimeError("Pool not started")
+        return self._executor.submit(self._run, job, *args, **kwargs)
+
+    def _run(self, job, *args, **kwargs):
+        with self.lease() as odis:
+            return job(odis, *args, **kwargs)
+
+    def map(self, job, items) -> list:
+        """
+        Runs job for each item in parallel
+        :param job: callable with Odis object and item as arguments
+        :param items: job inputs
+        :return: list of results in order of items, first job exception is raised
+        """
+        return [future.result() for future in [self.submit(job, item) for item in items]]
+
+    def utilisation(self) -> dict:
+        """
+        :return: pool usage statistics, utilisation is busy time share of all instances since start
+        """
+        now = time.monotonic()
+        wall_time = now - self._started_at if self._started_at else 0.0
+        with self._lock:
+            instances = []
+            for instance in self.instances:
+                busy_time = instance.busy_time
+                if instance.leased_since is not None:
+                    busy_time += now - instance.leased_since
+                instances.append({"index": instance.index,
+                                  "port": instance.odis.tool_port,
+                                  "busy": instance.leased_since is not None,
+                                  "jobs": instance.jobs,
+                                  "failures": instance.failures,
+                                  "restarts": instance.restarts,
+                                  "usable": instance.usable,
+                                  "busy_time": busy_time})
+        total_busy_time = sum(instance["busy_time"] for instance in instances)
+        return {"instances": instances,
+                "busy": sum(instance["busy"] for instance in instances),
+                "wall_time": wall_time,
+                "utilisation": total_busy_time / (wall_time * len(instances)) if wall_time else 0.0}
+
+    def close(self) -> str:
+        """
+        Waits for running jobs and closes all instances
+        :return: success string
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        for instance in self.instances:
+            if instance.odis.service is not None:
+                try:
+                    instance.odis.close()
+                except Exception as error:
+                    logger.error("ODIS instance %d not closed: %s", instance.index, error)
+        return "ODIS pool closed"
@@ -0,0 +1,45 @@
+"""Encoding of raw diagnostic service requests and formatting of ECU responses"""
+
+
+def encode_request(hex_command) -> bytes:
+    """
+    Encodes raw diagnostic service request
+    :param hex_command: command in hex, example: '10 03', '1003', '0x10 0x03' or bytes
+    :return: request bytes
+    """
+    if isinstance(hex_command, (bytes, bytearray, memoryview)):
+        return bytes(hex_command)
+    try:
+        # common case: whole bytes in hex separated by optional whitespace, example: '10 03'
+        return bytes.fromhex(hex_command)
+    except (TypeError, ValueError):
+        pass
+    hex_command = str(hex_command).strip().replace(" ", "").replace("0x", "").replace("0X", "")
+    if len(hex_command) % 2:
+        # last single digit is sent as separate byte, example: '100' -> 10 00
+        return bytes.fromhex(hex_command[:-1]) + bytes((int(hex_command[-1], 16),))
+    return bytes.fromhex(hex_command)
+
+
+def to_bytes(response) -> bytes:
+    """
+    :param response: response as returned by ODIS web service, bytes or sequence of (signed) integers
+    :return: response bytes
+    """
+    if response is None:
+        return b""
+    if isinstance(response, (bytes, bytearray, memoryview)):
+        return bytes(response)
+    return bytes(item & 0xFF for item in response)
+
+
+def format_response(response) -> str:
+    """
+    Formats ECU response, example: b'\\x50\\x03' -> '0X50 0X03'
+    :param response: response bytes or sequence of (signed) integers
+    :return: response string
+    """
+    response = to_bytes(response)
+    if not response:
+        return ""
+    return "0X" + response.hex(" ").upper().replace(" ", " 0X")
@@ -0,0 +1,305 @@
+"""Record and replay of ODIS SOAP sessions
+
+RecordingTransport wraps zeep transport and appends every request/response pair, and the WSDL/XSD documents
+of the service, to a gzip compressed JSON lines file. Each process appends its own gzip member and flushes
+every record, so the file of a crashed process is readable up to its last complete record.
+ReplayTransport answers from such file instead of ODIS, so Odis, CommandInterface and socket servers can be
+profiled with captured traffic on any machine. Replay reproduces service latency, time between calls
+comes from the replaying client.
+
+Records, one JSON object per line:
+    {"kind": "document", "url": "http://localhost:8086/OdisAutomationService?wsdl", "content": "<definitions ..."}
+    {"kind": "call", "time": 1760000000.123, "duration": 0.0042, "address": "http://localhost:8086/...",
+     "operation": "sendRawService", "request": "<soap-env:Envelope ...", "status": 200,
+     "content_type": "text/xml; charset=utf-8", "response": "<S:Envelope ..."}
+Bodies are stored as latin-1 text, which maps every byte to one character and back.
+
+Example:
+    set ODIS_RECORDING=C:\\recordings\\line_3.jsonl.gz  # every attach() of process records its calls
+    odis.attach_replay(Path("line_3.jsonl.gz"), speed=0)  # later, on Linux, without ODIS
+"""
+import atexit
+import gzip
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+from modules.custom_exceptions import ReplayMismatch
+from modules.logger import get_logger
+
+logger = get_logger(__name__)
+
+# recording file of every Odis.attach() of process, not recorded if unset
+RECORDING_VARIABLE = "ODIS_RECORDING"
+COMPRESS_LEVEL = 6
+OPERATION_PATTERN = re.compile(rb"<(?:[\w.-]+:)?Body[^>]*>\s*<(?:[\w.-]+:)?([\w.-]+)")
+
+_recorders = {}
+_recorders_lock = threading.Lock()
+
+
+def operation_name(headers: dict, body: bytes) -> str:
+    """
+    :return: local name of first element within SOAP body, SOAPAction header if body has none
+    """
+    match = OPERATION_PATTERN.search(body[:4096])
+    if match is not None:
+        return match.group(1).decode()
+    return str((headers or {}).get("SOAPAction", "")).strip('"')
+
+
+def _text(data) -> str:
+    return data.decode("latin-1") if isinstance(data, bytes) else data.encode().decode("latin-1")
+
+
+class SessionRecorder:
+    """
+    Append-only writer of recording file, thread safe
+    One recorder per file and process, see session_recorder
+    """
+
+    def __init__(self, path: str, compress_level: int = COMPRESS_LEVEL) -> None:
+        self.path = path
+        self.count = 0
+        self.documents = set()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = gzip.open(path, "ab", compresslevel=compress_level)
+
+    def _write(self, record: dict) -> None:
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode() + b"\n"
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line)
+            # sync flush keeps compression dictionary, record is readable before file is closed
+            self._file.flush(zlib.Z_SYNC_FLUSH)
+            self.count += 1
+
+    def record_call(self, address: str, headers: dict, request, status: int, content_type: str, response: bytes,
+                    started: float, duration: float) -> None:
+        """
+        :param address: service address
+        :param headers: request headers
+        :param request: request envelope
+        :param status: HTTP status of response
+        :param content_type: Content-Type of response
+        :param response: response content
+        :param started: wall clock time of request
+        :param duration: seconds until response was read
+        """
+        request = request if isinstance(request, bytes) else request.encode()
+        self._write({"kind": "call", "time": round(started, 6), "duration": round(duration, 6),
+                     "address": address, "operation": operation_name(headers, request), "request": _text(request),
+                     "status": status, "content_type": content_type, "response": _text(response)})
+
+    def record_document(self, url: str, content) -> None:
+        if url in self.documents:
+            return
+        self.documents.add(url)
+        self._write({"kind": "document", "url": url, "content": _text(content)})
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def session_recorder(path) -> SessionRecorder:
+    """
+    :param path: recording file
+    :return: recorder of file shared within process, so calls of several Odis instances do not interleave
+    """
+    key = os.path.abspath(str(path))
+    with _recorders_lock:
+        recorder = _recorders.get(key)
+        if recorder is None:
+            recorder = _recorders[key] = SessionRecorder(str(path))
+            logger.info("Recording ODIS session to %s", path)
+        return recorder
+
+
+def close_recordings() -> None:
+    """
+    Closes all recording files of process, called at exit
+    """
+    with _recorders_lock:
+        for recorder in _recorders.values():
+            recorder.close()
+        _recorders.clear()
+
+
+atexit.register(close_recordings)
+
+
+def read_records(path):
+    """
+    :param path: recording file
+    :return: iterator of records in recorded order, stops at first incomplete record
+    """
+    with gzip.open(str(path), "rb") as file:
+        try:
+            for line in file:
+                if not line.endswith(b"\n"):
+                    break
+                yield json.loads(line)
+        except (EOFError, zlib.error, gzip.BadGzipFile) as error:
+            # process did not close file, records up to its last flush are complete
+            logger.warning("Recording %s ends with incomplete record: %s", path, error)
+
+
+class RecordingTransport:
+    """
+    Proxy of zeep transport recording every SOAP call and every loaded document
+    """
+
+    def __init__(self, path, transport) -> None:
+        """
+        :param path: recording file, appended to if it exists
+        :param transport: zeep transport sending the calls
+        """
+        self.recorder = session_recorder(path)
+        self._transport = transport
+
+    def __getattr__(self, name: str):
+        return getattr(self._transport, name)
+
+    def post_xml(self, address, envelope, headers):
+        from zeep.wsdl.utils import etree_to_string
+
+        return self.post(address, etree_to_string(envelope), headers)
+
+    def post(self, address, message, headers):
+        started = time.time()
+        start = time.perf_counter()
+        response = self._transport.post(address, message, headers)
+        self.recorder.record_call(address, headers, message, response.status_code,
+                                  response.headers.get("Content-Type", ""), response.content,
+                                  started, time.perf_counter() - start)
+        return response
+
+    def load(self, url):
+        content = self._transport.load(url)
+        self.recorder.record_document(url, content)
+        return content
+
+    def record_documents(self, url: str, settings) -> None:
+        """
+        Records WSDL and imported XSD documents of service, once per recording file and process
+        Documents are loaded from service because compiled clients of WsdlCache do not keep them
+        :param url: WSDL url
+        :param settings: zeep settings
+        """
+        if url in self.recorder.documents:
+            return
+        from zeep import Client
+
+        Client(url, settings=settings, transport=self)
+
+
+class ReplayTransport:
+    """
+    zeep transport answering from recording instead of ODIS
+    Request is answered by next recorded response of the same request, or of the same operation if the request
+    was not recorded. Responses are served again from the first one when exhausted, so replay may run longer
+    than the recording.
+    """
+
+    def __init__(self, path, speed: float = 1.0) -> None:
+        """
+        :param path: recording file
+        :param speed: 1.0 replays recorded service latency, 10.0 ten times faster, 0 without delay
+        """
+        self.path = str(path)
+        self.speed = float(speed or 0.0)
+        self.served = 0
+        self.cache = None
+        self.load_timeout = None
+        self.operation_timeout = None
+        self.documents = {}
+        self._by_request = {}
+        self._by_operation = {}
+        self._positions = {}
+        self._lock = threading.Lock()
+        calls = 0
+        for record in read_records(path):
+            if record["kind"] == "document":
+                self.documents.setdefault(record["url"], record["content"].encode("latin-1"))
+            elif record["kind"] == "call":
+                calls += 1
+                self._by_request.setdefault((record["operation"], record["request"]), []).append(record)
+                self._by_operation.setdefault(record["operation"], []).append(record)
+        self.calls = calls
+        if not self.documents:
+            raise ReplayMismatch(f"Recording {path} contains no WSDL document")
+        self.wsdl_url = next(url for url in self.documents if url.lower().endswith("?wsdl"))
+
+    def __len__(self) -> int:
+        return self.calls
+
+    def client(self, settings) -> "zeep.Client":
+        """
+        :param settings: zeep settings
+        :return: zeep client compiled from recorded documents, calls are answered by this transport
+        """
+        from zeep import Client
+
+        return Client(self.wsdl_url, settings=settings, transport=self)
+
+    def load(self, url):
+        content = self.documents.get(url)
+        if content is None:
+            raise ReplayMismatch(f"Document {url} was not recorded")
+        return content
+
+    def _next(self, operation: str, request: str) -> dict:
+        key = (operation, request)
+        records = self._by_request.get(key)
+        if records is None:
+            key = operation
+            records = self._by_operation.get(operation)
+            if records is None:
+                raise ReplayMismatch(f"Operation {operation} was not recorded")
+        with self._lock:
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+            self.served += 1
+        return records[position % len(records)]
+
+    def post_xml(self, address, envelope, headers):
+        from zeep.wsdl.utils import etree_to_string
+
+        return self.post(address, etree_to_string(envelope), headers)
+
+    def post(self, address, message, headers):
+        import requests
+
+        start = time.perf_counter()
+        message = message if isinstance(message, bytes) else message.encode()
+        record = self._next(operation_name(headers, message), _text(message))
+        response = requests.Response()
+        response.status_code = record["status"]
+        response.url = address
+        if record["content_type"]:
+            response.headers["Content-Type"] = record["content_type"]
+        response._content = record["response"].encode("latin-1")
+        if self.speed:
+            delay = record["duration"] / self.speed - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+        return response
+
+    def get(self, address, params, headers):
+        raise ReplayMismatch(f"HTTP GET {address} is not recorded")
+
+    @contextmanager
+    def settings(self, timeout=None):
+        yield
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,113 @@
+"""Cache of ECU responses to read-only diagnostic services"""
+import threading
+import time
+from collections import OrderedDict
+
+# service id: cached subfunctions, None caches every request of the service
+CACHEABLE_SERVICES = {0x22: None,  # ReadDataByIdentifier
+                      0x19: {0x0A}}  # ReadDTCInformation: reportSupportedDTC
+# services which neither are cached nor change ECU state: ReadDTCInformation, TesterPresent
+READ_ONLY_SERVICES = {0x19, 0x22, 0x3E}
+NEGATIVE_RESPONSE_SID = 0x7F
+MAX_ENTRIES = 256
+TTL = 30.0
+
+
+class ResponseCache:
+    """
+    LRU cache of responses keyed by connection handle and request
+    Entries expire after ttl seconds and are evicted when cache exceeds max_entries
+    Any request which may change ECU state (session change 10 xx, ECU reset 11 xx, writes, routines,
+    clear DTC, downloads ...) invalidates entries of its connection handle
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, ttl: float = TTL, services: dict = None,
+                 clock=time.monotonic) -> None:
+        """
+        :param max_entries: maximal number of cached responses
+        :param ttl: time in seconds a response stays valid
+        :param services: service id: set of cached subfunctions or None for whole service
+        :param clock: time source
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.services = CACHEABLE_SERVICES if services is None else services
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cacheable(self, request: bytes) -> bool:
+        """
+        :param request: raw diagnostic request
+        :return: True if response to request can be cached
+        """
+        if not request or request[0] not in self.services:
+            return False
+        subfunctions = self.services[request[0]]
+        return subfunctions is None or (len(request) > 1 and request[1] in subfunctions)
+
+    def get(self, handle, request):
+        """
+        :param handle: connection handle
+        :param request: raw diagnostic request or operation name
+        :return: cached response, None on miss
+        """
+        key = (handle, request)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._clock() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, handle, request, response) -> None:
+        """
+        Stores response, negative responses are not cached
+        :param handle: connection handle
+        :param request: raw diagnostic request or operation name
+        :param response: response bytes or operation result
+        """
+        if isinstance(response, bytes) and response[:1] == bytes((NEGATIVE_RESPONSE_SID,)):
+            return
+        key = (handle, request)
+        with self._lock:
+            self._entries[key] = (self._clock(), response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def observe(self, handle, request: bytes) -> None:
+        """
+        Invalidates entries of connection handle if request may change ECU state
+        :param handle: connection handle
+        :param request: raw diagnostic request which was sent
+        """
+        if request and request[0] in READ_ONLY_SERVICES:
+            return
+        self.invalidate(handle)
+
+    def invalidate(self, handle=None) -> None:
+        """
+        :param handle: connection handle whose entries are dropped, None drops all entries
+        """
+        with self._lock:
+            self.invalidations += 1
+            if handle is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0] == handle]:
+                del self._entries[key]
+
+    def stats(self) -> str:
+        """
+        :return: hit, miss and invalidation counters and number of cached responses
+        """
+        return (f"hits={self.hits} misses={self.misses} invalidations={self.invalidations} "
+                f"entries={len(self._entries)}")
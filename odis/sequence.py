@@ -0,0 +1,300 @@
+"""Diagnostic sequence scripts executed on Odis within one command
+
+Script is compiled once per path and modification time. A run sends its requests back to back and checks
+responses on server side, without socket round trip and client string handling per step.
+Report holds result and timings per script line.
+
+Script, one statement per line, # starts comment:
+    on_fail abort                           # abort (default) or continue with next step after failed step
+    abort_if 7F ?? 22                       # stop run if any response matches, may be given several times
+    send 10 03 expect 50 03 *               # request and expected response mask
+    send 22 F1 90 expect /^62 F1 90 /       # regex searched in response hex, example: 62 F1 90 57 56
+    send 3E 00                              # any response passes
+    delay 50                                # milliseconds
+    repeat 10
+        send 22 F1 8C expect 62 F1 8C ?? ?? ?? ??
+    end
+Mask: hex bytes, ?? matches any byte, 5? any low nibble, trailing * any number of further bytes,
+without * response length must equal mask length.
+
+Report:
+    PASS steps=13 failed=0 time=41.260ms
+    L3 send 10 03 n=1 failed=0 mean=3.120ms max=3.120ms
+    L9 send 22 F1 8C n=10 failed=0 mean=2.952ms max=3.404ms
+Failed steps add lines with expected and received response (first MAX_REPORTED_FAILURES only),
+a run stopped by abort_if starts with ABORT.
+"""
+import os
+import re
+import threading
+import time
+
+try:
+    from odis.raw_service_codec import encode_request
+except ModuleNotFoundError:
+    from raw_service_codec import encode_request
+from modules.custom_exceptions import SequenceSyntaxError
+
+MAX_REPORTED_FAILURES = 10
+ON_FAIL_MODES = ("abort", "continue")
+
+_compiled = {}
+_compiled_lock = threading.Lock()
+
+
+def _hex(response: bytes) -> str:
+    return response.hex(" ").upper()
+
+
+class ResponseMask:
+    """
+    Expected response bytes with wildcard nibbles, compared as one masked integer
+    """
+
+    def __init__(self, text: str) -> None:
+        """
+        :param text: mask, example: '62 F1 90 ?? *'
+        """
+        self.text = text
+        tokens = text.split()
+        self.open_ended = bool(tokens) and tokens[-1] == "*"
+        if self.open_ended:
+            tokens.pop()
+        digits = "".join(token if len(token) % 2 == 0 else "" for token in tokens)
+        if len(digits) != sum(len(token) for token in tokens) or not re.fullmatch(r"[0-9A-Fa-f?]*", digits):
+            raise ValueError(f"Invalid response mask: {text}")
+        self.length = len(digits) // 2
+        self.value = int("".join("0" if digit == "?" else digit for digit in digits) or "0", 16)
+        self.mask = int("".join("0" if digit == "?" else "F" for digit in digits) or "0", 16)
+
+    def matches(self, response: bytes) -> bool:
+        if len(response) != self.length and not (self.open_ended and len(response) > self.length):
+            return False
+        return int.from_bytes(response[:self.length], "big") & self.mask == self.value
+
+
+class ResponsePattern:
+    """
+    Regular expression searched in response hex, bytes uppercase and separated by single space
+    """
+
+    def __init__(self, text: str) -> None:
+        """
+        :param text: pattern within slashes, example: '/^62 F1 90 /'
+        """
+        self.text = text
+        try:
+            self.pattern = re.compile(text[1:-1])
+        except re.error as error:
+            raise ValueError(f"Invalid response pattern: {text}: {error}")
+
+    def matches(self, response: bytes) -> bool:
+        return self.pattern.search(_hex(response)) is not None
+
+
+def parse_expectation(text: str):
+    """
+    :param text: response mask or /regex/
+    :return: ResponseMask or ResponsePattern
+    """
+    text = text.strip()
+    if len(text) >= 2 and text.startswith("/") and text.endswith("/"):
+        return ResponsePattern(text)
+    return ResponseMask(text)
+
+
+class Send:
+    def __init__(self, line: int, index: int, text: str, request: bytes, expectation) -> None:
+        self.line = line
+        self.index = index
+        self.text = text
+        self.request = request
+        self.expectation = expectation
+
+
+class Delay:
+    def __init__(self, line: int, seconds: float) -> None:
+        self.line = line
+        self.seconds = seconds
+
+
+class Repeat:
+    def __init__(self, line: int, count: int) -> None:
+        self.line = line
+        self.count = count
+        self.body = []
+
+
+class SequenceResult:
+    """
+    Per-step statistics of one run
+    """
+
+    def __init__(self, sequence: "Sequence") -> None:
+        self.sequence = sequence
+        self.status = "PASS"
+        self.steps = 0
+        self.failed = 0
+        self.elapsed = 0.0
+        # per send statement: [count, failed, total seconds, max seconds]
+        self.timings = [[0, 0, 0.0, 0.0] for _ in sequence.sends]
+        self.failures = []
+
+    @property
+    def passed(self) -> bool:
+        return self.status == "PASS"
+
+    def record(self, step: Send, duration: float, passed: bool, detail: str) -> None:
+        timing = self.timings[step.index]
+        timing[0] += 1
+        timing[2] += duration
+        if duration > timing[3]:
+            timing[3] = duration
+        self.steps += 1
+        if not passed:
+            timing[1] += 1
+            self.failed += 1
+            self.status = "FAIL"
+            if len(self.failures) < MAX_REPORTED_FAILURES:
+                self.failures.append(f"L{step.line} #{timing[0]} {detail}")
+
+    def report(self) -> str:
+        """
+        :return: result line, one timing line per executed send statement, failure lines
+        """
+        lines = [f"{self.status} steps={self.steps} failed={self.failed} time={self.elapsed * 1000:.3f}ms"]
+        for step, (count, failed, total, maximum) in zip(self.sequence.sends, self.timings):
+            if count:
+                lines.append(f"L{step.line} send {step.text} n={count} failed={failed} "
+                             f"mean={total / count * 1000:.3f}ms max={maximum * 1000:.3f}ms")
+        lines.extend(self.failures)
+        return "\n".join(lines)
+
+
+class Sequence:
+    """
+    Compiled sequence script
+    """
+
+    def __init__(self, steps: list, sends: list, abort_conditions: list, continue_on_fail: bool) -> None:
+        self.steps = steps
+        self.sends = sends
+        self.abort_conditions = abort_conditions
+        self.continue_on_fail = continue_on_fail
+
+    def run(self, odis) -> SequenceResult:
+        """
+        :param odis: Odis connected to ECU
+        :return: result of run
+        """
+        result = SequenceResult(self)
+        start = time.perf_counter()
+        self._run(self.steps, odis.send_raw_service_bytes, result)
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    def _run(self, steps: list, send, result: SequenceResult) -> bool:
+        """
+        :return: False if run stops
+        """
+        for step in steps:
+            if isinstance(step, Send):
+                start = time.perf_counter()
+                try:
+                    response = send(step.request)
+                except Exception as error:
+                    result.record(step, time.perf_counter() - start, False, f"error: {error}")
+                    if not self.continue_on_fail:
+                        return False
+                    continue
+                duration = time.perf_counter() - start
+                expectation = step.expectation
+                if expectation is None or expectation.matches(response):
+                    result.record(step, duration, True, "")
+                else:
+                    result.record(step, duration, False, f"expected {expectation.text} got {_hex(response)}")
+                    if not self.continue_on_fail:
+                        return False
+                for condition in self.abort_conditions:
+                    if condition.matches(response):
+                        result.status = "ABORT"
+                        result.failures.append(f"L{step.line} abort_if {condition.text} got {_hex(response)}")
+                        return False
+            elif isinstance(step, Delay):
+                time.sleep(step.seconds)
+            else:
+                for _ in range(step.count):
+                    if not self._run(step.body, send, result):
+                        return False
+        return True
+
+
+def compile_sequence(source: str, name: str = "<sequence>") -> Sequence:
+    """
+    :param source: script text
+    :param name: script name used in syntax errors
+    :return: compiled sequence, SequenceSyntaxError if script is not valid
+    """
+    blocks = [Repeat(0, 1)]
+    sends, abort_conditions = [], []
+    continue_on_fail = False
+    for number, line in enumerate(source.splitlines(), start=1):
+        statement = line.split("#", 1)[0].strip()
+        if not statement:
+            continue
+        keyword, _, argument = statement.partition(" ")
+        keyword, argument = keyword.lower(), argument.strip()
+        try:
+            if keyword == "send":
+                request, _, expected = argument.partition(" expect ")
+                if argument.startswith("expect "):
+                    raise ValueError("send without request")
+                step = Send(number, len(sends), " ".join(request.split()).upper(), encode_request(request),
+                            parse_expectation(expected) if expected.strip() else None)
+                if not step.request:
+                    raise ValueError("send without request")
+                sends.append(step)
+                blocks[-1].body.append(step)
+            elif keyword == "delay":
+                blocks[-1].body.append(Delay(number, float(argument) / 1000))
+            elif keyword == "repeat":
+                block = Repeat(number, int(argument))
+                if block.count < 0:
+                    raise ValueError("negative repeat count")
+                blocks[-1].body.append(block)
+                blocks.append(block)
+            elif keyword == "end":
+                if len(blocks) == 1:
+                    raise ValueError("end without repeat")
+                blocks.pop()
+            elif keyword == "abort_if":
+                abort_conditions.append(parse_expectation(argument))
+            elif keyword == "on_fail":
+                if argument not in ON_FAIL_MODES:
+                    raise ValueError(f"on_fail expects one of {', '.join(ON_FAIL_MODES)}")
+                continue_on_fail = argument == "continue"
+            else:
+                raise ValueError(f"unknown statement {keyword}")
+        except ValueError as error:
+            raise SequenceSyntaxError(f"{name}:{number}: {error}: {line.strip()}")
+    if len(blocks) > 1:
+        raise SequenceSyntaxError(f"{name}:{blocks[-1].line}: repeat without end")
+    return Sequence(blocks[0].body, sends, abort_conditions, continue_on_fail)
+
+
+def load_sequence(path: str) -> Sequence:
+    """
+    :param path: script file
+    :return: compiled sequence, compiled again only if file changed since last call
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _compiled.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with open(path, encoding="utf-8") as file:
+        sequence = compile_sequence(file.read(), os.path.basename(path))
+    with _compiled_lock:
+        _compiled[path] = (version, sequence)
+    return sequence
@@ -0,0 +1,259 @@
+"""TesterPresent keep-alive of open ECU connections
+
+One background thread drives a hashed timer wheel: every connection handle has its next deadline in the slot
+of its tick, a tick visits one slot only, so cost per tick does not grow with number of handles.
+Each handle has a lock which user commands hold while they run (see busy), any user request restarts
+the handle period because it keeps the diagnostic session alive as well. Restart only moves the deadline,
+the wheel entry is moved when its tick comes, so user requests cost no wheel operation.
+pause/paused stop all sends, example: during flashing.
+
+Per handle statistics:
+    sent, errors - TesterPresent requests sent and failed
+    deferred - deadlines skipped because user command was running on handle
+    missed - sends later than tolerance after deadline
+    jitter - histogram of send time minus deadline
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from modules.histogram import LatencyHistogram
+from modules.logger import get_logger
+from modules.metrics import metrics
+
+logger = get_logger(__name__)
+
+# TesterPresent with suppressed positive response
+TESTER_PRESENT = b"\x3e\x80"
+PERIOD = 2.0
+TICK = 0.01
+SLOTS = 256
+
+
+class HandleState:
+    __slots__ = ("handle", "lock", "deadline", "generation", "sent", "errors", "deferred", "missed", "jitter")
+
+    def __init__(self, handle: int) -> None:
+        self.handle = handle
+        self.lock = threading.Lock()
+        self.deadline = 0.0
+        # incremented on every reschedule, wheel entries of older generation are ignored
+        self.generation = 0
+        self.sent = 0
+        self.errors = 0
+        self.deferred = 0
+        self.missed = 0
+        self.jitter = LatencyHistogram()
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel, entries are (tick, generation, item), items due in later rounds stay in their slot
+    Not thread safe, caller holds lock
+    """
+
+    def __init__(self, tick: float = TICK, slots: int = SLOTS) -> None:
+        self.tick = tick
+        self.slots = [[] for _ in range(slots)]
+        self.current = None
+
+    def schedule(self, deadline: float, generation: int, item) -> None:
+        tick = int(deadline / self.tick)
+        if self.current is not None and tick <= self.current:
+            tick = self.current + 1
+        self.slots[tick % len(self.slots)].append((tick, generation, item))
+
+    def advance(self, now: float) -> list:
+        """
+        :param now: current time
+        :return: (generation, item) of entries due until now
+        """
+        now_tick = int(now / self.tick)
+        if self.current is None:
+            self.current = now_tick - 1
+        due = []
+        # after long stall every slot is visited once
+        for tick in range(self.current + 1, min(now_tick, self.current + len(self.slots)) + 1):
+            slot = self.slots[tick % len(self.slots)]
+            if slot:
+                waiting = []
+                for entry in slot:
+                    (due if entry[0] <= now_tick else waiting).append(entry)
+                slot[:] = waiting
+        self.current = max(self.current, now_tick)
+        return [(generation, item) for _, generation, item in sorted(due, key=lambda entry: entry[0])]
+
+
+class TesterPresentScheduler:
+    """
+    Sends TesterPresent on every registered connection handle once per period
+    Example:
+        scheduler = TesterPresentScheduler(send, period=2.0)  # send(handle, request)
+        scheduler.start()
+        scheduler.add(odis.connection_handle)
+        with scheduler.busy(handle):  # user request on handle
+            ...
+        with scheduler.paused():  # flashing
+            ...
+    """
+
+    def __init__(self, send, period: float = PERIOD, request: bytes = TESTER_PRESENT, tick: float = TICK,
+                 slots: int = SLOTS, tolerance: float = None) -> None:
+        """
+        :param send: function(handle, request) sending raw request on connection handle
+        :param period: seconds between TesterPresent requests of handle
+        :param request: keep-alive request
+        :param tick: timer wheel resolution in seconds
+        :param slots: number of timer wheel slots
+        :param tolerance: lateness in seconds counted as missed deadline, default: 10% of period, at least 2 ticks
+        """
+        self.period = float(period)
+        self.request = request
+        self.tolerance = max(self.period / 10, 2 * tick) if tolerance is None else tolerance
+        self._send = send
+        self._wheel = TimerWheel(tick, slots)
+        self._handles = {}
+        self._lock = threading.Lock()
+        self._pauses = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="tester_present", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _schedule(self, state: HandleState, deadline: float) -> None:
+        with self._lock:
+            state.generation += 1
+            state.deadline = deadline
+            self._wheel.schedule(deadline, state.generation, state)
+
+    def add(self, handle: int) -> None:
+        """
+        :param handle: connection handle, first TesterPresent is sent one period later
+        """
+        with self._lock:
+            state = self._handles.get(handle)
+            if state is None:
+                state = self._handles[handle] = HandleState(handle)
+        self._schedule(state, time.monotonic() + self.period)
+
+    def remove(self, handle: int) -> None:
+        with self._lock:
+            state = self._handles.pop(handle, None)
+            if state is not None:
+                state.generation += 1
+
+    def handles(self) -> list:
+        with self._lock:
+            return list(self._handles)
+
+    @contextmanager
+    def busy(self, handle: int):
+        """
+        Holds handle lock while user request runs, restarts handle period afterwards
+        """
+        state = self._handles.get(handle)
+        if state is None:
+            yield
+            return
+        with state.lock:
+            yield
+        # wheel entry stays, it is moved to the new deadline when its tick comes
+        state.deadline = time.monotonic() + self.period
+
+    def pause(self) -> None:
+        with self._lock:
+            self._pauses += 1
+
+    def resume(self) -> None:
+        with self._lock:
+            self._pauses = max(0, self._pauses - 1)
+        now = time.monotonic()
+        for handle in self.handles():
+            state = self._handles.get(handle)
+            if state is not None:
+                self._schedule(state, now + self.period)
+
+    @contextmanager
+    def paused(self):
+        self.pause()
+        try:
+            yield
+        finally:
+            self.resume()
+
+    def _run(self) -> None:
+        tick = self._wheel.tick
+        while not self._stop.wait(tick):
+            now = time.monotonic()
+            with self._lock:
+                due = self._wheel.advance(now)
+                paused = self._pauses > 0
+                # resume() schedules all handles again
+                due = [state for generation, state in due if generation == state.generation and not paused]
+                for state in [state for state in due if state.deadline > now + tick]:
+                    self._wheel.schedule(state.deadline, state.generation, state)
+            for state in due:
+                if state.deadline <= now + tick:
+                    self._fire(state)
+
+    def _fire(self, state: HandleState) -> None:
+        if not state.lock.acquire(blocking=False):
+            # user request is running on handle, it moves the deadline when it ends
+            state.deferred += 1
+            self._schedule(state, time.monotonic() + self.period)
+            return
+        try:
+            now = time.monotonic()
+            lateness = max(0.0, now - state.deadline)
+            state.jitter.record(lateness)
+            if lateness > self.tolerance:
+                state.missed += 1
+            try:
+                self._send(state.handle, self.request)
+                state.sent += 1
+            except Exception as error:
+                state.errors += 1
+                logger.warning("TesterPresent on connection handle %s failed: %s", state.handle, error)
+            metrics.observe("tester_present.send", time.monotonic() - now)
+        finally:
+            state.lock.release()
+        deadline = state.deadline + self.period
+        now = time.monotonic()
+        self._schedule(state, deadline if deadline > now else now + self.period)
+
+    def stats(self) -> dict:
+        """
+        :return: per handle sent, errors, deferred, missed and jitter snapshot in seconds
+        """
+        with self._lock:
+            states = list(self._handles.values())
+        return {state.handle: {"sent": state.sent, "errors": state.errors, "deferred": state.deferred,
+                               "missed": state.missed, "jitter": state.jitter.snapshot()} for state in states}
+
+    def summary(self) -> str:
+        """
+        :return: one line per handle with jitter in milliseconds
+        """
+        lines = [f"period={self.period:g}s running={self.running} paused={self._pauses > 0}"]
+        for handle, stats in self.stats().items():
+            jitter = stats["jitter"]
+            lines.append(f"handle {handle} sent={stats['sent']} errors={stats['errors']} "
+                         f"deferred={stats['deferred']} missed={stats['missed']} "
+                         f"jitter p50<={jitter['p50'] * 1000:.3f}ms p99<={jitter['p99'] * 1000:.3f}ms "
+                         f"max={jitter['max'] * 1000:.3f}ms")
+        return "\n".join(lines)
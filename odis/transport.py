@@ -0,0 +1,82 @@
+"""Pooled keep-alive HTTP transports for ODIS web service clients
+
+requests, httpx and zeep are imported when the first transport is created
+"""
+import threading
+
+# connections kept alive per ODIS instance (host:port)
+POOL_MAXSIZE = 8
+# number of ODIS instances (hosts) whose connection pools are kept
+POOL_CONNECTIONS = 16
+CONNECT_TIMEOUT = 5
+# flashProgramming answers only after flashing finished
+OPERATION_TIMEOUT = 3600
+WSDL_TIMEOUT = 30
+
+_shared_transport = None
+_shared_lock = threading.Lock()
+
+
+def pooled_session(pool_connections: int = POOL_CONNECTIONS, pool_maxsize: int = POOL_MAXSIZE) -> "requests.Session":
+    """
+    :param pool_connections: number of hosts whose connection pools are kept
+    :param pool_maxsize: connections kept alive per host
+    :return: requests session reusing connections
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def pooled_transport(pool_connections: int = POOL_CONNECTIONS, pool_maxsize: int = POOL_MAXSIZE,
+                     connect_timeout: float = CONNECT_TIMEOUT,
+                     operation_timeout: float = OPERATION_TIMEOUT) -> "zeep.Transport":
+    """
+    zeep transport over pooled keep-alive session
+    Unreachable service fails within connect_timeout, long operations may run up to operation_timeout
+    :param pool_connections: number of hosts whose connection pools are kept
+    :param pool_maxsize: connections kept alive per host, several threads may call the same ODIS instance
+    :param connect_timeout: time to establish connection in seconds
+    :param operation_timeout: time to wait for operation response in seconds
+    :return: zeep transport
+    """
+    from zeep import Transport
+
+    return Transport(timeout=WSDL_TIMEOUT, operation_timeout=(connect_timeout, operation_timeout),
+                     session=pooled_session(pool_connections, pool_maxsize))
+
+
+def shared_transport() -> "zeep.Transport":
+    """
+    :return: pooled transport shared by all Odis instances of process
+    """
+    global _shared_transport
+    with _shared_lock:
+        if _shared_transport is None:
+            _shared_transport = pooled_transport()
+        return _shared_transport
+
+
+def async_transport(max_connections: int = POOL_MAXSIZE, connect_timeout: float = CONNECT_TIMEOUT,
+                    operation_timeout: float = OPERATION_TIMEOUT):
+    """
+    zeep async transport over httpx client with keep-alive connection pool
+    Client is bound to event loop which uses it first, create one transport per event loop
+    :param max_connections: connections kept alive
+    :param connect_timeout: time to establish connection in seconds
+    :param operation_timeout: time to wait for operation response in seconds
+    :return: zeep async transport
+    """
+    import httpx
+    from zeep.transports import AsyncTransport
+
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    timeout = httpx.Timeout(operation_timeout, connect=connect_timeout)
+    # clients are passed explicitly, zeep creates them with proxies argument removed by httpx 0.28
+    return AsyncTransport(client=httpx.AsyncClient(limits=limits, timeout=timeout),
+                          wsdl_client=httpx.Client(timeout=WSDL_TIMEOUT))
@@ -0,0 +1,140 @@
+"""Persistent cache of ODIS web service WSDL/XSD documents used for SOAP client creation"""
+import hashlib
+import json
+import os
+import shutil
+import time
+
+from modules.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_CACHE_DIRECTORY = os.environ.get("ODIS_WSDL_CACHE",
+                                         os.path.join(os.path.expanduser("~"), ".odis", "wsdl_cache"))
+MANIFEST = "manifest.json"
+
+
+class DocumentCache:
+    """
+    zeep cache backend (add/get interface of zeep.cache.Base) storing each fetched document as file within directory
+    """
+
+    def __init__(self, directory) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url) -> str:
+        return os.path.join(self.directory, hashlib.sha1(url.encode()).hexdigest() + ".xml")
+
+    def add(self, url, content):
+        if isinstance(content, str):
+            content = content.encode()
+        temporary_path = self._path(url) + ".tmp"
+        with open(temporary_path, "wb") as file:
+            file.write(content)
+        os.replace(temporary_path, self._path(url))
+
+    def get(self, url):
+        try:
+            with open(self._path(url), "rb") as file:
+                return file.read()
+        except OSError:
+            return None
+
+    @property
+    def manifest(self) -> dict:
+        try:
+            with open(os.path.join(self.directory, MANIFEST)) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    @manifest.setter
+    def manifest(self, manifest: dict):
+        with open(os.path.join(self.directory, MANIFEST), "w") as file:
+            json.dump(manifest, file)
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
+
+
+class WsdlCache:
+    """
+    Builds zeep clients from cached documents
+    Documents are stored per WSDL hash and validated against automation API version of the service.
+    Compiled clients are kept in memory so later open() calls within the same process skip schema compilation.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIRECTORY) -> None:
+        self.directory = directory
+        self._clients = {}
+
+    @staticmethod
+    def fetch(url, timeout=30) -> bytes:
+        import urllib.request
+
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return response.read()
+
+    def client(self, url, settings, transport=None) -> "zeep.Client":
+        """
+        :param url: WSDL url of ODIS automation service
+        :param settings: zeep settings
+        :param transport: zeep transport used for operation calls, transport loading documents if None
+        :return: zeep client
+        """
+        from zeep import Client
+
+        client = self._compiled(url, settings)
+        if transport is None:
+            return client
+        return Client(client.wsdl, settings=settings, transport=transport)
+
+    def async_client(self, url, settings, transport) -> "zeep.AsyncClient":
+        """
+        :param url: WSDL url of ODIS automation service
+        :param settings: zeep settings
+        :param transport: zeep async transport
+        :return: zeep async client sharing compiled documents with sync clients
+        """
+        from zeep import AsyncClient
+
+        return AsyncClient(self._compiled(url, settings).wsdl, settings=settings, transport=transport)
+
+    def _compiled(self, url, settings) -> "zeep.Client":
+        from zeep import Client, Transport
+
+        start = time.perf_counter()
+        wsdl = self.fetch(url)
+        wsdl_hash = hashlib.sha256(wsdl).hexdigest()[:16]
+
+        client = self._clients.get((url, wsdl_hash))
+        if client is not None:
+            state = "memory"
+        else:
+            documents = DocumentCache(os.path.join(self.directory, wsdl_hash))
+            manifest = documents.manifest
+            state = "warm" if manifest else "cold"
+            documents.add(url, wsdl)
+            client = Client(url, settings=settings, transport=Transport(cache=documents))
+            api_version = str(client.service.getAutomationApiVersion())
+            if manifest and manifest.get("api_version") != api_version:
+                logger.info("Automation API version changed from %s to %s, WSDL cache rebuilt",
+                            manifest.get('api_version'), api_version)
+                state = "cold"
+                documents.clear()
+                documents.add(url, wsdl)
+                client = Client(url, settings=settings, transport=Transport(cache=documents))
+            documents.manifest = {"api_version": api_version, "wsdl_hash": wsdl_hash, "url": url}
+            self._clients[(url, wsdl_hash)] = client
+
+        logger.info("SOAP client created in %.3fs (%s cache)", time.perf_counter() - start, state)
+        return client
+
+    def clear(self):
+        """
+        Removes all cached documents and compiled clients
+        """
+        self._clients.clear()
+        shutil.rmtree(self.directory, ignore_errors=True)
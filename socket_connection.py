@@ -1,8 +1,11 @@
 """Socket that handles ODIS commands"""
 import socket
-from interfaces.command_interface import CommandInterface
+from interfaces.command_interface import CommandInterface, encode_response
+from interfaces.framing import read_first_message, is_handshake, serve_frames
 from odis.odis import Odis
-from modules.logger import logger
+from modules.logger import get_logger, configure_logging
+
+logger = get_logger(__name__)
 
 
 class SocketServer:
@@ -10,6 +13,7 @@ class SocketServer:
         self.host = host
         self.port = port
         self.server_socket = None
+        self.first_call = True
         self.command_interface = CommandInterface(Odis)
 
     def start_server(self):
@@ -18,44 +22,59 @@ class SocketServer:
             self.server_socket.bind((self.host, self.port))
             self.server_socket.listen()  # Maximum number of queued connections
 
-            logger.info(f"Server listening on {self.host}:{self.port}")
+            logger.info("Server listening on %s:%s", self.host, self.port)
 
             while True:
                 client_socket, client_address = self.server_socket.accept()
-                logger.info(f"Accepted connection from {client_address}")
+                logger.info("Accepted connection from %s", client_address)
 
                 # Handle the connection and receive messages
                 self.handle_connection(client_socket)
 
         except socket.error as e:
-            logger.info(f"Server error: {e}")
+            logger.info("Server error: %s", e)
         finally:
             self.server_socket.close()
 
     def handle_connection(self, client_socket):
-        first_call = True
+        self.first_call = True
+        try:
+            data = read_first_message(client_socket)
+            if is_handshake(data):
+                logger.info("Framed protocol requested")
+                serve_frames(client_socket, data, self.process_message)
+                return
+
+            while data:
+                message = data.decode()
+                try:
+                    response = self.process_message(message)
+                except Exception as error:
+                    logger.debug("Sent: %s", error)
+                    client_socket.send(str(error).encode())
+                else:
+                    logger.debug("Sent: %s", response)
+                    client_socket.send(encode_response(response))
+                data = client_socket.recv(1024)
+        finally:
+            client_socket.close()
 
-        while True:
-            data = client_socket.recv(1024)
-            message = data.decode()
-            logger.info(f"Received: {message}")
-            try:
-                if first_call:
-                    self.command_interface.initialize_object(message)
-                    first_call = False
-                    client_socket.send("initialized with success".encode())
-                    continue
-                response = self.command_interface.execute_command(message)
-                logger.info(response)
-            except Exception as error:
-                logger.info("Sent: " + str(error))
-                client_socket.send(str(error).encode())
-            else:
-                logger.info("Sent: " + str(response))
-                client_socket.send(str(response).encode())
+    def process_message(self, message):
+        """
+        Executes received message, first message of connection initializes automation component
+        :param message: command string
+        :return: response
+        """
+        logger.debug("Received: %s", message)
+        if self.first_call:
+            self.command_interface.initialize_object(message)
+            self.first_call = False
+            return "initialized with success"
+        return self.command_interface.execute_command(message)
 
 
 if __name__ == "__main__":
+    configure_logging()
     # Example usage:
     host_ = "127.0.0.1"  # Change this to the desired host
     port_ = 12345  # Change this to the desired port
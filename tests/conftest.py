@@ -0,0 +1,66 @@
+"""Fixtures running Odis against local stand-in ODIS automation service"""
+import os
+
+import pytest
+
+from odis.mock_service import MockOdisService, mock_installation
+from odis.odis import Odis
+from odis.odis_pool import OdisPool
+from odis.wsdl_cache import WsdlCache
+
+# manual script talking to running socket server
+collect_ignore = ["socket_test.py"]
+
+
+@pytest.fixture
+def installation(tmp_path, monkeypatch):
+    """
+    :return: tool path and configuration path of fake ODIS installation, WSDL cache is kept in tmp_path
+    """
+    monkeypatch.setattr(Odis, "wsdl_cache", WsdlCache(os.path.join(tmp_path, "wsdl_cache")))
+    return mock_installation(str(tmp_path))
+
+
+@pytest.fixture
+def mock_service():
+    with MockOdisService() as service:
+        yield service
+
+
+@pytest.fixture
+def odis(installation, mock_service):
+    """
+    :return: Odis attached to stand-in service with vehicle project set
+    """
+    tool_path, configuration_path = installation
+    odis = Odis(tool_path=tool_path, configuration_path=configuration_path, tool_port=mock_service.port)
+    odis.attach()
+    odis.set_vehicle_project("MOCK")
+    yield odis
+    if odis.fast_path is not None:
+        odis.fast_path.close()
+
+
+class QuickCloseOdis(Odis):
+    def close(self):
+        self.service.exit()
+        return "Odis has been closed"
+
+
+@pytest.fixture
+def services():
+    services = [MockOdisService().start() for _ in range(2)]
+    yield services
+    for service in services:
+        service.stop()
+
+
+@pytest.fixture
+def pool(installation, services, monkeypatch):
+    monkeypatch.setattr("odis.odis.STARTUP_TIMEOUT", 1)
+    tool_path, configuration_path = installation
+    pool = OdisPool([{"tool_path": tool_path, "configuration_path": configuration_path, "tool_port": service.port}
+                     for service in services], odis_class=QuickCloseOdis, start_method="attach")
+    pool.start()
+    yield pool
+    pool.close()
@@ -0,0 +1,76 @@
+import asyncio
+import os
+
+import pytest
+
+from odis.async_odis import AsyncOdis
+from odis.odis import FLASH_SUCCESS
+from odis.tester_present import TESTER_PRESENT
+
+
+@pytest.fixture
+def async_odis(installation, mock_service):
+    tool_path, configuration_path = installation
+    odis = AsyncOdis(tool_path=tool_path, configuration_path=configuration_path, tool_port=mock_service.port)
+    odis.attach()
+    odis.set_vehicle_project("MOCK")
+    odis.connect_to_ecu(3)
+    yield odis
+    odis.stop_tester_present()
+
+
+def test_tester_present_waits_for_async_requests(async_odis):
+    async_odis.start_tester_present(0.05)
+    handle = async_odis.connection_handle
+    sent = []
+    send_raw_to = async_odis._send_raw_to
+
+    def recording_send(handle, request):
+        sent.append(request)
+        if request != TESTER_PRESENT:
+            assert async_odis.tester_present._handles[handle].lock.locked()
+        return send_raw_to(handle, request)
+    async_odis._send_raw_to = recording_send
+
+    async def requests():
+        return await asyncio.gather(*[async_odis.send_raw_service_async("22 F1 90") for _ in range(20)])
+
+    responses = asyncio.run(requests())
+
+    assert all(response.startswith("0X62 0XF1 0X90") for response in responses)
+    assert sent.count(b"\x22\xF1\x90") == 20
+    assert async_odis.tester_present.stats()[handle]["errors"] == 0
+
+
+def test_tester_present_is_paused_while_flashing(async_odis, mock_service, tmp_path):
+    container = os.path.join(tmp_path, "ecu.odx")
+    with open(container, "wb") as file:
+        file.write(bytes(1024))
+    mock_service.flash_duration = 0.3
+    async_odis.start_tester_present(0.05)
+    handle = async_odis.connection_handle
+
+    sent_before = async_odis.tester_present.stats()[handle]["sent"]
+
+    assert asyncio.run(async_odis.flash_async(container)) == FLASH_SUCCESS
+    # period is 50 ms, flashing takes 300 ms
+    assert async_odis.tester_present.stats()[handle]["sent"] - sent_before <= 1
+
+
+def test_async_and_sync_connections_are_shared(async_odis, mock_service):
+    handle = async_odis.connection_handle
+    connects = mock_service.calls["connectToEcu"]
+
+    async def connect():
+        await async_odis.connect_to_ecu_async(0x17)
+        return await async_odis.connect_to_ecu_async(3)
+
+    asyncio.run(connect())
+
+    assert async_odis.connection_handle == handle
+    assert mock_service.calls["connectToEcu"] == connects + 1
+    assert 0x17 in async_odis.connections
+
+    asyncio.run(async_odis.set_vehicle_project_async("MOCK"))
+    assert len(async_odis.connections) == 0
+    assert mock_service.open_connections == set()
@@ -0,0 +1,129 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from async_socket_connection import AsyncSocketServer
+
+
+class Component:
+    """
+    Automation component whose work command blocks, tracks how many commands run at once
+    """
+    lock = threading.Lock()
+    running = 0
+    max_running = 0
+
+    @classmethod
+    def initialize(cls, name: str):
+        return cls(name)
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.running = 0
+        self.max_running = 0
+
+    def work(self, seconds: float) -> str:
+        with Component.lock:
+            Component.running += 1
+            Component.max_running = max(Component.max_running, Component.running)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(seconds)
+        with Component.lock:
+            Component.running -= 1
+            self.running -= 1
+        return f"{self.name} worked"
+
+    def ping(self) -> str:
+        return f"{self.name} pong"
+
+
+@pytest.fixture(autouse=True)
+def reset_component():
+    Component.running = Component.max_running = 0
+
+
+class Client:
+    def __init__(self, reader, writer) -> None:
+        self.reader = reader
+        self.writer = writer
+
+    async def call(self, message: str) -> str:
+        self.writer.write(message.encode())
+        return (await self.reader.read(1024)).decode()
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+def serve(test):
+    """
+    Runs test coroutine with server and factory of connected clients
+    """
+    async def main():
+        server = AsyncSocketServer("127.0.0.1", 0, component_class=Component)
+        listener = await asyncio.start_server(server.handle_connection, "127.0.0.1", 0)
+        clients = []
+
+        async def connect() -> Client:
+            clients.append(Client(*await asyncio.open_connection(*listener.sockets[0].getsockname())))
+            return clients[-1]
+        try:
+            await asyncio.wait_for(test(server, connect), 10)
+        finally:
+            for client in clients:
+                client.close()
+            listener.close()
+            await listener.wait_closed()
+    asyncio.run(main())
+
+
+def test_clients_run_commands_at_once():
+    async def test(server, connect):
+        first, second = await connect(), await connect()
+        assert await first.call("initialize(first)") == "initialized"
+        assert await second.call("initialize(second)") == "initialized"
+
+        start = time.monotonic()
+        results = await asyncio.gather(first.call("work(0.3)"), second.call("work(0.3)"))
+
+        assert results == ["first worked", "second worked"]
+        assert time.monotonic() - start < 0.55
+        assert Component.max_running == 2
+    serve(test)
+
+
+def test_commands_of_shared_session_are_serialized():
+    async def test(server, connect):
+        first, second = await connect(), await connect()
+        assert await first.call("join_session(bench)") == "Joined session bench"
+        assert await second.call("join_session(bench)") == "Joined session bench"
+        assert await first.call("initialize(bench)") == "initialized"
+        assert await second.call("initialize(other)") == "Session bench already initialized"
+
+        start = time.monotonic()
+        results = await asyncio.gather(first.call("work(0.2)"), second.call("work(0.2)"))
+
+        assert results == ["bench worked", "bench worked"]
+        assert time.monotonic() - start >= 0.4
+        assert server.sessions.sessions["bench"].command_interface.obj.max_running == 1
+    serve(test)
+
+
+def test_other_clients_are_served_during_long_command():
+    async def test(server, connect):
+        busy = await connect()
+        await busy.call("initialize(busy)")
+        start = time.monotonic()
+        long_command = asyncio.ensure_future(busy.call("work(1.0)"))
+        await asyncio.sleep(0.05)
+
+        other = await connect()
+        assert await other.call("initialize(other)") == "initialized"
+        assert await other.call("ping()") == "other pong"
+        assert time.monotonic() - start < 0.5
+        assert not long_command.done()
+        assert await long_command == "busy worked"
+    serve(test)
@@ -0,0 +1,47 @@
+import pytest
+
+from interfaces.command_interface import run_command
+from interfaces.custom_exceptions import InvalidCommand
+
+
+def negative_for_routines(request: bytes) -> bytes:
+    """
+    Stand-in responses, routine control (31) is answered with requestOutOfRange
+    """
+    if request[:1] == b"\x31":
+        return b"\x7F\x31\x31"
+    return bytes(((request[0] + 0x40) & 0xFF,)) + request[1:]
+
+
+@pytest.fixture
+def connected(odis, mock_service):
+    mock_service.raw_responder = negative_for_routines
+    odis.connect_to_ecu(3)
+    return odis
+
+
+def test_batch_runs_all_commands(connected, mock_service):
+    assert run_command(connected, "batch(send_raw_service(10 03); send_raw_service_bytes(31 01 02 03); "
+                                  "send_raw_service_bytes(3E 00))") == "0X50 0X03\n0X7F 0X31 0X31\n0X7E 0X00"
+
+
+@pytest.mark.parametrize("command", ["send_raw_service", "send_raw_service_bytes"])
+def test_batch_until_negative_stops_at_first_negative_response(connected, mock_service, command):
+    calls = mock_service.calls.get("sendRawService", 0)
+
+    assert run_command(connected, f"batch_until_negative({command}(10 03); {command}(31 01 02 03); "
+                                  f"{command}(3E 00))") == "0X50 0X03\n0X7F 0X31 0X31"
+    assert mock_service.calls["sendRawService"] == calls + 2
+
+
+def test_batch_until_negative_stops_at_error(connected):
+    assert run_command(connected, "batch_until_negative(send_raw_service(10 03); close_connection_to_ecu(9); "
+                                  "send_raw_service(3E 00))") == "0X50 0X03\nECU_NOT_CONNECTED"
+
+
+def test_invalid_batch_is_rejected_as_whole(connected, mock_service):
+    calls = mock_service.calls.get("sendRawService", 0)
+
+    with pytest.raises(InvalidCommand, match="unknown_command"):
+        run_command(connected, "batch(send_raw_service(10 03); unknown_command())")
+    assert mock_service.calls.get("sendRawService", 0) == calls
@@ -0,0 +1,68 @@
+import io
+import tracemalloc
+import zipfile
+
+import pytest
+
+from odis.container_catalog import ContainerCatalog, read_container, read_metadata
+
+HEADER = (b'<?xml version="1.0" encoding="UTF-8"?><ODX><FLASH><ECU-MEMS><ECU-MEM><SHORT-NAME>EM</SHORT-NAME>'
+          b'<SDGS><SDG><SD SI="ECU-Address">0x03</SD><SD SI="PartNumber">8W0907115</SD></SDG></SDGS>'
+          b'<SESSIONS><SESSION><SHORT-NAME>S</SHORT-NAME><EXPECTED-IDENTS><EXPECTED-IDENT>'
+          b'<SHORT-NAME>SoftwareVersion</SHORT-NAME><IDENT-VALUES><IDENT-VALUE>0620</IDENT-VALUE>'
+          b'<IDENT-VALUE>0621</IDENT-VALUE></IDENT-VALUES></EXPECTED-IDENT></EXPECTED-IDENTS>'
+          b'</SESSION></SESSIONS>')
+BLOCKS = b"".join(b'<ABLOCK><SHORT-NAME>B%d</SHORT-NAME><LONG-NAME>block</LONG-NAME></ABLOCK>' % index
+                  for index in range(20000))
+FLASHDATA = b'<FLASHDATAS><FLASHDATA><DATA>' + b"AB" * 1000000 + b'</DATA></FLASHDATA></FLASHDATAS>'
+FOOTER = b'</ECU-MEM></ECU-MEMS></FLASH></ODX>'
+
+
+class CountingStream(io.BytesIO):
+    def __init__(self, data: bytes) -> None:
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def test_metadata_of_odx_without_ecu_name():
+    assert read_metadata(io.BytesIO(HEADER + BLOCKS + FLASHDATA + FOOTER)) == {
+        "ecu_address": "0x03", "part_number": "8W0907115", "software_version": "0620"}
+
+
+def test_parsing_stops_at_flash_data_and_releases_elements():
+    stream = CountingStream(HEADER + BLOCKS + FLASHDATA + FOOTER)
+    tracemalloc.start()
+    try:
+        read_metadata(stream)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert stream.bytes_read < len(HEADER + BLOCKS) + 256 * 1024
+    assert peak < 1024 * 1024
+
+
+def test_odx_members_are_not_read_with_index(tmp_path):
+    path = str(tmp_path / "brake.pdx")
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("index.xml", b'<CATALOG><ECU-NAME>Brake</ECU-NAME><ECU-ADDRESS>0x03</ECU-ADDRESS></CATALOG>')
+        archive.writestr("brake.odx-f", b'<ODX><SD SI="PartNumber">8W0907115</SD></ODX>')
+
+    assert read_container(path) == {"ecu_name": "Brake", "ecu_address": 3}
+
+
+def test_scan_finds_latest_container(tmp_path):
+    for version in ("0620", "0710"):
+        (tmp_path / f"brake_{version}.odx").write_bytes(HEADER.replace(b"0620", version.encode()) + FOOTER)
+    catalog = ContainerCatalog(":memory:")
+
+    result = catalog.scan(str(tmp_path))
+
+    assert result["added"] == 2
+    assert catalog.latest(0x03).endswith("brake_0710.odx")
+    catalog.close()
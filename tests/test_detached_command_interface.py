@@ -0,0 +1,42 @@
+import threading
+
+import pytest
+
+from detached_socket_connection import SocketServer
+
+
+@pytest.fixture
+def server(installation, mock_service):
+    server = SocketServer("127.0.0.1", 0)
+    tool_path, configuration_path = installation
+    server.initialization = f"initialize({tool_path}; {configuration_path}; {mock_service.port})"
+    yield server
+    server.command_interface.stop_interface()
+    server.command_interface.join(5)
+
+
+def wait(server, job_id):
+    done = threading.Event()
+    server.command_interface.add_done_callback(job_id, lambda job: done.set())
+    assert done.wait(5)
+    return server.command_interface.status(job_id)
+
+
+def test_plain_messages_are_answered_with_job_id(server):
+    first = server.process_message(server.initialization)
+    second = server.process_message("attach()")
+
+    assert first.isdigit() and second.isdigit()
+    assert int(second) == int(first) + 1
+    assert wait(server, second) == "done"
+    assert server.process_message(f"status({second})") == "done"
+
+
+def test_failed_command_marks_job_failed(server):
+    server.process_message(server.initialization)
+    wait(server, server.process_message("attach()"))
+    job_id = server.process_message("no_such_command(3)")
+
+    assert wait(server, job_id) == "failed"
+    assert isinstance(server.command_interface.result(job_id), Exception)
+    assert server.process_message(f"status({job_id})") == "failed"
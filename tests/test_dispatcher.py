@@ -0,0 +1,49 @@
+import pytest
+
+from interfaces.custom_exceptions import CommandTemplateError, InvalidArgument
+from interfaces.dispatcher import CommandTable, tokenize, to_int
+from odis.odis import Odis
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("open()", ("open", [])),
+    ("connect_to_ecu( 0x17 )", ("connect_to_ecu", ["0x17"])),
+    ("set_doip_vehicle_project(MQB;192.168.0.10)", ("set_doip_vehicle_project", ["MQB", "192.168.0.10"])),
+    ("set_doip_vehicle_project(MQB;)", ("set_doip_vehicle_project", ["MQB", ""])),
+    ('flash("D:\\flash;v2 (final).odx")', ("flash", ["D:\\flash;v2 (final).odx"])),
+    ("flash(  'D:\\sw\\a b.odx'  )", ("flash", ["D:\\sw\\a b.odx"])),
+    ("flash(D:\\sw\\it's.odx)", ("flash", ["D:\\sw\\it's.odx"])),
+    ("flash(D:\\sw\\it's (v2).odx)", ("flash", ["D:\\sw\\it's (v2).odx"])),
+    ("set_doip_vehicle_project(Peter's MQB; '192.168.0.10')", ("set_doip_vehicle_project",
+                                                              ["Peter's MQB", "192.168.0.10"])),
+    ('batch(connect_to_ecu(3); flash("D:\\a;b.odx"))', ("batch", ["connect_to_ecu(3)", 'flash("D:\\a;b.odx")'])),
+    ("batch(send_raw_service(10 03);send_raw_service(22 F1 90))",
+     ("batch", ["send_raw_service(10 03)", "send_raw_service(22 F1 90)"])),
+])
+def test_tokenize(message, expected):
+    assert tokenize(message) == expected
+
+
+@pytest.mark.parametrize("message", ["", "open", "(x)", '"open"()', "flash('D:\\sw.odx)", "open() x",
+                                     "batch(open()", "flash(a) (b)"])
+def test_tokenize_rejects_invalid_template(message):
+    with pytest.raises(CommandTemplateError):
+        tokenize(message)
+
+
+def test_arguments_are_converted_by_annotation():
+    table = CommandTable.for_class(Odis)
+
+    assert table.compile("connect_to_ecu(0x815A)")[1] == [0x815A]
+    assert table.compile("connect_to_ecu(017)")[1] == [17]
+    assert table.compile("send_raw_service(22 F1 90)")[1] == ["22 F1 90"]
+    assert table.compile("enable_response_cache(16; 0.5)")[1] == [16, 0.5]
+    with pytest.raises(InvalidArgument):
+        table.compile("connect_to_ecu(ECU)")
+    with pytest.raises(InvalidArgument):
+        table.compile("connect_to_ecu(1; 2)")
+
+
+def test_to_int():
+    assert [to_int(value) for value in ("33114", " 0x815A ", "-0x10", "0b101", "010")] == [33114, 0x815A, -16,
+                                                                                             5, 10]
@@ -0,0 +1,117 @@
+"""Odis against stand-in ODIS automation service, neither ODIS nor ECU is needed"""
+import pytest
+
+from modules.metrics import metrics
+from odis.odis import FLASH_SUCCESS, Odis
+from odis.recording import close_recordings
+
+
+@pytest.fixture
+def container(tmp_path):
+    path = tmp_path / "brake.odx"
+    path.write_bytes(bytes(100000))
+    return str(path)
+
+
+def test_flash_records_reported_duration(odis, mock_service, container):
+    metrics.reset()
+    mock_service.flash_duration = 1.0
+    odis.connect_to_ecu(3)
+
+    assert odis.flash(container) == FLASH_SUCCESS
+
+    flash = metrics.snapshot()["flash"]
+    assert flash["count"] == 1
+    assert flash["max"] == 1.0
+    assert flash["bytes_per_second"] == 100000
+
+
+@pytest.fixture
+def new_odis(installation, mock_service):
+    """
+    :return: factory of Odis objects configured for stand-in service, not attached yet
+    """
+    tool_path, configuration_path = installation
+    created = []
+
+    def create():
+        created.append(Odis(tool_path=tool_path, configuration_path=configuration_path, tool_port=mock_service.port))
+        return created[-1]
+    yield create
+    for odis in created:
+        if odis.fast_path is not None:
+            odis.fast_path.close()
+    close_recordings()
+
+
+def test_attach(new_odis, mock_service):
+    odis = new_odis()
+
+    assert odis.attach() == "ODIS attached"
+    assert mock_service.calls["getAutomationApiVersion"] >= 1
+    assert odis.set_vehicle_project("MOCK")
+
+
+def test_raw_service(odis, mock_service):
+    odis.connect_to_ecu(3)
+
+    assert odis.send_raw_service("22 F1 90") == "0X62 0XF1 0X90 " + " ".join(f"0X{index:02X}" for index in range(16))
+    assert odis.send_raw_service_bytes("10 03") == b"\x50\x03"
+    assert odis.send_raw_service_bytes(b"\x3E\x00") == b"\x7E\x00"
+    assert mock_service.calls["sendRawService"] == 3
+
+
+def test_sequence(odis, tmp_path):
+    script = tmp_path / "session.seq"
+    script.write_text("send 10 03 expect 50 03\n"
+                      "repeat 3\n"
+                      "    send 22 F1 90 expect /^62 F1 90 /\n"
+                      "end\n")
+    odis.connect_to_ecu(3)
+
+    assert odis.run_sequence(script).startswith("PASS steps=4 failed=0")
+
+    script.write_text("on_fail continue\n"
+                      "send 10 03 expect 50 01\n"
+                      "send 3E 00\n")
+    report = odis.run_sequence(script)
+    assert report.startswith("FAIL steps=2 failed=1")
+    assert "50 03" in report
+
+
+def test_replay_answers_recorded_session(new_odis, mock_service, tmp_path):
+    recording = tmp_path / "session.jsonl.gz"
+    odis = new_odis()
+    odis.recording_path = str(recording)
+    odis.attach()
+    odis.set_vehicle_project("MOCK")
+    odis.connect_to_ecu(3)
+    recorded = [odis.send_raw_service(command) for command in ("10 03", "22 F1 90", "3E 00")]
+    calls = dict(mock_service.calls)
+
+    replayed = new_odis()
+    assert replayed.attach_replay(recording) == "ODIS replay attached"
+    replayed.set_vehicle_project("MOCK")
+    replayed.connect_to_ecu(3)
+
+    assert [replayed.send_raw_service(command) for command in ("10 03", "22 F1 90", "3E 00")] == recorded
+    assert dict(mock_service.calls) == calls
+
+
+def test_flash_pauses_background_traffic(odis, container):
+    odis.connect_to_ecu(3)
+    odis.start_tester_present(0.05)
+    flash_programming = odis.service.flashProgramming
+    paused = []
+
+    def recording_flash_programming(*args, **kwargs):
+        paused.append((odis.background_paused, odis.tester_present.summary().split()[2]))
+        return flash_programming(*args, **kwargs)
+    odis.service.flashProgramming = recording_flash_programming
+
+    try:
+        assert odis.flash(container) == FLASH_SUCCESS
+    finally:
+        odis.stop_tester_present()
+    assert paused == [(True, "paused=True")]
+    assert not odis.background_paused
@@ -0,0 +1,106 @@
+import base64
+import http.client
+import os
+import time
+
+import pytest
+
+from odis.mock_service import MockOdisService, NAMESPACE, OPERATIONS, default_raw_responder
+from odis.odis import Odis
+from odis.raw_service_codec import to_bytes
+
+PARITY_REQUESTS = [b"\x22\xF1\x90", b"\x10\x03", b"\x31\x01\xFF\x00", b"\x98", b"\x99",
+                   b"\x2E\xF1\x90" + os.urandom(4096)]
+
+
+def responder(request: bytes) -> bytes:
+    """
+    Stand-in responses with special cases: 98 answers empty response, 99 raises SOAP fault
+    """
+    if request[:1] == b"\x99":
+        raise ValueError("requestOutOfRange")
+    if request[:1] == b"\x98":
+        return b""
+    return default_raw_responder(request, 64)
+
+
+@pytest.fixture
+def mock_service():
+    with MockOdisService(raw_responder=responder) as service:
+        yield service
+
+
+@pytest.fixture
+def handle(odis):
+    odis.connect_to_ecu(3)
+    return odis.connection_handle
+
+
+def outcome(function, *args):
+    try:
+        return function(*args)
+    except Exception as error:
+        return type(error), str(error)
+
+
+@pytest.mark.parametrize("request_bytes", PARITY_REQUESTS, ids=lambda request: request[:3].hex())
+def test_fast_path_matches_zeep(odis, handle, request_bytes):
+    fast = outcome(odis.fast_path.send_raw_service, handle, request_bytes)
+    generic = outcome(lambda: to_bytes(odis.service.sendRawService(handle, request_bytes)))
+
+    assert fast == generic
+
+
+def test_base64_with_line_breaks_is_decoded_by_zeep(odis):
+    encoded = base64.encodebytes(bytes(range(100)))
+    content = (b'<?xml version="1.0"?><soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">'
+               b'<soap:Body><ns0:sendRawServiceResponse xmlns:ns0="' + NAMESPACE.encode() + b'">'
+               b'<return>' + encoded + b'</return></ns0:sendRawServiceResponse></soap:Body></soap:Envelope>')
+
+    assert odis.fast_path._reply(200, {"Content-Type": "text/xml"}, content) == bytes(range(100))
+
+
+def test_fast_path_disabled_for_other_response_schema(installation, monkeypatch):
+    monkeypatch.setitem(OPERATIONS, "sendRawService",
+                        ([("connectionHandle", "xs:int"), ("request", "xs:base64Binary")], ("xs:byte", True)))
+    tool_path, configuration_path = installation
+    with MockOdisService() as service:
+        odis = Odis(tool_path=tool_path, configuration_path=configuration_path, tool_port=service.port)
+        odis.attach()
+
+        assert odis.fast_path is None
+
+
+def test_request_is_not_repeated_after_it_was_sent(odis, handle, mock_service, monkeypatch):
+    odis.fast_path.send_raw_service(handle, b"\x22\xF1\x90")
+    calls = mock_service.calls["sendRawService"]
+
+    def disconnected(connection):
+        raise http.client.RemoteDisconnected("Remote end closed connection without response")
+    monkeypatch.setattr(http.client.HTTPConnection, "getresponse", disconnected)
+
+    with pytest.raises(http.client.RemoteDisconnected):
+        odis.fast_path.send_raw_service(handle, b"\x11\x01")
+    # stand-in counts request while client already gave up waiting
+    deadline = time.monotonic() + 1
+    while mock_service.calls["sendRawService"] == calls and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    assert mock_service.calls["sendRawService"] == calls + 1
+
+
+def test_request_is_sent_again_if_idle_connection_was_broken(odis, handle, mock_service, monkeypatch):
+    odis.fast_path.send_raw_service(handle, b"\x22\xF1\x90")
+    calls = mock_service.calls["sendRawService"]
+    request = http.client.HTTPConnection.request
+    broken = []
+
+    def request_once_broken(connection, *args, **kwargs):
+        if not broken:
+            broken.append(connection)
+            raise BrokenPipeError()
+        return request(connection, *args, **kwargs)
+    monkeypatch.setattr(http.client.HTTPConnection, "request", request_once_broken)
+
+    assert odis.fast_path.send_raw_service(handle, b"\x11\x01") == b"\x51\x01"
+    assert mock_service.calls["sendRawService"] == calls + 1
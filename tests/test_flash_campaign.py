@@ -0,0 +1,44 @@
+import pytest
+
+from odis.flash_campaign import FlashCampaign, DONE, FAILED
+
+
+@pytest.fixture
+def containers(tmp_path):
+    paths = {}
+    for address in (0x03, 0x09, 0x44):
+        path = tmp_path / f"ecu_{address:02X}.odx"
+        path.write_bytes(bytes(1024 * address))
+        paths[address] = str(path)
+    return paths
+
+
+def test_campaign_flashes_all_ecus(pool, containers, tmp_path):
+    manifest = {"vehicle_project": "MOCK", "containers": containers, "gateways": {"can": [0x03, 0x44]}}
+    checkpoint = str(tmp_path / "campaign.checkpoint.json")
+
+    report = FlashCampaign(pool, manifest, checkpoint).run()
+
+    assert report["done"] == 3 and report["failed"] == 0
+    resumed = FlashCampaign(pool, manifest, checkpoint)
+    assert all(item.status == DONE for item in resumed.items.values())
+
+
+def test_crashed_instance_is_replaced_before_next_ecu_of_lane(pool, containers):
+    crashing = containers[0x03]
+    for instance in pool.instances:
+        def flash(container, odis=instance.odis, flash=instance.odis.flash):
+            if container == crashing:
+                odis.service = None
+                raise ConnectionError("ODIS crashed")
+            return flash(container)
+        instance.odis.flash = flash
+    manifest = {"vehicle_project": "MOCK", "containers": containers, "gateways": {"can": [0x03, 0x44]}}
+
+    report = FlashCampaign(pool, manifest).run(validate=False)
+
+    statuses = {ecu["address"]: (ecu["status"], ecu["error"]) for ecu in report["ecus"]}
+    assert statuses[0x03] == (FAILED, "ODIS crashed")
+    assert statuses[0x44] == (DONE, None)
+    assert statuses[0x09] == (DONE, None)
+    assert sum(instance.restarts for instance in pool.instances) == 1
@@ -0,0 +1,80 @@
+import asyncio
+import socket
+import struct
+
+import pytest
+
+import detached_socket_connection
+import socket_connection
+from async_socket_connection import AsyncSocketServer
+from interfaces.framing import HANDSHAKE, KIND_COMMAND, KIND_ERROR, FrameDecoder, encode_frame, serve_frames
+
+INVALID_LENGTH = struct.pack("!I", 0)
+
+
+async def exchange(data: bytes) -> bytes:
+    """
+    Sends data to async socket server and collects everything it answers till it closes connection
+    """
+    server = AsyncSocketServer("127.0.0.1", 0)
+    listener = await asyncio.start_server(server.handle_connection, "127.0.0.1", 0)
+    reader, writer = await asyncio.open_connection(*listener.sockets[0].getsockname())
+    writer.write(data)
+    writer.write_eof()
+    received = await asyncio.wait_for(reader.read(), 5)
+    writer.close()
+    listener.close()
+    await listener.wait_closed()
+    return received
+
+
+def error_frame(data: bytes):
+    (frame,) = FrameDecoder().feed(data)
+    assert frame.kind == KIND_ERROR
+    return frame
+
+
+def test_async_server_answers_invalid_frame_with_error_and_closes():
+    received = asyncio.run(exchange(HANDSHAKE + INVALID_LENGTH + b"status()"))
+
+    assert received.startswith(HANDSHAKE)
+    frame = error_frame(received[len(HANDSHAKE):])
+    assert frame.request_id == 0
+    assert b"Invalid frame length" in frame.body
+
+
+def test_async_server_answers_invalid_handshake_with_error_and_closes():
+    received = asyncio.run(exchange(HANDSHAKE[:-1]))
+
+    assert b"Invalid handshake" in error_frame(received).body
+
+
+@pytest.mark.parametrize("data, reply", [(HANDSHAKE + INVALID_LENGTH, HANDSHAKE), (HANDSHAKE[:-1], b"")])
+def test_serve_frames_answers_framing_error(data, reply):
+    server_socket, client_socket = socket.socketpair()
+    with server_socket, client_socket:
+        serve_frames(server_socket, data, lambda message: message)
+        server_socket.close()
+        received = b"".join(iter(lambda: client_socket.recv(65536), b""))
+
+    assert received.startswith(reply)
+    error_frame(received[len(reply):])
+
+
+@pytest.mark.parametrize("module", [socket_connection, detached_socket_connection], ids=lambda module: module.__name__)
+@pytest.mark.parametrize("data", [b"busy", HANDSHAKE + encode_frame(1, KIND_COMMAND, b"busy")], ids=["bare", "framed"])
+def test_blocking_servers_close_client_socket(module, data):
+    server = module.SocketServer("127.0.0.1", 0)
+    server_socket, client_socket = socket.socketpair()
+    try:
+        with client_socket:
+            client_socket.sendall(data)
+            client_socket.shutdown(socket.SHUT_WR)
+            server.handle_connection(server_socket)
+
+            assert server_socket.fileno() == -1
+            assert b"".join(iter(lambda: client_socket.recv(65536), b""))
+    finally:
+        server_socket.close()
+        if hasattr(server.command_interface, "stop_interface"):
+            server.command_interface.stop_interface()
@@ -0,0 +1,113 @@
+import os
+
+import pytest
+
+from odis.configuration import WEBSERVICE_ENABLED_KEY, WEBSERVICE_PORT_KEY
+from odis.mock_service import MockOdisService
+from odis.odis_pool import OdisPool
+from tests.conftest import QuickCloseOdis
+
+
+def flash_ecu(odis, address):
+    odis.set_vehicle_project("MOCK")
+    odis.connect_to_ecu(address)
+    return odis.tool_port, odis.send_raw_service("22 F1 90")
+
+
+def test_jobs_run_on_all_instances(pool, services):
+    results = pool.map(flash_ecu, range(1, 9))
+
+    assert len(results) == 8
+    assert all(response.startswith("0X62 0XF1 0X90") for _, response in results)
+    usage = pool.utilisation()
+    assert sum(instance["jobs"] for instance in usage["instances"]) == 8
+    assert {port for port, _ in results} <= {service.port for service in services}
+
+
+def test_failed_job_on_healthy_instance_is_not_restarted(pool):
+    def failing(odis):
+        raise ValueError("job failed")
+
+    with pytest.raises(ValueError, match="job failed"):
+        pool.submit(failing).result()
+
+    instance = next(instance for instance in pool.utilisation()["instances"] if instance["failures"])
+    assert instance["restarts"] == 0
+    assert instance["usable"]
+
+
+def test_crashed_instance_is_restarted_before_next_job(pool, services):
+    port = services[0].port
+
+    with pytest.raises(ConnectionError, match="ODIS crashed"):
+        with pool.lease() as leased:
+            assert leased.tool_port == port
+            services[0].stop()
+            # stopped stand-in still answers on open keep-alive connections
+            leased.service = None
+            raise ConnectionError("ODIS crashed")
+    instance = pool.instances[0]
+    assert not instance.usable
+    assert instance.restarts == 1
+
+    services[0] = MockOdisService(port=port).start()
+    with pool.lease() as first, pool.lease() as second:
+        assert {first.tool_port, second.tool_port} == {port, services[1].port}
+        assert second.health_check()
+    assert instance.usable
+    assert instance.restarts == 2
+
+
+@pytest.fixture
+def started(monkeypatch):
+    """
+    :return: command lines of ODIS processes started by open(), instead of starting them
+    """
+    calls = []
+    monkeypatch.setattr("odis.odis.process_exists", lambda name: False)
+    monkeypatch.setattr("odis.odis.start_process", lambda call, timeout: calls.append(call))
+    return calls
+
+
+def installed_configuration(configuration_path):
+    path = os.path.join(configuration_path, "configuration", "webservice.ini")
+    os.makedirs(os.path.dirname(path))
+    with open(path, "w") as file:
+        file.write(f"{WEBSERVICE_ENABLED_KEY}=true\n{WEBSERVICE_PORT_KEY}=8086\nlanguage=en\neof=eof\n")
+    return path
+
+
+def test_single_instance_is_started_with_installed_configuration(installation, mock_service, started):
+    tool_path, configuration_path = installation
+    installed = installed_configuration(configuration_path)
+    with open(installed) as file:
+        content = file.read()
+
+    assert QuickCloseOdis(tool_path, configuration_path, mock_service.port).open() == "ODIS opened"
+    assert started == [os.path.join(tool_path, "OffboardDiagLauncher.exe") +
+                       " -configuration configuration\\webservice.ini"]
+    assert sorted(os.listdir(os.path.dirname(installed))) == ["webservice.ini"]
+    with open(installed) as file:
+        assert file.read() == content
+
+
+def test_pooled_instances_are_started_with_own_configuration(installation, services, started, monkeypatch):
+    monkeypatch.setattr("odis.odis.STARTUP_TIMEOUT", 1)
+    tool_path, configuration_path = installation
+    installed = installed_configuration(configuration_path)
+    with open(installed) as file:
+        content = file.read()
+    pool = OdisPool([{"tool_path": tool_path, "configuration_path": configuration_path, "tool_port": service.port}
+                     for service in services], odis_class=QuickCloseOdis)
+    pool.start()
+    pool.close()
+
+    assert [call[1:] for call in started] == [
+        ["-configuration", os.path.join(configuration_path, "configuration", f"webservice_{service.port}.ini")]
+        for service in services]
+    for service, (_, _, path) in zip(services, started):
+        with open(path) as file:
+            assert file.read() == (f"language=en\n{WEBSERVICE_ENABLED_KEY}=true\n{WEBSERVICE_PORT_KEY}={service.port}\n"
+                                   f"eof=eof\n")
+    with open(installed) as file:
+        assert file.read() == content
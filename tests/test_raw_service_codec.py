@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+from odis.raw_service_codec import encode_request, format_response
+
+
+def legacy_format_response(response):
+    """
+    Formatting of send_raw_service before raw_service_codec
+    """
+    def to_hex(val, nbits):
+        return hex((val + (1 << nbits)) % (1 << nbits))
+
+    answer = ""
+    for item in response:
+        answer = answer + str(to_hex(item, 8)) + " "
+    resp = ""
+    for element in answer.split(" "):
+        if len(element) == 3:
+            element = element.replace("x", "x0")
+        resp = resp + element + " "
+    answer = resp.upper()
+    answer = answer.strip().replace(" ", "").replace("0x", "")
+    return ' '.join(answer[i:i + 4] for i in range(0, len(answer), 4))
+
+
+def legacy_encode_request(hex_command):
+    hex_command = str(hex_command).strip().replace(" ", "")
+    hex_list = [hex_command[index: index + 2] for index in range(0, len(hex_command), 2)]
+    hex_list = ["0x" + item for item in hex_list if "0x" not in item]
+    return bytes([(int(item, 0)) for item in hex_list])
+
+
+def outcome(function, argument):
+    try:
+        return function(argument)
+    except Exception as error:
+        return type(error)
+
+
+@pytest.mark.parametrize("response", [
+    b"\x50\x03\x00\x32\x01\xF4", b"\x00", b"\x0F\xF0", bytes(range(256)), os.urandom(4096), b"",
+    bytearray(b"\x62\xF1\x90"), [0x50, 0x03], [-128, -1, 0, 127], [], "5003", "50 03", "0X50 0X03",
+], ids=lambda response: repr(response)[:30])
+def test_format_response_matches_legacy(response):
+    assert outcome(format_response, response) == outcome(legacy_format_response, response)
+
+
+def test_format_response_of_missing_response_is_empty():
+    # legacy formatting raised TypeError when ODIS returned no response element
+    assert outcome(legacy_format_response, None) is TypeError
+    assert format_response(None) == ""
+
+
+@pytest.mark.parametrize("hex_command", ["10 03", "1003", " 22 F1 90 ", "22f190", "3E 80", "0x10 0x03",
+                                         os.urandom(512).hex(" ")], ids=lambda command: command[:20])
+def test_encode_request_matches_legacy(hex_command):
+    assert encode_request(hex_command) == legacy_encode_request(hex_command)
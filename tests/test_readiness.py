@@ -0,0 +1,85 @@
+import socket
+
+import pytest
+
+from modules.custom_exceptions import StartupTimeout
+from modules.readiness import Readiness, tcp_probe, window_probe
+from modules.window_backend import WindowBackend, get_window_backend
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, delay: float) -> None:
+        self.sleeps.append(delay)
+        self.now += delay
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def ready_after(attempts: int):
+    calls = []
+
+    def probe():
+        calls.append(None)
+        return len(calls) >= attempts
+    return probe
+
+
+def test_delay_doubles_up_to_max_delay(clock):
+    readiness = Readiness(60, initial_delay=0.05, max_delay=0.3, clock=clock, sleep=clock.sleep)
+
+    assert readiness.wait("webservice", ready_after(6)) == pytest.approx(0.95)
+    assert clock.sleeps == pytest.approx([0.05, 0.1, 0.2, 0.3, 0.3])
+
+
+def test_last_delay_is_cut_at_deadline(clock):
+    readiness = Readiness(0.3, initial_delay=0.05, max_delay=1, clock=clock, sleep=clock.sleep)
+
+    with pytest.raises(StartupTimeout, match="Startup phase webservice not finished within 0.3s"):
+        readiness.wait("webservice", lambda: False)
+    assert clock.sleeps == pytest.approx([0.05, 0.1, 0.15])
+    assert clock.now == pytest.approx(0.3)
+
+
+def test_phases_share_deadline(clock):
+    readiness = Readiness(1, initial_delay=0.2, max_delay=0.2, clock=clock, sleep=clock.sleep)
+
+    readiness.wait("process", ready_after(4))
+    with pytest.raises(StartupTimeout, match="Startup phase webservice"):
+        readiness.wait("webservice", ready_after(10))
+    assert clock.now == pytest.approx(1)
+    assert readiness.report() == "process: 0.600s"
+
+
+def test_ready_probe_does_not_sleep(clock):
+    readiness = Readiness(0, clock=clock, sleep=clock.sleep)
+
+    assert readiness.wait("process", lambda: True) == 0
+    assert clock.sleeps == []
+
+
+def test_tcp_probe():
+    with socket.socket() as listener:
+        listener.bind(("127.0.0.1", 0))
+        port = listener.getsockname()[1]
+        assert not tcp_probe(port)()
+        listener.listen()
+        assert tcp_probe(port)()
+
+
+def test_default_window_backend_finds_no_windows(monkeypatch):
+    monkeypatch.setattr("sys.platform", "linux")
+    backend = get_window_backend()
+
+    assert type(backend) is WindowBackend
+    assert backend.find_windows("Offboard") == []
+    assert window_probe(backend, "Offboard")()
@@ -0,0 +1,121 @@
+import pytest
+
+from odis.odis import FLASH_SUCCESS
+from odis.response_cache import ResponseCache
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def test_read_services_are_cached(clock):
+    cache = ResponseCache(clock=clock)
+
+    assert all(cache.cacheable(request) for request in (b"\x22\xF1\x90", b"\x19\x0A"))
+    assert not any(cache.cacheable(request) for request in (b"\x19\x02\xFF", b"\x10\x03", b"\x2E\xF1\x90\x01", b""))
+    cache.put(1, b"\x22\xF1\x90", b"\x62\xF1\x90\x01")
+    cache.put(1, b"\x19\x0A", b"\x59\x0A\xFF")
+    cache.put(1, b"\x22\xF1\x8C", b"\x7F\x22\x31")
+
+    assert cache.get(1, b"\x22\xF1\x90") == b"\x62\xF1\x90\x01"
+    assert cache.get(1, b"\x19\x0A") == b"\x59\x0A\xFF"
+    assert cache.get(2, b"\x22\xF1\x90") is None
+    assert cache.get(1, b"\x22\xF1\x8C") is None
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = ResponseCache(ttl=5, clock=clock)
+    cache.put(1, b"\x22\xF1\x90", b"\x62\xF1\x90\x01")
+
+    clock.now = 5
+    assert cache.get(1, b"\x22\xF1\x90") == b"\x62\xF1\x90\x01"
+    clock.now = 5.01
+    assert cache.get(1, b"\x22\xF1\x90") is None
+    assert cache.stats().endswith("entries=0")
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = ResponseCache(max_entries=2, clock=clock)
+    cache.put(1, b"\x22\x00\x01", b"\x62\x00\x01")
+    cache.put(1, b"\x22\x00\x02", b"\x62\x00\x02")
+    cache.get(1, b"\x22\x00\x01")
+    cache.put(1, b"\x22\x00\x03", b"\x62\x00\x03")
+
+    assert cache.get(1, b"\x22\x00\x02") is None
+    assert cache.get(1, b"\x22\x00\x01") == b"\x62\x00\x01"
+    assert cache.get(1, b"\x22\x00\x03") == b"\x62\x00\x03"
+
+
+@pytest.mark.parametrize("request_bytes", [b"\x10\x03", b"\x11\x01", b"\x2E\xF1\x90\x01", b"\x31\x01\xFF\x00"])
+def test_state_changing_service_invalidates_its_handle(clock, request_bytes):
+    cache = ResponseCache(clock=clock)
+    cache.put(1, b"\x22\xF1\x90", b"\x62\xF1\x90\x01")
+    cache.put(2, b"\x22\xF1\x90", b"\x62\xF1\x90\x02")
+
+    cache.observe(1, b"\x22\xF1\x8C")
+    cache.observe(1, b"\x3E\x80")
+    assert cache.get(1, b"\x22\xF1\x90") == b"\x62\xF1\x90\x01"
+    cache.observe(1, request_bytes)
+
+    assert cache.get(1, b"\x22\xF1\x90") is None
+    assert cache.get(2, b"\x22\xF1\x90") == b"\x62\xF1\x90\x02"
+
+
+@pytest.fixture
+def cached_odis(odis, mock_service):
+    odis.enable_response_cache()
+    odis.connect_to_ecu(3)
+    return odis
+
+
+def reads(odis, mock_service, request="22 F1 90"):
+    """
+    :return: number of requests which reached ECU while request was sent twice
+    """
+    calls = mock_service.calls.get("sendRawService", 0)
+    odis.send_raw_service(request)
+    odis.send_raw_service(request)
+    return mock_service.calls["sendRawService"] - calls
+
+
+def test_odis_answers_repeated_reads_from_cache(cached_odis, mock_service):
+    assert reads(cached_odis, mock_service) == 1
+    assert reads(cached_odis, mock_service, "19 0A") == 1
+    assert reads(cached_odis, mock_service, "19 02 FF") == 2
+
+
+@pytest.mark.parametrize("request_bytes", ["10 03", "11 01", "2E F1 90 01", "31 01 FF 00"])
+def test_odis_invalidates_cache_after_state_changing_service(cached_odis, mock_service, request_bytes):
+    reads(cached_odis, mock_service)
+    cached_odis.send_raw_service(request_bytes)
+
+    assert reads(cached_odis, mock_service) == 1
+
+
+def test_odis_invalidates_cache_on_connect_and_close(cached_odis, mock_service):
+    reads(cached_odis, mock_service)
+    cached_odis.connect_to_ecu(3)
+    assert reads(cached_odis, mock_service) == 1
+
+    cached_odis.close_connection_to_ecu(3)
+    cached_odis.connect_to_ecu(3)
+    assert reads(cached_odis, mock_service) == 1
+
+
+def test_odis_invalidates_cache_on_flash(cached_odis, mock_service, tmp_path):
+    container = tmp_path / "brake.odx"
+    container.write_bytes(bytes(100))
+    reads(cached_odis, mock_service)
+
+    assert cached_odis.flash(container) == FLASH_SUCCESS
+    assert reads(cached_odis, mock_service) == 1
@@ -0,0 +1,158 @@
+import asyncio
+import time
+
+import pytest
+
+from interfaces.framing import FrameDecoder, decode_event
+from interfaces.subscriptions import MAX_QUEUED_SAMPLES, SubscriptionHub
+
+
+class Component:
+    """
+    Automation component answering DID reads, read_delay makes each read block
+    """
+
+    def __init__(self, read_delay: float = 0.0) -> None:
+        self.connection_handle = 7
+        self.read_delay = read_delay
+        self.reads = []
+        self.background_paused = False
+
+    def send_raw_service_bytes_to_handle(self, handle: int, request: bytes) -> bytes:
+        time.sleep(self.read_delay)
+        self.reads.append((handle, request))
+        return b"\x62" + request[1:] + b"\x01"
+
+
+class Writer:
+    """
+    Stream writer of client, blocked client never returns from drain
+    """
+
+    def __init__(self, blocked: bool = False) -> None:
+        self.data = bytearray()
+        self.blocked = blocked
+
+    def write(self, data: bytes) -> None:
+        self.data += data
+
+    async def drain(self) -> None:
+        if self.blocked:
+            await asyncio.Event().wait()
+
+    def events(self) -> list:
+        return [decode_event(frame) for frame in FrameDecoder().feed(bytes(self.data))]
+
+
+async def run_blocking(function, *args):
+    return await asyncio.to_thread(function, *args)
+
+
+def run(test):
+    asyncio.run(asyncio.wait_for(test(), 5))
+
+
+def subscribe(hub, connection, request_id, writer, component, period="20", lock=None):
+    return hub.handle("subscribe", ["F190 F18C", period], connection, request_id, writer, component, lock)
+
+
+def test_identical_subscriptions_share_poll():
+    async def test():
+        hub = SubscriptionHub(run_blocking)
+        component = Component()
+        first, second = Writer(), Writer()
+        subscribe(hub, "first", 1, first, component)
+        assert subscribe(hub, "second", 5, second, component).endswith("2 subscribers")
+        subscribe(hub, "second", 6, second, component, period="40")
+        await asyncio.sleep(0.1)
+
+        assert len(hub._polls) == 2
+        poll = next(poll for poll in hub._polls.values() if len(poll.subscribers) == 2)
+        assert len(component.reads) >= 2 * poll.sequence
+        assert [event.sequence for event in first.events()][:3] == [1, 2, 3]
+        assert {event.subscription for event in second.events()} == {5, 6}
+        assert first.events()[0].samples == {0xF190: b"\x62\xF1\x90\x01", 0xF18C: b"\x62\xF1\x8C\x01"}
+        hub.release("first")
+        hub.release("second")
+    run(test)
+
+
+def test_slow_read_is_counted_as_overrun():
+    async def test():
+        hub = SubscriptionHub(run_blocking)
+        subscribe(hub, "client", 1, Writer(), Component(read_delay=0.03), period="10")
+        await asyncio.sleep(0.2)
+
+        (poll,) = hub._polls.values()
+        assert poll.overruns >= poll.sequence
+        assert "overruns=0 " not in hub.summary()
+        hub.release("client")
+    run(test)
+
+
+def test_samples_of_slow_subscriber_are_dropped():
+    async def test():
+        hub = SubscriptionHub(run_blocking)
+        component = Component()
+        fast, slow = Writer(), Writer(blocked=True)
+        subscribe(hub, "fast", 1, fast, component, period="10")
+        subscribe(hub, "slow", 2, slow, component, period="10")
+        await asyncio.sleep(0.2)
+
+        (poll,) = hub._polls.values()
+        fast_subscriber, slow_subscriber = poll.subscribers
+        assert poll.sequence > MAX_QUEUED_SAMPLES + 1
+        assert len(slow_subscriber.samples) == MAX_QUEUED_SAMPLES
+        assert slow_subscriber.dropped_total == poll.sequence - MAX_QUEUED_SAMPLES - 1
+        assert fast_subscriber.dropped_total == 0
+        assert len(fast.events()) >= poll.sequence - 1
+        hub.release("fast")
+        hub.release("slow")
+    run(test)
+
+
+@pytest.mark.parametrize("leave", ["unsubscribe", "disconnect"])
+def test_poll_stops_when_last_subscriber_leaves(leave):
+    async def test():
+        hub = SubscriptionHub(run_blocking)
+        subscribe(hub, "client", 1, Writer(), Component())
+        await asyncio.sleep(0.05)
+        (poll,) = hub._polls.values()
+        (subscriber,) = poll.subscribers
+
+        if leave == "unsubscribe":
+            assert hub.handle("unsubscribe", ["1"], "client", 2, None, None) == "Unsubscribed 1"
+        else:
+            hub.release("client")
+        await asyncio.sleep(0.05)
+
+        assert hub.summary() == "No subscriptions"
+        assert poll.task.done() and subscriber.task.cancelled()
+        with pytest.raises(ValueError, match="No subscription 1"):
+            hub.unsubscribe("client", 1)
+    run(test)
+
+
+def test_poll_waits_for_session_commands_and_background_pause():
+    async def test():
+        hub = SubscriptionHub(run_blocking)
+        component = Component()
+        lock = asyncio.Lock()
+        async with lock:
+            subscribe(hub, "client", 1, Writer(), component, period="10", lock=lock)
+            await asyncio.sleep(0.05)
+            assert component.reads == []
+
+        component.background_paused = True
+        await asyncio.sleep(0.05)
+        (poll,) = hub._polls.values()
+        reads = len(component.reads)
+        await asyncio.sleep(0.05)
+        assert len(component.reads) == reads
+        assert poll.paused > 0
+
+        component.background_paused = False
+        await asyncio.sleep(0.05)
+        assert len(component.reads) > reads
+        hub.release("client")
+    run(test)
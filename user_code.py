@@ -1,4 +1,7 @@
 from odis.odis import Odis
+from modules.logger import configure_logging
+
+configure_logging()
 
 odis = Odis(tool_path="c:\\Program Files\\OE",
             configuration_path="c:\\ProgramData\\OE\\",